@@ -6,6 +6,10 @@ const fs = require('fs');
 
 const app = express();
 const PORT = process.env.PORT || 3001;
+// e.g. http://127.0.0.1:8765 when `python -m storyboardpy serve` is running
+const STORYBOARDPY_URL = process.env.STORYBOARDPY_URL;
+// Content-addressed artifact store; screenshots and dumps are deduplicated there instead of piling up
+const STORYBOARDPY_STORE = process.env.STORYBOARDPY_STORE;
 
 // Middleware
 app.use(cors());
@@ -48,6 +52,38 @@ app.post('/api/generate-storyboard', async (req, res) => {
     const targetUrl = websiteUrl;
     console.log(`Starting storyboard generation for website: ${websiteUrl}${githubUrl ? ` (GitHub: ${githubUrl})` : ''}`);
 
+    // Resident worker (`python -m storyboardpy serve`): no process spawn, warm browser, in-memory handoff
+    if (STORYBOARDPY_URL) {
+      const workerResponse = await fetch(`${STORYBOARDPY_URL}/generate`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          url: targetUrl,
+          request_id: requestId,
+          max_pages: 5,
+          artifacts_dir: path.join(__dirname, 'artifacts', requestId),
+          duration_hint: 90,
+          goal: specifications && specifications.trim() ? specifications.trim() : undefined,
+        }),
+      });
+      const result = await workerResponse.json();
+      if (!workerResponse.ok) {
+        throw new Error(`storyboardpy worker failed: ${result.error || workerResponse.status}`);
+      }
+      console.log(`Worker finished (scan ${result.timings.scan_seconds}s, storyboard ${result.timings.storyboard_seconds}s)`);
+      return res.json({
+        success: true,
+        storyboard: result.storyboard,
+        transcript: result.transcript,
+        requestId: requestId,
+        generatedAt: new Date().toISOString(),
+        sourceUrls: {
+          githubUrl: githubUrl || null,
+          websiteUrl: websiteUrl
+        }
+      });
+    }
+
     // First, scan the website to get site summary
     const scanArgs = [
       '-m', 'storyboardpy', 'scan',
@@ -56,6 +92,9 @@ app.post('/api/generate-storyboard', async (req, res) => {
       '--artifacts-dir', path.join(__dirname, 'artifacts', requestId),
       '--site-out', siteSummaryPath
     ];
+    if (STORYBOARDPY_STORE) {
+      scanArgs.push('--store', STORYBOARDPY_STORE, '--request-id', requestId);
+    }
 
     console.log('Running scan command:', 'python', scanArgs.join(' '));
 
@@ -105,6 +144,9 @@ app.post('/api/generate-storyboard', async (req, res) => {
     if (specifications && specifications.trim()) {
       storyboardArgs.push('--goal', specifications.trim());
     }
+    if (STORYBOARDPY_STORE) {
+      storyboardArgs.push('--store', STORYBOARDPY_STORE, '--request-id', requestId);
+    }
 
     console.log('Running storyboard command:', 'python', storyboardArgs.join(' '));
 
@@ -151,6 +193,17 @@ app.post('/api/generate-storyboard', async (req, res) => {
     console.log(`- Transcript: ${transcriptPath}`);
     console.log(`- Site summary: ${siteSummaryPath}`);
 
+    // With a store the outputs live in its manifest for this request; drop the loose copies
+    if (STORYBOARDPY_STORE) {
+      for (const file of [storyboardPath, transcriptPath, siteSummaryPath]) {
+        try {
+          fs.unlinkSync(file);
+        } catch (cleanupError) {
+          console.warn('Failed to clean up temporary files:', cleanupError.message);
+        }
+      }
+    }
+
     // Keep files for inspection (commented out cleanup)
     /*
     try {
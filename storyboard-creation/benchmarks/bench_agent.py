@@ -0,0 +1,178 @@
+"""Offline throughput/concurrency benchmark for StoryboardAgent and the CLI.
+
+Replays a cassette instead of calling Cohere, so it runs with no network and
+no API key. Without ``--cassette`` a throwaway cassette is built from
+``examples/storyboard.example.json``.
+
+    python benchmarks/bench_agent.py --jobs 200 --concurrency 16 --latency 0.5
+    python benchmarks/bench_agent.py --cli --jobs 20 --concurrency 4
+    python benchmarks/bench_agent.py --jobs 200 --latency 0.2 --tail-rate 0.05 --tail-latency 3 --hedge p90
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storyboardpy.agent import StoryboardAgent  # noqa: E402
+from storyboardpy.hedge import HedgePolicy  # noqa: E402
+from storyboardpy.llm import CassetteBackend  # noqa: E402
+
+
+def _example_cassette(path: str) -> None:
+    with open(os.path.join(ROOT, "examples", "storyboard.example.json"), "r", encoding="utf-8") as f:
+        response = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "interactions": [
+            {"key": "example", "model": "command-r", "prompt": "", "response": response, "latency_seconds": 0.0}
+        ]}, f)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _report(name: str, latencies: List[float], errors: int, wall: float) -> Dict[str, Any]:
+    done = len(latencies)
+    return {
+        "name": name,
+        "completed": done,
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_per_second": round(done / wall, 3) if wall else 0.0,
+        "latency_p50": round(_percentile(latencies, 50), 4),
+        "latency_p95": round(_percentile(latencies, 95), 4),
+        "latency_p99": round(_percentile(latencies, 99), 4),
+        "latency_mean": round(statistics.mean(latencies), 4) if latencies else 0.0,
+    }
+
+
+async def bench_agent(args: argparse.Namespace, cassette: str, site_summary: Dict[str, Any]) -> Dict[str, Any]:
+    backend = CassetteBackend(
+        cassette,
+        mode="replay",
+        strict=False,
+        latency_seconds=None if args.latency == "recorded" else float(args.latency),
+        error_rate=args.error_rate,
+        tail_rate=args.tail_rate,
+        tail_seconds=args.tail_latency,
+        seed=0,
+    )
+    hedge = HedgePolicy.parse(args.hedge, min_samples=10, initial_delay_seconds=args.tail_latency / 2 or 1.0) if args.hedge else None
+    agent = StoryboardAgent(backend=backend, hedge=hedge)
+    # The agent runs backend calls in the default executor; size it to the concurrency under test
+    # (a hedged call can hold two threads, and a lost attempt keeps its thread until its call returns)
+    workers = args.concurrency * (3 if hedge else 1)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            started = time.perf_counter()
+            try:
+                await agent.create_storyboard_async(site_summary, duration_hint=90, goal=f"Benchmark job {i}")
+            except RuntimeError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.jobs)))
+    result = _report("agent", latencies, errors, time.perf_counter() - started)
+    result["llm"] = {k: v for k, v in agent.usage_report().items() if k != "by_model"}
+    if hedge:
+        result["hedging"] = agent.hedge_report()
+    return result
+
+
+def bench_cli(args: argparse.Namespace, cassette: str, site_in: str, workdir: str) -> Dict[str, Any]:
+    cmd_base = [
+        sys.executable, "-m", "storyboardpy", "storyboard",
+        "--site-in", site_in,
+        "--cassette", cassette,
+        "--replay-any",
+        "--replay-latency", args.latency,
+        "--replay-error-rate", str(args.error_rate),
+    ]
+    pending = list(range(args.jobs))
+    running: List[Any] = []
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    while pending or running:
+        while pending and len(running) < args.concurrency:
+            i = pending.pop(0)
+            out = os.path.join(workdir, f"{i}.storyboard.json")
+            proc = subprocess.Popen(
+                cmd_base + ["--out", out, "--transcript-out", os.path.join(workdir, f"{i}.transcript.txt")],
+                cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            running.append((proc, time.perf_counter()))
+        for proc, t0 in list(running):
+            if proc.poll() is None:
+                continue
+            running.remove((proc, t0))
+            if proc.returncode == 0:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+        time.sleep(0.005)
+    return _report("cli", latencies, errors, time.perf_counter() - started)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Offline StoryboardAgent benchmark (cassette replay)")
+    p.add_argument("--cassette", default=None, help="Cassette to replay (default: built from examples/)")
+    p.add_argument("--site-in", default=os.path.join(ROOT, "examples", "site_summary.example.json"))
+    p.add_argument("--jobs", type=int, default=50)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--latency", default="0.2", help="Simulated seconds per LLM call, or 'recorded'")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--tail-rate", type=float, default=0.0, help="Share of calls that take --tail-latency instead")
+    p.add_argument("--tail-latency", type=float, default=0.0, help="Seconds a slow-tail call takes")
+    p.add_argument("--hedge", default=None, help="Hedge delay for the agent: seconds or pNN (see storyboard --hedge)")
+    p.add_argument("--cli", action="store_true", help="Also benchmark end-to-end `python -m storyboardpy storyboard` processes")
+    p.add_argument("--out", default=None, help="Write results JSON here")
+    args = p.parse_args()
+
+    with open(args.site_in, "r", encoding="utf-8") as f:
+        site_summary = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = args.cassette
+        if not cassette:
+            cassette = os.path.join(tmp, "example.cassette.json")
+            _example_cassette(cassette)
+        results = [asyncio.run(bench_agent(args, cassette, site_summary))]
+        if args.cli:
+            results.append(bench_cli(args, os.path.abspath(cassette), os.path.abspath(args.site_in), tmp))
+
+    payload = {
+        "jobs": args.jobs, "concurrency": args.concurrency, "latency": args.latency,
+        "tail_rate": args.tail_rate, "tail_latency": args.tail_latency, "hedge": args.hedge, "results": results,
+    }
+    text = json.dumps(payload, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Offline crawl benchmark for WebsiteExplorer.
+
+Generates synthetic sites (see ``crawl_fixtures.py``), serves them on
+localhost and crawls each with both engines, every run in a fresh interpreter
+so peak RSS is per run. Reported per (fixture, engine):
+
+- pages/s over the crawl's wall time
+- per-page latency percentiles: time between consecutive HTML documents the
+  server answered, i.e. fetch plus extraction plus queueing per page
+- peak RSS of the Python process and of its children (browser, shard workers)
+- output size: summary JSON plus screenshots
+
+Results are JSON; pass ``--compare`` with an earlier run to flag regressions.
+
+    python benchmarks/bench_crawl.py --pages 200 --out crawl.json
+    python benchmarks/bench_crawl.py --fixtures fanout,slow --engines requests --compare crawl.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crawl_fixtures import SHAPES, build_site, serve_site  # noqa: E402
+
+ENGINES = ("requests", "playwright")
+
+# Runs one crawl with a forced engine and reports wall time and peak RSS.
+_RUNNER = r"""
+import asyncio, json, resource, sys, time
+from storyboardpy.explorer import WebsiteExplorer
+explorer = WebsiteExplorer({url!r}, max_pages={max_pages}, max_links_per_page={max_links},
+                           artifacts_dir={artifacts!r}, screenshot={screenshot}, engine={engine!r}, shards={shards},
+                           parser={parser!r})
+started = time.perf_counter()
+summary = asyncio.run(explorer.explore())
+wall = time.perf_counter() - started
+with open({summary_out!r}, "w", encoding="utf-8") as f:
+    json.dump(summary, f)
+sys.stdout.write(json.dumps({{
+    "wall_seconds": wall,
+    "pages": len(summary["pages"]),
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+}}))
+"""
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return total
+
+
+def run_case(fixture: str, engine: str, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    shapes = SHAPES if fixture == "mixed" else (fixture,)
+    site = build_site(
+        pages=args.pages, shapes=shapes, fanout=args.fanout,
+        image_kb=args.image_kb, slow_ms=args.slow_ms, seed=args.seed,
+    )
+    case_dir = os.path.join(workdir, f"{fixture}-{engine}")
+    artifacts = os.path.join(case_dir, "artifacts")
+    summary_out = os.path.join(case_dir, "site.json")
+    os.makedirs(case_dir, exist_ok=True)
+    log: List[Any] = []
+    with serve_site(site, log) as base_url:
+        code = _RUNNER.format(
+            url=base_url + "/", max_pages=args.max_pages or args.pages, max_links=args.max_links,
+            artifacts=artifacts, screenshot=engine == "playwright" and not args.no_screenshot,
+            engine=engine, shards=args.shards, parser=args.parser, summary_out=summary_out,
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=args.timeout,
+        )
+    result: Dict[str, Any] = {"fixture": fixture, "engine": engine, "shards": args.shards, "parser": args.parser, "site_pages": args.pages}
+    if proc.returncode != 0:
+        # Last line that reads like an error (Playwright frames its messages in box drawing)
+        lines = [l.strip() for l in proc.stderr.splitlines() if re.search(r"[A-Za-z]{3}", l)]
+        errors = [l for l in lines if re.match(r"[\w.]+(Error|Exception)\b", l)]
+        result["error"] = ((errors or lines or [f"exit {proc.returncode}"])[-1])[:300]
+        return result
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    docs = [t for t, _, ctype in log if ctype.startswith("text/html")]
+    gaps = [b - a for a, b in zip(docs, docs[1:])]
+    summary_bytes = os.path.getsize(summary_out)
+    screenshot_bytes = _dir_size(artifacts) if os.path.isdir(artifacts) else 0
+    result.update({
+        "pages_crawled": stats["pages"],
+        "wall_seconds": round(stats["wall_seconds"], 4),
+        "pages_per_second": round(stats["pages"] / stats["wall_seconds"], 3) if stats["wall_seconds"] else 0.0,
+        "page_latency_p50": round(_percentile(gaps, 50), 4),
+        "page_latency_p95": round(_percentile(gaps, 95), 4),
+        "page_latency_p99": round(_percentile(gaps, 99), 4),
+        "requests_served": len(log),
+        "peak_rss_mb": round(stats["peak_rss_kb"] / 1024, 1),
+        "children_peak_rss_mb": round(stats["children_peak_rss_kb"] / 1024, 1),
+        "summary_bytes": summary_bytes,
+        "screenshot_bytes": screenshot_bytes,
+        "output_bytes": summary_bytes + screenshot_bytes,
+    })
+    return result
+
+
+# (metric, True if higher is better)
+_COMPARED = (("pages_per_second", True), ("page_latency_p95", False), ("peak_rss_mb", False), ("output_bytes", False))
+
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """Lines describing metrics that got worse than ``baseline`` by more than ``threshold``."""
+    before = {(r["fixture"], r["engine"], r.get("shards", 1), r.get("parser", "auto")): r for r in baseline if "error" not in r}
+    regressions = []
+    for r in current:
+        old = before.get((r["fixture"], r["engine"], r.get("shards", 1), r.get("parser", "auto")))
+        if old is None or "error" in r:
+            continue
+        for metric, higher_is_better in _COMPARED:
+            a, b = old.get(metric), r.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{r['fixture']}/{r['engine']} {metric}: {a} -> {b} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description="Offline WebsiteExplorer benchmark on synthetic local sites")
+    p.add_argument("--fixtures", default=",".join(SHAPES + ("mixed",)), help="Comma-separated: " + ", ".join(SHAPES + ("mixed",)))
+    p.add_argument("--engines", default=",".join(ENGINES))
+    p.add_argument("--pages", type=int, default=100, help="Pages per generated site")
+    p.add_argument("--max-pages", type=int, default=None, help="Crawl budget (default: --pages)")
+    p.add_argument("--max-links", type=int, default=30, help="max_links_per_page")
+    p.add_argument("--fanout", type=int, default=10)
+    p.add_argument("--image-kb", type=int, default=200)
+    p.add_argument("--slow-ms", type=int, default=300)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--shards", type=int, default=1, help="Worker processes per crawl (sharded mode when > 1)")
+    p.add_argument("--parser", default="auto", help="HTML parser for the requests engine: auto, lxml or html.parser")
+    p.add_argument("--no-screenshot", action="store_true", help="Skip Playwright screenshots")
+    p.add_argument("--timeout", type=float, default=600.0, help="Seconds per crawl")
+    p.add_argument("--out", default=None, help="Write results JSON here")
+    p.add_argument("--compare", default=None, help="Earlier results JSON; exit 1 on regressions")
+    p.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+    args = p.parse_args()
+
+    fixtures = [f for f in args.fixtures.split(",") if f]
+    engines = [e for e in args.engines.split(",") if e]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fixture in fixtures:
+            for engine in engines:
+                results.append(run_case(fixture, engine, args, tmp))
+                print(json.dumps(results[-1]), file=sys.stderr)
+
+    payload: Dict[str, Any] = {
+        "created_at": int(time.time()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+    regressions: Optional[List[str]] = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        payload["regressions"] = regressions
+    text = json.dumps(payload, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    if regressions:
+        print("\n".join(["Regressions:"] + regressions), file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Import-time benchmark for the storyboardpy CLI entry points.
+
+Each case runs in a fresh interpreter (like backend/server.js does per request)
+and is measured twice: as shipped ("lazy") and with every heavy dependency
+imported up front ("eager"), which is what the CLI used to pay. The saving is
+eager minus lazy.
+
+    python benchmarks/bench_imports.py --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["cohere", "playwright.async_api", "bs4", "requests", "dotenv"]
+
+CASES = {
+    "help": ["--help"],
+    "scan --help": ["scan", "--help"],
+    "storyboard --help": ["storyboard", "--help"],
+    # Argument parsing for a real scan, stopping before any network I/O
+    "scan (startup)": ["scan", "--url", "https://example.com"],
+}
+
+# Runs the CLI up to dispatch, then reports which heavy modules got imported.
+_RUNNER = r"""
+import sys, json
+eager = {eager!r}
+if eager:
+    import importlib
+    for name in {heavy!r}:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+from storyboardpy import cli
+sys.argv = ["storyboardpy"] + {argv!r}
+parser = cli.build_parser()
+try:
+    parser.parse_args()
+except SystemExit:
+    pass
+loaded = [m for m in {heavy!r} if m in sys.modules]
+sys.stderr.write(json.dumps(loaded))
+"""
+
+
+def _run_once(argv: List[str], eager: bool) -> Dict[str, Any]:
+    code = _RUNNER.format(eager=eager, heavy=HEAVY_MODULES, argv=argv)
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    try:
+        loaded = json.loads(proc.stderr.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        loaded = []
+    return {"seconds": elapsed, "loaded": loaded}
+
+
+def bench_case(argv: List[str], repeat: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"argv": argv}
+    for mode, eager in (("lazy", False), ("eager", True)):
+        runs = [_run_once(argv, eager) for _ in range(repeat)]
+        times = [r["seconds"] for r in runs]
+        result[mode] = {
+            "median_ms": round(statistics.median(times) * 1000, 1),
+            "min_ms": round(min(times) * 1000, 1),
+            "heavy_modules_loaded": runs[-1]["loaded"],
+        }
+    result["saving_ms"] = round(result["eager"]["median_ms"] - result["lazy"]["median_ms"], 1)
+    return result
+
+
+def main():
+    p = argparse.ArgumentParser(description="Measure storyboardpy CLI import/startup time per subcommand")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--out", default=None, help="Write results JSON here")
+    args = p.parse_args()
+
+    baseline = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=False)
+        baseline.append(time.perf_counter() - started)
+    results = {name: bench_case(argv, args.repeat) for name, argv in CASES.items()}
+    payload = {
+        "python": sys.version.split()[0],
+        "interpreter_startup_ms": round(statistics.median(baseline) * 1000, 1),
+        "cases": results,
+    }
+    text = json.dumps(payload, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
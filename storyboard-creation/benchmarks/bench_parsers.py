@@ -0,0 +1,124 @@
+"""HTML parser backend benchmark for the requests engine.
+
+Parses the same documents with every backend in ``storyboardpy.parsers``,
+reports pages/s and MB/s per backend, and checks that each backend's output
+matches the ``html.parser`` reference field for field (structure tokens
+excluded, see ``LxmlParser``). Documents are generated fixture pages (see
+``crawl_fixtures.py``) plus, with ``--html-dir``, any ``*.html`` files found
+there, e.g. a saved copy of a real site.
+
+    python benchmarks/bench_parsers.py --pages 300
+    python benchmarks/bench_parsers.py --html-dir ~/mirror/docs --repeat 3 --out parsers.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crawl_fixtures import SHAPES, build_site  # noqa: E402
+from storyboardpy.parsers import PARSERS  # noqa: E402
+
+URL = "https://fixture.local/"
+
+
+def load_documents(args: argparse.Namespace) -> List[Tuple[str, str]]:
+    site = build_site(pages=args.pages, shapes=SHAPES, fanout=args.fanout, image_kb=1, seed=args.seed)
+    docs = [(path, page.body.decode("utf-8")) for path, page in sorted(site.items()) if page.content_type.startswith("text/html")]
+    if args.html_dir:
+        for dirpath, _, files in os.walk(os.path.expanduser(args.html_dir)):
+            for name in sorted(files):
+                if name.endswith((".html", ".htm")) and len(docs) < args.pages + args.max_files:
+                    with open(os.path.join(dirpath, name), "r", encoding="utf-8", errors="replace") as f:
+                        docs.append((os.path.join(dirpath, name), f.read()))
+    return docs
+
+
+def _comparable(parsed: Any) -> Dict[str, Any]:
+    data = asdict(parsed)
+    data.pop("structure")
+    return data
+
+
+def run_backend(name: str, docs: List[Tuple[str, str]], repeat: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    try:
+        parser = PARSERS[name]()
+    except ImportError as e:
+        return {"parser": name, "error": f"{type(e).__name__}: {e}"}, []
+    outputs = [_comparable(parser.parse(html, URL)) for _, html in docs]  # also warms up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _, html in docs:
+            parser.parse(html, URL)
+        best = min(best, time.perf_counter() - started)
+    size_mb = sum(len(html.encode("utf-8")) for _, html in docs) / 1e6
+    result = {
+        "parser": name,
+        "documents": len(docs),
+        "seconds": round(best, 4),
+        "pages_per_second": round(len(docs) / best, 1) if best else 0.0,
+        "mb_per_second": round(size_mb / best, 2) if best else 0.0,
+        "ms_per_page": round(1000 * best / len(docs), 3) if docs else 0.0,
+    }
+    if hasattr(parser, "fallbacks"):
+        # Counted once per parse over warm-up plus repeats
+        result["fallback_documents"] = parser.fallbacks // (repeat + 1)
+    return result, outputs
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare HTML parser backends of the requests engine")
+    p.add_argument("--pages", type=int, default=200, help="Generated fixture pages")
+    p.add_argument("--fanout", type=int, default=10)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--html-dir", default=None, help="Also parse *.html files under this directory")
+    p.add_argument("--max-files", type=int, default=2000, help="Cap on files taken from --html-dir")
+    p.add_argument("--repeat", type=int, default=3, help="Timed passes per backend (best is reported)")
+    p.add_argument("--out", default=None, help="Write results JSON here")
+    args = p.parse_args()
+
+    docs = load_documents(args)
+    results = []
+    reference = None
+    for name in PARSERS:
+        result, outputs = run_backend(name, docs, args.repeat)
+        if name == "html.parser":
+            reference = outputs
+        elif reference is not None and outputs:
+            mismatches = [docs[i][0] for i, (a, b) in enumerate(zip(reference, outputs)) if a != b]
+            result["mismatches"] = len(mismatches)
+            result["mismatched_documents"] = mismatches[:20]
+        results.append(result)
+        print(json.dumps(result), file=sys.stderr)
+
+    base = next((r for r in results if r["parser"] == "html.parser" and "error" not in r), None)
+    for r in results:
+        if base and "error" not in r:
+            r["speedup"] = round(base["seconds"] / r["seconds"], 2) if r["seconds"] else 0.0
+
+    payload = {
+        "created_at": int(time.time()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    text = json.dumps(payload, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    if any(r.get("mismatches") for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
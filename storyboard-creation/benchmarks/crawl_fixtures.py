@@ -0,0 +1,185 @@
+"""Synthetic websites for crawler benchmarks, served from a local HTTP server.
+
+A site is a dict of path -> ``FixturePage``. Shapes can be mixed, e.g.
+``build_site(200, shapes=["fanout", "spa", "duplicates"])``:
+
+- ``fanout``: static pages, each linking to ``fanout`` others plus a nav bar,
+  buttons and a signup form
+- ``spa``: an empty shell whose content and links are rendered by inline JS
+  (only the Playwright engine sees them)
+- ``images``: pages carrying ``images_per_page`` incompressible PNGs of
+  ``image_kb`` each
+- ``slow``: every ``slow_every``-th page answers after ``slow_ms``
+- ``duplicates``: links use query, fragment and trailing-slash variants of
+  the same page
+
+    with serve_site(build_site(100)) as base_url:
+        ...
+"""
+import contextlib
+import random
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+SHAPES = ("fanout", "spa", "images", "slow", "duplicates")
+
+_WORDS = (
+    "pricing plans docs guide api reference dashboard analytics billing invoices team "
+    "settings integrations webhooks search reports export import onboarding workflow "
+    "security audit usage limits support contact blog changelog status login signup"
+).split()
+
+
+@dataclass
+class FixturePage:
+    body: bytes
+    content_type: str = "text/html; charset=utf-8"
+    delay_seconds: float = 0.0
+
+
+def _png(width: int, height: int, rng: random.Random) -> bytes:
+    """A valid RGB PNG of random pixels (so it does not compress)."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _phrase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize()
+
+
+def _static_body(i: int, links: List[Tuple[str, str]], nav: List[Tuple[str, str]], images: List[str], rng: random.Random) -> str:
+    nav_html = "".join(f'<a href="{href}">{text}</a>' for text, href in nav)
+    links_html = "".join(f'<li><a href="{href}" class="card-link">{text}</a></li>' for text, href in links)
+    imgs_html = "".join(f'<img src="{src}" alt="figure">' for src in images)
+    sections = "".join(
+        f"<section><h2>{_phrase(rng, 3)}</h2><p>{_phrase(rng, 40)}</p>"
+        f'<button class="btn primary" aria-label="{_phrase(rng, 2)}">{_phrase(rng, 2)}</button></section>'
+        for _ in range(4)
+    )
+    return (
+        f"<!doctype html><html><head><title>Page {i} - {_phrase(rng, 2)}</title>"
+        f'<meta name="description" content="{_phrase(rng, 12)}"></head><body>'
+        f"<header><nav>{nav_html}</nav></header><main><h1>{_phrase(rng, 4)}</h1>{sections}{imgs_html}"
+        f"<ul>{links_html}</ul>"
+        f'<form id="signup-{i}"><input name="email" type="email" placeholder="you@example.com">'
+        f'<input name="company" placeholder="Company"><button type="submit">Sign up</button></form>'
+        f"</main><footer><a href=\"/legal/terms\">Terms</a><a href=\"/legal/privacy\">Privacy</a></footer></body></html>"
+    )
+
+
+def _spa_body(i: int, links: List[Tuple[str, str]], rng: random.Random) -> str:
+    items = ",".join(f'["{text}","{href}"]' for text, href in links)
+    return (
+        f"<!doctype html><html><head><title>App {i}</title></head><body><div id=\"app\"></div><script>"
+        f"const links=[{items}];const app=document.getElementById('app');"
+        f"app.innerHTML='<nav>'+links.slice(0,5).map(l=>'<a href=\"'+l[1]+'\">'+l[0]+'</a>').join('')+'</nav>'"
+        f"+'<h1>{_phrase(rng, 3)}</h1><h2>{_phrase(rng, 3)}</h2>'"
+        f"+links.map(l=>'<button role=\"button\" onclick=\"location.href=\\''+l[1]+'\\'\">'+l[0]+'</button><a href=\"'+l[1]+'\">'+l[0]+'</a>').join('');"
+        f"</script></body></html>"
+    )
+
+
+def _variants(href: str, rng: random.Random) -> str:
+    return rng.choice([href, href + "/", href + "?utm_source=bench", href + "#top", href + "?ref=nav&utm_medium=x"])
+
+
+def build_site(
+    pages: int = 100,
+    shapes: Sequence[str] = ("fanout",),
+    fanout: int = 10,
+    images_per_page: int = 4,
+    image_kb: int = 200,
+    slow_every: int = 5,
+    slow_ms: int = 300,
+    seed: int = 0,
+) -> Dict[str, FixturePage]:
+    unknown = set(shapes) - set(SHAPES)
+    if unknown:
+        raise ValueError(f"Unknown fixture shapes: {sorted(unknown)}")
+    rng = random.Random(seed)
+    site: Dict[str, FixturePage] = {}
+    paths = ["/"] + [f"/p/{i}" for i in range(1, pages)]
+    nav = [(w.capitalize(), paths[min(len(paths) - 1, k * 7 + 1)]) for k, w in enumerate(("pricing", "docs", "dashboard", "blog", "contact"))]
+
+    image_paths: List[str] = []
+    if "images" in shapes:
+        side = max(8, int((image_kb * 1024 / 3) ** 0.5))
+        for n in range(images_per_page * 2):
+            path = f"/img/{n}.png"
+            site[path] = FixturePage(_png(side, side, rng), "image/png")
+            image_paths.append(path)
+
+    for i, path in enumerate(paths):
+        targets = rng.sample(paths, min(fanout, len(paths)))
+        if "duplicates" in shapes:
+            targets = [_variants(t, rng) for t in targets] + [_variants(t, rng) for t in targets[:3]]
+        links = [(_phrase(rng, 2), t) for t in targets]
+        if "spa" in shapes and i % 2 == 1:
+            body = _spa_body(i, links, rng)
+        else:
+            images = rng.sample(image_paths, min(images_per_page, len(image_paths))) if image_paths else []
+            body = _static_body(i, links, nav, images, rng)
+        delay = slow_ms / 1000.0 if "slow" in shapes and i and i % slow_every == 0 else 0.0
+        site[path] = FixturePage(body.encode("utf-8"), delay_seconds=delay)
+    for path in ("/legal/terms", "/legal/privacy"):
+        site[path] = FixturePage(_static_body(0, [], nav, [], rng).encode("utf-8"))
+    return site
+
+
+class _Handler(BaseHTTPRequestHandler):
+    site: Dict[str, FixturePage] = {}
+    log: List[Tuple[float, str, str]] = []
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path != "/" and path.endswith("/"):
+            path = path.rstrip("/")
+        page = self.site.get(path)
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if page.delay_seconds:
+            time.sleep(page.delay_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", page.content_type)
+        self.send_header("Content-Length", str(len(page.body)))
+        self.end_headers()
+        self.wfile.write(page.body)
+        self.log.append((time.perf_counter(), self.path, page.content_type))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve_site(site: Dict[str, FixturePage], log: Optional[List[Tuple[float, str, str]]] = None) -> Iterator[str]:
+    """Serve ``site`` on an ephemeral localhost port; yields the base URL.
+
+    Each answered request is appended to ``log`` as (perf_counter, path, content type).
+    """
+    handler = type("FixtureHandler", (_Handler,), {"site": site, "log": log if log is not None else []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
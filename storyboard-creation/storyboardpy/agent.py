@@ -1,27 +1,39 @@
 import json
 import os
-from typing import Any, Dict, Optional, Iterable
+from typing import Any, Dict, Optional, Iterable, Tuple
 import io
 import contextlib
 import asyncio
 import inspect
 import re
+import time
 
-from dotenv import load_dotenv
-import cohere
-from .schemas import STORYBOARD_JSON_SCHEMA
+from .hedge import HedgePolicy, HedgeStats, hedged_completion
+from .llm import LLMBackend, backend_from_env
+from .retrieval import SiteIndex, pick, rank_pages
+from .schemas import STORYBOARD_JSON_SCHEMA, STORYBOARD_OUTPUT_SCHEMA, STORYBOARD_RESPONSE_SCHEMA, schema_errors
+from .usage import CallUsage, UsageStats, parse_prices
 
 
 class StoryboardAgent:
-    """Generates storyboard JSON using Cohere Chat API."""
+    """Generates storyboard JSON using Cohere Chat API (or another LLMBackend)."""
+
+    # Lower temperature for more focused responses
+    llm_temperature = 0.1
+    llm_max_tokens = 4000
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        backend: Optional[LLMBackend] = None,
+        hedge: Optional[HedgePolicy] = None,
+        structured_output: bool = False,
+    ):
+        from dotenv import load_dotenv
 
-    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
         load_dotenv()
-        if not os.getenv("COHERE_API_KEY"):
-            raise RuntimeError("COHERE_API_KEY not set. Provide via environment or .env file.")
 
-        self.api_key = os.getenv("COHERE_API_KEY")
-        
         # Model resolution: explicit arg > COHERE_MODEL > default
         self.model = (
             model
@@ -40,8 +52,18 @@ class StoryboardAgent:
         except ValueError:
             self.timeout_seconds = 120
 
-        # Initialize Cohere client
-        self.co = cohere.Client(self.api_key)
+        # Backend resolution: explicit arg > STORYBOARD_CASSETTE > Cohere client
+        self.backend = backend or backend_from_env(timeout_seconds=self.timeout_seconds)
+
+        # Optional backup attempt for slow or unusable completions (see hedge.HedgePolicy)
+        self.hedge = hedge
+        self.hedge_stats = HedgeStats()
+
+        # Constrain decoding to STORYBOARD_OUTPUT_SCHEMA where the backend supports it
+        self.structured_output = structured_output
+
+        # Token/latency accounting for every call; COHERE_PRICES enables cost estimates
+        self.usage = UsageStats(parse_prices(os.getenv("COHERE_PRICES")))
 
     def _safe_slice(self, text: Optional[str], max_length: int) -> str:
         """Safely slice text, handling None values."""
@@ -92,48 +114,54 @@ class StoryboardAgent:
             f'  }}\n'
             f"}}\n\n"
             f"Website data to base the demo on:\n"
-            f"{json.dumps(self._trim_site_summary(site_summary), indent=1)}\n\n"
+            f"{json.dumps(self._trim_site_summary(site_summary, query=f'{persona} {goal}'), indent=1)}\n\n"
             f"Create a storyboard that demonstrates THIS specific website, not a generic example."
         )
 
-    def _trim_site_summary(self, site_summary: Dict[str, Any]) -> Dict[str, Any]:
-        """Trim site summary for token efficiency with safe None handling."""
+    def _trim_site_summary(self, site_summary: Dict[str, Any], query: str = "") -> Dict[str, Any]:
+        """Trim site summary for token efficiency with safe None handling.
+
+        With a ``query`` (persona and goal), pages and elements are chosen by
+        BM25 relevance over the whole crawl instead of taking the first ones;
+        the size budget is the same either way.
+        """
         if not site_summary or not isinstance(site_summary, dict):
             return {"engine": "unknown", "start_url": "", "pages": []}
         
         pages = site_summary.get("pages", [])
         if not isinstance(pages, list):
             pages = []
+
+        scores = SiteIndex.from_site_summary(site_summary).scores(query) if query else {}
+        if scores:
+            # Landing page for context, then the pages that best match the goal
+            ranked = [pi for pi in rank_pages(scores, len(pages)) if pi != 0]
+            page_ids = sorted([0] + ranked[:2]) if pages else []
+        else:
+            page_ids = list(range(len(pages)))
         
         # Trim more aggressively for token efficiency
-        pages = pages[:3]  # Reduced from 8 to 3
+        page_ids = page_ids[:3]  # Reduced from 8 to 3
         trimmed_pages = []
+
+        def _items(p: Dict[str, Any], pi: int, field: str, kind: str, limit: int) -> list:
+            items = p.get(field, [])
+            if not isinstance(items, list):
+                return []
+            return [items[i] for i in pick(scores, pi, kind, len(items), limit)]
         
-        for p in pages:
+        for pi in page_ids:
+            p = pages[pi]
             if not isinstance(p, dict):
                 continue
                 
             # Safely get and trim clickables
-            clickables = p.get("clickables", [])
-            if not isinstance(clickables, list):
-                clickables = []
-            clickables = clickables[:15]  # Increased to get more context
+            clickables = _items(p, pi, "clickables", "clickable", 15)  # Increased to get more context
             
             # Safely get other fields
-            forms = p.get("forms", [])
-            if not isinstance(forms, list):
-                forms = []
-            forms = forms[:5]
-            
-            headings = p.get("headings", [])
-            if not isinstance(headings, list):
-                headings = []
-            headings = headings[:8]  # Increased to get more context
-            
-            nav_links = p.get("nav_links", [])
-            if not isinstance(nav_links, list):
-                nav_links = []
-            nav_links = nav_links[:10]
+            forms = _items(p, pi, "forms", "form", 5)
+            headings = _items(p, pi, "headings", "heading", 8)  # Increased to get more context
+            nav_links = _items(p, pi, "nav_links", "nav", 10)
             
             features_guess = p.get("features_guess", [])
             if not isinstance(features_guess, list):
@@ -214,24 +242,83 @@ class StoryboardAgent:
         data["transcript"]["segments"] = fixed_segments
         return data
 
-    def _invoke_cohere(self, prompt: str) -> str:
-        """Invoke Cohere Chat API."""
+    def _output_schema(self) -> Optional[Dict[str, Any]]:
+        return STORYBOARD_OUTPUT_SCHEMA if self.structured_output else None
+
+    def _invoke_llm(self, prompt: str, call: CallUsage) -> str:
+        """Invoke the configured LLM backend, streaming to time the first token."""
+        started = time.perf_counter()
+        usage: Dict[str, Any] = {}
+        parts = []
+        for chunk in self.backend.stream(
+            prompt,
+            model=self.model,
+            temperature=self.llm_temperature,
+            max_tokens=self.llm_max_tokens,
+            usage=usage,
+            schema=self._output_schema(),
+        ):
+            if not parts:
+                call.first_token_seconds = round(time.perf_counter() - started, 4)
+            parts.append(chunk)
+        call.update(usage)
+        return "".join(parts)
+
+    async def _generate(self, prompt: str) -> Tuple[str, CallUsage]:
+        call = CallUsage(model=self.model, backend=self.backend.name, prompt_chars=len(prompt))
+        started = time.perf_counter()
         try:
-            response = self.co.chat(
-                model=self.model,
-                message=prompt,
-                temperature=0.1,  # Lower temperature for more focused responses
-                max_tokens=4000
-            )
-            
-            # Extract text from chat response
-            if hasattr(response, 'text'):
-                return response.text
+            if self.hedge is None:
+                # Run the blocking backend call off the event loop so concurrent storyboards overlap
+                text = await asyncio.to_thread(self._invoke_llm, prompt, call)
             else:
-                raise RuntimeError(f"Chat response has no text attribute: {response}")
-            
+                text, info = await hedged_completion(
+                    self.backend, prompt, self.model, self.llm_temperature, self.llm_max_tokens,
+                    self.hedge, self.hedge_stats, self._is_usable, schema=self._output_schema(),
+                )
+                call.model = info["model"]
+                call.retries = info["attempts"] - 1
+                call.hedge_reason = info["hedge_reason"]
+                call.first_token_seconds = info["first_token_seconds"]
+                call.update(info["usage"])
         except Exception as e:
-            raise RuntimeError(f"Cohere API request failed: {e}")
+            call.seconds = round(time.perf_counter() - started, 4)
+            call.error = str(e)[:200]
+            self.usage.record(call)
+            raise
+        call.seconds = round(time.perf_counter() - started, 4)
+        return text, call
+
+    def _parse_response(self, content_text: str) -> Dict[str, Any]:
+        try:
+            return json.loads(content_text)
+        except json.JSONDecodeError:
+            # Try extracting JSON from text
+            start = content_text.find('{')
+            end = content_text.rfind('}')
+            if start != -1 and end != -1 and end > start:
+                snippet = content_text[start:end+1]
+                try:
+                    return json.loads(snippet)
+                except json.JSONDecodeError:
+                    pass
+            raise RuntimeError(f"Cohere did not return valid JSON. Raw response: {content_text[:1000]}")
+
+    def _is_usable(self, content_text: str) -> bool:
+        """True when a response parses and matches the shape the prompt asks for."""
+        try:
+            data = self._parse_response(content_text)
+        except RuntimeError:
+            return False
+        return not schema_errors(data, STORYBOARD_RESPONSE_SCHEMA, limit=1)
+
+    def usage_report(self) -> Dict[str, Any]:
+        """Token, latency and cost totals over every call this agent made."""
+        return self.usage.snapshot()
+
+    def hedge_report(self) -> Optional[Dict[str, Any]]:
+        """Hedge counters and the current hedge delay (None when hedging is off)."""
+        return self.hedge_stats.snapshot(self.hedge) if self.hedge else None
 
     async def create_storyboard_async(
         self,
@@ -245,24 +332,16 @@ class StoryboardAgent:
             site_summary = {"engine": "unknown", "start_url": "", "pages": []}
         
         prompt = self._build_prompt(site_summary, duration_hint, persona, goal)
-        result = self._invoke_cohere(prompt)
-        content_text = result
-
-        # Try to parse JSON
+        content_text, call = await self._generate(prompt)
         try:
-            data = json.loads(content_text)
-        except json.JSONDecodeError as e:
-            # Try extracting JSON from text
-            start = content_text.find('{')
-            end = content_text.rfind('}')
-            if start != -1 and end != -1 and end > start:
-                snippet = content_text[start:end+1]
-                try:
-                    data = json.loads(snippet)
-                except json.JSONDecodeError as e2:
-                    raise RuntimeError(f"Cohere did not return valid JSON. Raw response: {content_text[:1000]}")
-            else:
-                raise RuntimeError(f"Cohere did not return valid JSON. Raw response: {content_text[:1000]}")
+            data = self._parse_response(content_text)
+        except RuntimeError:
+            call.parsed = False
+            self.usage.record(call)
+            raise
+        call.parsed = True
+        call.schema_valid = not schema_errors(data, STORYBOARD_RESPONSE_SCHEMA, limit=1)
+        self.usage.record(call)
 
         # Validate required fields and add defaults if missing
         required_fields = {
@@ -282,6 +361,9 @@ class StoryboardAgent:
         # Fix transcript structure for CLI compatibility
         data = self._fix_transcript_structure(data)
 
+        # How this storyboard was produced: tokens, latency, retries, finish reason
+        data["generation"] = call.as_dict()
+
         return data
 
     def create_storyboard(
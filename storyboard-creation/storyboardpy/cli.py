@@ -2,12 +2,14 @@ import argparse
 import asyncio
 import json
 import os
-from typing import Optional, List, Dict, Any
+import sys
+import time
+from typing import Optional, List, Dict, Any, TYPE_CHECKING
 
-from dotenv import load_dotenv
-
-from .explorer import WebsiteExplorer
-from .agent import StoryboardAgent
+# Heavy modules (agent -> cohere, explorer -> playwright/bs4/requests, dotenv) are
+# imported inside the commands that use them so `scan` and `--help` start fast.
+if TYPE_CHECKING:
+    from .llm import LLMBackend
 
 
 def _ensure_dir(path: Optional[str]):
@@ -63,17 +65,101 @@ def _render_transcript_text(segments: List[Dict[str, Any]]) -> str:
     return "\n".join(lines) + ("\n" if lines else "")
 
 
-async def cmd_scan(args: argparse.Namespace):
-    explorer = WebsiteExplorer(
-        start_url=args.url,
-        max_pages=args.max_pages,
-        same_origin_only=not args.cross_origin,
-        artifacts_dir=args.artifacts_dir,
-        headless=not args.headed,
-        max_links_per_page=args.max_links_per_page,
-        screenshot=not args.no_screenshot,
+def _replay_latency(value: str) -> str:
+    """argparse type for --replay-latency: 'recorded' or a non-negative number of seconds."""
+    if value == "recorded":
+        return value
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = -1.0
+    if not seconds >= 0:
+        raise argparse.ArgumentTypeError(f"expected seconds >= 0 or 'recorded', got {value!r}")
+    return value
+
+
+def _cohere_timeout() -> int:
+    # Same default and fallback as StoryboardAgent
+    try:
+        return int(os.getenv("COHERE_TIMEOUT_SECONDS", "120"))
+    except ValueError:
+        return 120
+
+
+def _build_backend(args: argparse.Namespace) -> Optional["LLMBackend"]:
+    # None lets StoryboardAgent pick its default (env-configured) backend
+    cassette = getattr(args, "cassette", None)
+    if not cassette:
+        return None
+    from .llm import CassetteBackend, CohereBackend
+
+    mode = getattr(args, "cassette_mode", "replay")
+    latency = getattr(args, "replay_latency", "0")
+    return CassetteBackend(
+        cassette,
+        mode=mode,
+        inner=CohereBackend(timeout_seconds=_cohere_timeout()) if mode == "record" else None,
+        strict=not getattr(args, "replay_any", False),
+        latency_seconds=None if latency == "recorded" else float(latency),
+        error_rate=getattr(args, "replay_error_rate", 0.0),
     )
+
+
+def _build_hedge(args: argparse.Namespace):
+    spec = getattr(args, "hedge", None)
+    if not spec:
+        return None
+    from .hedge import HedgePolicy
+
+    try:
+        return HedgePolicy.parse(spec, trigger=getattr(args, "hedge_trigger", "first_token"), fallback_model=getattr(args, "hedge_model", None))
+    except ValueError as e:
+        raise SystemExit(f"--hedge: {e}")
+
+
+def _open_store(args: argparse.Namespace):
+    """(ArtifactStore, request_id) when --store is given, else (None, None)."""
+    root = getattr(args, "store", None)
+    if not root:
+        return None, None
+    from .store import ArtifactStore
+
+    request_id = getattr(args, "request_id", None) or str(int(time.time() * 1000))
+    return ArtifactStore(root), request_id
+
+
+async def cmd_scan(args: argparse.Namespace):
+    from .explorer import WebsiteExplorer
+
+    store, request_id = _open_store(args)
+    if args.resume:
+        # Start URL and crawl limits come from the checkpoint
+        explorer = WebsiteExplorer.resume(args.resume, headless=not args.headed, record_har=args.record_har)
+    else:
+        if not args.url:
+            raise SystemExit("scan needs --url (or --resume STATE)")
+        explorer = WebsiteExplorer(
+            start_url=args.url,
+            max_pages=args.max_pages,
+            same_origin_only=not args.cross_origin,
+            artifacts_dir=args.artifacts_dir or (store.staging_dir(request_id) if store else None),
+            headless=not args.headed,
+            max_links_per_page=args.max_links_per_page,
+            screenshot=not args.no_screenshot,
+            state_path=args.state,
+            engine=None if args.engine == "auto" else args.engine,
+            shards=args.shards,
+            template_policy=args.templates,
+            parser=args.parser,
+            frontier=args.frontier,
+            sitemap=not args.no_sitemap,
+            record_har=args.record_har,
+            replay_har=args.replay_har,
+        )
     site_summary = await explorer.explore()
+    if store:
+        store.ingest_site_summary(request_id, site_summary)
+        print(f"Stored artifacts for request {request_id} in {store.root}")
     if args.site_out:
         _ensure_dir(args.site_out)
         with open(args.site_out, "w", encoding="utf-8") as f:
@@ -84,22 +170,42 @@ async def cmd_scan(args: argparse.Namespace):
 
 
 async def cmd_storyboard(args: argparse.Namespace):
+    from dotenv import load_dotenv
+    from .agent import StoryboardAgent
+
+    load_dotenv()
+
+    store, request_id = _open_store(args)
     if args.site_in:
         with open(args.site_in, "r", encoding="utf-8") as f:
             site_summary = json.load(f)
     else:
+        from .explorer import WebsiteExplorer
+
         explorer = WebsiteExplorer(
             start_url=args.url,
             max_pages=args.max_pages,
             same_origin_only=not args.cross_origin,
-            artifacts_dir=args.artifacts_dir,
+            artifacts_dir=args.artifacts_dir or (store.staging_dir(request_id) if store else None),
             headless=not args.headed,
             max_links_per_page=args.max_links_per_page,
             screenshot=not args.no_screenshot,
+            template_policy=getattr(args, "templates", "defer"),
+            parser=getattr(args, "parser", "auto"),
+            frontier=getattr(args, "frontier", "priority"),
+            sitemap=not getattr(args, "no_sitemap", False),
         )
         site_summary = await explorer.explore()
+        if store:
+            store.ingest_site_summary(request_id, site_summary)
 
-    agent = StoryboardAgent(model=args.model, temperature=args.temperature)
+    agent = StoryboardAgent(
+        model=args.model,
+        temperature=args.temperature,
+        backend=_build_backend(args),
+        hedge=_build_hedge(args),
+        structured_output=getattr(args, "structured_output", False),
+    )
     storyboard = await agent.create_storyboard_async(
         site_summary=site_summary,
         duration_hint=args.duration_hint,
@@ -107,6 +213,11 @@ async def cmd_storyboard(args: argparse.Namespace):
         goal=args.goal,
     )
 
+    _print_generation(storyboard.get("generation") or {})
+
+    if getattr(args, "validate_selectors", False):
+        _check_selectors(storyboard, site_summary, args.selector_report)
+
     if args.out:
         _ensure_dir(args.out)
         with open(args.out, "w", encoding="utf-8") as f:
@@ -127,6 +238,203 @@ async def cmd_storyboard(args: argparse.Namespace):
     with open(tx_out, "w", encoding="utf-8") as f:
         f.write(transcript_text)
     print(f"Saved transcript: {tx_out}")
+    if store:
+        store.ingest_storyboard(request_id, storyboard, transcript_text)
+        print(f"Stored storyboard for request {request_id} in {store.root}")
+
+
+def _print_generation(gen: Dict[str, Any]) -> None:
+    """One stderr line of LLM accounting, so it never mixes with JSON on stdout."""
+    if not gen:
+        return
+    tokens = "unknown tokens"
+    if gen.get("prompt_tokens") is not None:
+        tokens = f"{gen['prompt_tokens']} prompt + {gen.get('completion_tokens') or 0} completion tokens"
+    first = f" (first token {gen['first_token_seconds']:.2f}s)" if gen.get("first_token_seconds") is not None else ""
+    extra = "".join([
+        f", {gen['retries']} retries" if gen.get("retries") else "",
+        f", ${gen['cost_usd']:.4f}" if gen.get("cost_usd") is not None else "",
+        ", TRUNCATED" if gen.get("truncated") else "",
+    ])
+    print(
+        f"LLM: {gen.get('model')}, {tokens}, {gen.get('seconds') or 0:.2f}s{first}, "
+        f"finish {gen.get('finish_reason') or 'unknown'}{extra}",
+        file=sys.stderr,
+    )
+
+
+def _check_selectors(storyboard: Dict[str, Any], site_summary: Dict[str, Any], report_out: Optional[str], rewrite: bool = True) -> Dict[str, Any]:
+    from .selector_index import SelectorIndex, summarize_report, validate_storyboard
+
+    index = SelectorIndex.from_site_summary(site_summary)
+    report = summarize_report(validate_storyboard(storyboard, index, rewrite=rewrite))
+    for check in report["checks"]:
+        if check["status"] == "fuzzy":
+            print(f"Rewrote {check['location']}: {check['selector']!r} -> {check['match']!r} (score {check['score']}, {check['page_url']})")
+        elif check["status"] == "unresolved":
+            print(f"Unresolved {check['location']}: {check['selector']!r}")
+    counts = ", ".join(f"{k}={v}" for k, v in sorted(report["counts"].items())) or "no selectors"
+    print(f"Selector check: {counts}")
+    if report_out:
+        _ensure_dir(report_out)
+        with open(report_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved selector report: {report_out}")
+    return report
+
+
+def cmd_validate_selectors(args: argparse.Namespace):
+    with open(args.site_in, "r", encoding="utf-8") as f:
+        site_summary = json.load(f)
+    with open(args.storyboard_in, "r", encoding="utf-8") as f:
+        storyboard = json.load(f)
+    report = _check_selectors(storyboard, site_summary, args.report_out, rewrite=not args.no_rewrite)
+    if args.out:
+        _ensure_dir(args.out)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(storyboard, f, indent=2)
+        print(f"Saved storyboard: {args.out}")
+    if args.strict and report["counts"].get("unresolved"):
+        raise SystemExit(1)
+
+
+def cmd_timeline(args: argparse.Namespace):
+    from .timeline import compile_timeline
+
+    with open(args.storyboard_in, "r", encoding="utf-8") as f:
+        storyboard = json.load(f)
+    timeline = compile_timeline(storyboard, fps=args.fps)
+    for issue in timeline.issues:
+        where = issue.shot_id or issue.scene_id or "-"
+        print(f"[{issue.kind}] {where}: {issue.message}", file=sys.stderr)
+    if args.out:
+        _ensure_dir(args.out)
+        timeline.save(args.out)
+        print(f"Saved timeline ({timeline.frame_count} frames @ {timeline.fps:g} fps): {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(timeline.to_dict(include_frames=False), indent=2))
+    if args.strict and timeline.issues:
+        raise SystemExit(1)
+
+
+def cmd_preview(args: argparse.Namespace):
+    from .preview import plan_preview, render_preview
+
+    with open(args.storyboard_in, "r", encoding="utf-8") as f:
+        storyboard = json.load(f)
+    with open(args.site_in, "r", encoding="utf-8") as f:
+        site_summary = json.load(f)
+    try:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+    except ValueError:
+        raise SystemExit(f"--size must look like 960x540, got {args.size!r}")
+    # yuv420p needs even dimensions
+    plan = plan_preview(storyboard, site_summary, width=max(2, width - width % 2), height=max(2, height - height % 2), fps=args.fps)
+    if args.out != "-":
+        _ensure_dir(args.out)
+    try:
+        report = render_preview(plan, args.out, workers=args.workers)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    # Keep stdout clean when it carries the frames
+    print(json.dumps(report, indent=2), file=sys.stderr if args.out == "-" else sys.stdout)
+
+
+async def cmd_record(args: argparse.Namespace):
+    from .executor import StoryboardExecutor
+
+    with open(args.storyboard_in, "r", encoding="utf-8") as f:
+        storyboard = json.load(f)
+    scene_states = {}
+    for item in args.scene_state or []:
+        scene_id, _, path = item.partition("=")
+        scene_states[scene_id] = path
+    executor = StoryboardExecutor(
+        storyboard,
+        output_dir=args.out_dir,
+        base_url=args.base_url,
+        workers=args.workers,
+        headless=not args.headed,
+        action_timeout_ms=args.action_timeout_ms,
+        trace=not args.no_trace,
+        pace=not args.no_pace,
+        initial_state=args.state,
+        scene_states=scene_states,
+        continue_on_error=args.continue_on_error,
+    )
+    result = await executor.run()
+    for scene in result["scenes"]:
+        status = "ok" if scene["ok"] else "FAILED"
+        print(f"{scene['scene_id']}: {status} in {scene['wall_seconds']}s -> {scene['video_path']}")
+        for action in scene["actions"]:
+            if not action["ok"] and not action["skipped"]:
+                print(f"  action {action['index']} ({action['type']} {action['selector']}) failed at +{action['started_at']}s after {action['duration_seconds']}s: {action['error']}")
+    if result["video_path"]:
+        print(f"Saved video: {result['video_path']}")
+    elif result["stitch_error"]:
+        print(f"Not stitched: {result['stitch_error']}")
+    print(f"Recorded {len(result['scenes'])} scenes in {result['wall_seconds']}s with {result['workers']} workers")
+    if not result["ok"]:
+        raise SystemExit(1)
+
+
+def _parse_size(value: str) -> int:
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    value = value.strip().lower().rstrip("b")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def cmd_gc(args: argparse.Namespace):
+    from .store import ArtifactStore
+
+    store = ArtifactStore(args.store)
+    day = 86400.0
+    report = store.gc(
+        max_age_seconds=args.max_age_days * day if args.max_age_days is not None else None,
+        max_idle_seconds=args.max_idle_days * day if args.max_idle_days is not None else None,
+        max_total_bytes=_parse_size(args.max_size) if args.max_size else None,
+        dry_run=args.dry_run,
+    )
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {len(report['expired_requests'])} requests and {report['deleted_blobs']} blobs ({report['freed_bytes'] / 1e6:.1f} MB)")
+    stats = store.stats()
+    print(f"Store: {stats['requests']} requests, {stats['blobs']} blobs, {stats['stored_bytes'] / 1e6:.1f} MB stored for {stats['logical_bytes'] / 1e6:.1f} MB of artifacts")
+
+
+def cmd_store_import(args: argparse.Namespace):
+    from .store import ArtifactStore
+
+    store = ArtifactStore(args.store)
+    imported = store.import_legacy(args.backend_dir, remove=args.remove)
+    stats = store.stats()
+    print(f"Imported {imported['files']} files from {imported['requests']} requests")
+    print(f"Store: {stats['blobs']} blobs, {stats['stored_bytes'] / 1e6:.1f} MB stored for {stats['logical_bytes'] / 1e6:.1f} MB of artifacts")
+
+
+async def cmd_serve(args: argparse.Namespace):
+    from dotenv import load_dotenv
+    from .server import StoryboardService, run_service
+
+    load_dotenv()
+    service = StoryboardService(
+        browsers=args.browsers,
+        headless=not args.headed,
+        max_concurrency=args.max_concurrency,
+        model=args.model,
+        temperature=args.temperature,
+        backend=_build_backend(args),
+        hedge=_build_hedge(args),
+        structured_output=args.structured_output,
+        jobs_db=args.jobs_db,
+        workers=args.workers,
+        crawl_limit=args.crawl_limit,
+        llm_limit=args.llm_limit,
+        reuse_seconds=args.reuse_seconds,
+        store=args.store,
+    )
+    await run_service(service, host=args.host, port=args.port, stdio=args.stdio)
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -142,10 +450,43 @@ def build_parser() -> argparse.ArgumentParser:
         sp.add_argument("--artifacts-dir", default=None, help="Directory to save screenshots and artifacts")
         sp.add_argument("--headed", action="store_true", help="Run browser in headed mode (Playwright)")
         sp.add_argument("--no-screenshot", action="store_true")
+        sp.add_argument("--templates", choices=["defer", "skip", "off"], default="defer",
+                        help="Pages matching an already-seen URL pattern and DOM template: crawl them last, skip them, or treat them normally")
+        sp.add_argument("--parser", choices=["auto", "lxml", "html.parser"], default="auto",
+                        help="HTML parser for the requests engine (auto: lxml when installed)")
+        sp.add_argument("--frontier", choices=["priority", "bfs"], default="priority",
+                        help="Crawl order: best-first by link score (pricing, docs, signup, ... first) or breadth-first in page order")
+        sp.add_argument("--no-sitemap", action="store_true", help="Do not seed the priority frontier from robots.txt/sitemap.xml")
+        sp.add_argument("--store", default=None, help="Content-addressed artifact store directory (deduplicates screenshots and summaries)")
+        sp.add_argument("--request-id", default=None, help="Manifest name in --store (default: current time in ms)")
+
+    # LLM args
+    def add_llm(sp):
+        sp.add_argument("--model", default=None)
+        sp.add_argument("--temperature", type=float, default=None)
+        sp.add_argument("--cassette", default=None, help="LLM cassette JSON to record to or replay from (no network in replay)")
+        sp.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+        sp.add_argument("--replay-latency", type=_replay_latency, default="0", help="Simulated latency per replayed call in seconds, or 'recorded'")
+        sp.add_argument("--replay-error-rate", type=float, default=0.0, help="Probability of an injected LLM failure in replay")
+        sp.add_argument("--replay-any", action="store_true", help="Serve recorded responses round-robin when the prompt was never recorded")
+        sp.add_argument("--hedge", default=None, metavar="DELAY",
+                        help="Start a backup LLM attempt after DELAY: seconds (e.g. 8) or a percentile of observed latency (e.g. p95)")
+        sp.add_argument("--hedge-trigger", choices=["first_token", "output"], default="first_token",
+                        help="Hedge when the first streamed token, or the whole output, is late")
+        sp.add_argument("--hedge-model", default=None, help="Model for the backup attempt (default: same model)")
+        sp.add_argument("--structured-output", action="store_true",
+                        help="Constrain the LLM output to the storyboard JSON schema (models without support fall back to plain JSON)")
 
     sp_scan = sub.add_parser("scan", help="Explore a site and output a summary JSON")
     add_common(sp_scan)
     sp_scan.add_argument("--site-out", default=None, help="Path to write the site summary JSON")
+    sp_scan.add_argument("--engine", choices=["auto", "playwright", "requests"], default="auto", help="Crawler engine (auto: Playwright when installed)")
+    sp_scan.add_argument("--shards", type=int, default=1, help="Crawl with this many worker processes (URLs hash-partitioned)")
+    sp_scan.add_argument("--state", default=None, help="Checkpoint the crawl (frontier, visited, pages) to this SQLite file")
+    sp_scan.add_argument("--resume", default=None, metavar="STATE", help="Continue a crawl checkpointed with --state")
+    har = sp_scan.add_mutually_exclusive_group()
+    har.add_argument("--record-har", default=None, metavar="HAR", help="Record all network traffic to this HAR (.har, or .zip for Playwright)")
+    har.add_argument("--replay-har", default=None, metavar="HAR", help="Serve every request from this HAR; requests it lacks are aborted, nothing hits the network")
     sp_scan.set_defaults(func=lambda a: asyncio.run(cmd_scan(a)))
 
     sp_story = sub.add_parser("storyboard", help="Generate a storyboard from a site (existing summary or fresh scan)")
@@ -154,12 +495,82 @@ def build_parser() -> argparse.ArgumentParser:
     sp_story.add_argument("--duration-hint", type=int, default=None, help="Target total duration in seconds")
     sp_story.add_argument("--persona", default="Prospective user")
     sp_story.add_argument("--goal", default="Show the core value and test key flows")
-    sp_story.add_argument("--model", default=None)
-    sp_story.add_argument("--temperature", type=float, default=None)
     sp_story.add_argument("--out", default=None, help="Path to write the storyboard JSON")
     sp_story.add_argument("--transcript-out", default=None, help="Path to write transcript text (default transcript.txt next to --out)")
+    add_llm(sp_story)
+    sp_story.add_argument("--validate-selectors", action="store_true", help="Check selectors against the crawl and rewrite near misses")
+    sp_story.add_argument("--selector-report", default=None, help="Path to write the selector check report JSON")
     sp_story.set_defaults(func=lambda a: asyncio.run(cmd_storyboard(a)))
 
+    sp_sel = sub.add_parser("validate-selectors", help="Check storyboard selectors against a site summary")
+    sp_sel.add_argument("--site-in", required=True, help="Site summary JSON from `scan`")
+    sp_sel.add_argument("--storyboard-in", required=True, help="Storyboard JSON to check")
+    sp_sel.add_argument("--out", default=None, help="Write the (rewritten) storyboard here")
+    sp_sel.add_argument("--report-out", default=None, help="Write the selector report JSON here")
+    sp_sel.add_argument("--no-rewrite", action="store_true", help="Only report; do not rewrite fuzzy matches")
+    sp_sel.add_argument("--strict", action="store_true", help="Exit non-zero if any selector is unresolved")
+    sp_sel.set_defaults(func=cmd_validate_selectors)
+
+    sp_tl = sub.add_parser("timeline", help="Compile a storyboard into per-frame camera keyframes")
+    sp_tl.add_argument("--storyboard-in", required=True, help="Storyboard JSON to compile")
+    sp_tl.add_argument("--fps", type=float, default=30.0)
+    sp_tl.add_argument("--out", default=None, help="Write frames to .npz (compact) or .json")
+    sp_tl.add_argument("--strict", action="store_true", help="Exit non-zero if overlaps, gaps or out-of-range shots are found")
+    sp_tl.set_defaults(func=cmd_timeline)
+
+    sp_pv = sub.add_parser("preview", help="Render a quick preview video from the crawl screenshots and the storyboard's shots")
+    sp_pv.add_argument("--storyboard-in", required=True, help="Storyboard JSON to preview")
+    sp_pv.add_argument("--site-in", required=True, help="Site summary JSON with screenshot_path per page")
+    sp_pv.add_argument("--out", required=True, help="Video file (encoded by ffmpeg), or - / *.rgb for raw rgb24 frames")
+    sp_pv.add_argument("--fps", type=float, default=24.0)
+    sp_pv.add_argument("--size", default="960x540", help="Output WIDTHxHEIGHT")
+    sp_pv.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    sp_pv.set_defaults(func=cmd_preview)
+
+    sp_rec = sub.add_parser("record", help="Replay storyboard actions in Playwright and record each scene")
+    sp_rec.add_argument("--storyboard-in", required=True, help="Storyboard JSON to record")
+    sp_rec.add_argument("--out-dir", required=True, help="Directory for scene videos, traces, states and recording.json")
+    sp_rec.add_argument("--base-url", default=None, help="URL scenes start from (default: first navigate action)")
+    sp_rec.add_argument("--workers", type=int, default=4, help="Scenes recorded concurrently")
+    sp_rec.add_argument("--headed", action="store_true")
+    sp_rec.add_argument("--action-timeout-ms", type=int, default=10000)
+    sp_rec.add_argument("--no-trace", action="store_true", help="Skip Playwright traces")
+    sp_rec.add_argument("--no-pace", action="store_true", help="Do not hold scenes to their duration_seconds")
+    sp_rec.add_argument("--state", default=None, help="Storage state JSON every scene starts from")
+    sp_rec.add_argument("--scene-state", action="append", help="SCENE_ID=PATH storage state for one scene (repeatable)")
+    sp_rec.add_argument("--continue-on-error", action="store_true", help="Keep running a scene's actions after one fails")
+    sp_rec.set_defaults(func=lambda a: asyncio.run(cmd_record(a)))
+
+    sp_gc = sub.add_parser("gc", help="Apply the artifact store retention policy and delete unreferenced blobs")
+    sp_gc.add_argument("--store", required=True, help="Artifact store directory")
+    sp_gc.add_argument("--max-age-days", type=float, default=None, help="Drop requests created longer ago than this")
+    sp_gc.add_argument("--max-idle-days", type=float, default=None, help="Drop requests not accessed for this long")
+    sp_gc.add_argument("--max-size", default=None, help="Keep unique content under this size (e.g. 500M, 2G), least recently used first out")
+    sp_gc.add_argument("--dry-run", action="store_true", help="Report what would be removed")
+    sp_gc.set_defaults(func=cmd_gc)
+
+    sp_imp = sub.add_parser("store-import", help="Move existing artifacts/, site_dumps/ and storyboards/ into the artifact store")
+    sp_imp.add_argument("--store", required=True, help="Artifact store directory")
+    sp_imp.add_argument("--backend-dir", required=True, help="Directory containing artifacts/, site_dumps/ and storyboards/")
+    sp_imp.add_argument("--remove", action="store_true", help="Delete the original files once stored")
+    sp_imp.set_defaults(func=cmd_store_import)
+
+    sp_serve = sub.add_parser("serve", help="Run a long-lived worker with a warm browser pool and LLM client")
+    sp_serve.add_argument("--host", default="127.0.0.1")
+    sp_serve.add_argument("--port", type=int, default=8765)
+    sp_serve.add_argument("--stdio", action="store_true", help="Speak JSON-RPC over stdin/stdout instead of HTTP")
+    sp_serve.add_argument("--browsers", type=int, default=2, help="Warm Chromium browsers kept open")
+    sp_serve.add_argument("--max-concurrency", type=int, default=4, help="Jobs handled at once")
+    sp_serve.add_argument("--headed", action="store_true")
+    sp_serve.add_argument("--jobs-db", default=None, help="SQLite file for the persistent, deduplicating job queue")
+    sp_serve.add_argument("--workers", type=int, default=4, help="Queued jobs run at once (with --jobs-db)")
+    sp_serve.add_argument("--crawl-limit", type=int, default=None, help="Concurrent crawls (default: --browsers)")
+    sp_serve.add_argument("--llm-limit", type=int, default=None, help="Concurrent LLM calls (default: --max-concurrency)")
+    sp_serve.add_argument("--reuse-seconds", type=float, default=0.0, help="Serve identical finished jobs from the queue for this long")
+    sp_serve.add_argument("--store", default=None, help="Artifact store directory for jobs that pass a request_id")
+    add_llm(sp_serve)
+    sp_serve.set_defaults(func=lambda a: asyncio.run(cmd_serve(a)))
+
     # Top-level convenience shortcut: default command = storyboard
     p.add_argument("--url", help="Start URL (shortcut; maps to storyboard)", nargs="?")
     p.add_argument("--max-pages", type=int, default=5)
@@ -171,9 +582,11 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 def main():
-    load_dotenv()
+    # .env is loaded only by the commands that need credentials (storyboard)
     parser = build_parser()
     args = parser.parse_args()
+    if args.cmd == "scan" and args.shards > 1 and (args.state or args.resume or args.record_har):
+        parser.error("scan --shards cannot be combined with --state, --resume or --record-har")
     if args.cmd:
         return args.func(args)
 
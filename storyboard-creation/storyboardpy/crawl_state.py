@@ -0,0 +1,236 @@
+import heapq
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+class MemoryCrawlState:
+    """Frontier, visited set and finished pages held in memory (the default).
+
+    The explorer drives a crawl through this interface so the same loop can
+    run against ``SqliteCrawlState`` for checkpointed, resumable crawls. Each
+    step consumes the head of the frontier exactly once, via ``complete`` (a
+    page was extracted) or ``skip`` (visited, off-origin or failed to load).
+    ``defer`` and ``drop`` reorder or prune the frontier without using a step.
+
+    The head is the queued URL with the highest priority, oldest first among
+    equals; without priorities (all 0) the frontier is FIFO, i.e.
+    breadth-first.
+    """
+
+    def __init__(self) -> None:
+        self.params: Dict[str, Any] = {}
+        self.steps = 0
+        self._frontier: List[Tuple[float, int, str]] = []  # heap of (-priority, seq, url)
+        self._seq = 0
+        self._visited: Set[str] = set()
+        self._pages: List[Dict[str, Any]] = []
+
+    def is_new(self) -> bool:
+        """True until the crawl was seeded (False when resuming)."""
+        return not self.steps and self.peek() is None
+
+    def _push(self, urls: Iterable[str], priorities: Optional[Sequence[float]] = None) -> None:
+        for i, url in enumerate(urls):
+            heapq.heappush(self._frontier, (-(priorities[i] if priorities else 0.0), self._seq, url))
+            self._seq += 1
+
+    def seed(self, urls: Iterable[str], priorities: Optional[Sequence[float]] = None) -> None:
+        """Queue start URLs for a fresh crawl (no-op when resuming)."""
+        if self.is_new():
+            self._push(urls, priorities)
+
+    def peek(self) -> Optional[str]:
+        return self._frontier[0][2] if self._frontier else None
+
+    def is_visited(self, url: str) -> bool:
+        return url in self._visited
+
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def skip(self, url: str, visited: bool = False) -> None:
+        heapq.heappop(self._frontier)
+        if visited:
+            self._visited.add(url)
+        self.steps += 1
+
+    def defer(self, url: str) -> None:
+        """Move ``url`` (all queued copies of it) to the back without using a step."""
+        self._frontier = [e for e in self._frontier if e[2] != url]
+        back = max((e[0] for e in self._frontier), default=0.0) + 1
+        self._frontier.append((back, self._seq, url))
+        self._seq += 1
+        heapq.heapify(self._frontier)
+
+    def drop(self, url: str) -> None:
+        """Discard the frontier head without using a step."""
+        heapq.heappop(self._frontier)
+
+    def requeue(self, url: str, priority: float) -> None:
+        """Give the frontier head a new priority without using a step."""
+        heapq.heapreplace(self._frontier, (-priority, self._seq, url))
+        self._seq += 1
+
+    def complete(
+        self, url: str, page: Dict[str, Any], links: List[str], priorities: Optional[Sequence[float]] = None
+    ) -> None:
+        heapq.heappop(self._frontier)
+        self._visited.add(url)
+        self._pages.append(page)
+        self._push(links, priorities)
+        self.steps += 1
+
+    def pages(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._pages)
+
+    def close(self) -> None:
+        pass
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS frontier (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, priority REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS pages (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, data TEXT NOT NULL);
+"""
+
+
+class SqliteCrawlState(MemoryCrawlState):
+    """Crawl state checkpointed to a SQLite file after every page.
+
+    Every step is one transaction: the frontier head is removed together with
+    the visited mark, the page summary and its outgoing links, so a crawl
+    killed at any point resumes at the page it had not finished. Only the
+    frontier head is held in memory; visited lookups and pages stay on disk.
+    """
+
+    def __init__(self, path: str, params: Optional[Dict[str, Any]] = None) -> None:
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        if "priority" not in [row[1] for row in self.conn.execute("PRAGMA table_info(frontier)")]:
+            # State files from before the priority frontier
+            self.conn.execute("ALTER TABLE frontier ADD COLUMN priority REAL NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_order ON frontier (priority DESC, seq)")
+        stored = {k: json.loads(v) for k, v in self.conn.execute("SELECT key, value FROM meta")}
+        self.params = stored.get("params") or dict(params or {})
+        self.steps = stored.get("steps", 0)
+        if "params" not in stored:
+            self._set_meta("params", self.params)
+            self._set_meta("steps", 0)
+
+    @classmethod
+    def load_params(cls, path: str) -> Dict[str, Any]:
+        """Parameters a saved crawl was started with (for resuming)."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No crawl state at {path}")
+        conn = sqlite3.connect(path)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key='params'").fetchone()
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"Not a crawl state file: {path} ({e})")
+        finally:
+            conn.close()
+        if row is None:
+            raise ValueError(f"Crawl state has no parameters: {path}")
+        return json.loads(row[0])
+
+    def _set_meta(self, key: str, value: Any) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @staticmethod
+    def _rows(urls: Iterable[str], priorities: Optional[Sequence[float]]) -> List[Tuple[str, float]]:
+        return [(u, priorities[i] if priorities else 0.0) for i, u in enumerate(urls)]
+
+    def seed(self, urls: Iterable[str], priorities: Optional[Sequence[float]] = None) -> None:
+        if not self.is_new():
+            return
+        self.conn.executemany("INSERT INTO frontier (url, priority) VALUES (?, ?)", self._rows(urls, priorities))
+
+    def peek(self) -> Optional[str]:
+        row = self.conn.execute("SELECT url FROM frontier ORDER BY priority DESC, seq LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def is_visited(self, url: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM visited WHERE url=?", (url,)).fetchone() is not None
+
+    def page_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def _pop(self) -> None:
+        self.conn.execute("DELETE FROM frontier WHERE seq=(SELECT seq FROM frontier ORDER BY priority DESC, seq LIMIT 1)")
+
+    def _step(
+        self,
+        url: str,
+        visited: bool,
+        page: Optional[Dict[str, Any]] = None,
+        links: Iterable[str] = (),
+        priorities: Optional[Sequence[float]] = None,
+    ) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._pop()
+            if visited:
+                self.conn.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (url,))
+            if page is not None:
+                self.conn.execute("INSERT INTO pages (url, data) VALUES (?, ?)", (url, json.dumps(page)))
+            self.conn.executemany("INSERT INTO frontier (url, priority) VALUES (?, ?)", self._rows(links, priorities))
+            self._set_meta("steps", self.steps + 1)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.steps += 1
+
+    def skip(self, url: str, visited: bool = False) -> None:
+        self._step(url, visited)
+
+    def defer(self, url: str) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM frontier WHERE url=?", (url,))
+            self.conn.execute(
+                "INSERT INTO frontier (url, priority) VALUES (?, (SELECT COALESCE(MIN(priority), 0) - 1 FROM frontier))",
+                (url,),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def drop(self, url: str) -> None:
+        self._pop()
+
+    def requeue(self, url: str, priority: float) -> None:
+        # A fresh seq, as in MemoryCrawlState, so ties with the new priority break the same way
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "DELETE FROM frontier WHERE seq=(SELECT seq FROM frontier WHERE url=? ORDER BY priority DESC, seq LIMIT 1)",
+                (url,),
+            )
+            self.conn.execute("INSERT INTO frontier (url, priority) VALUES (?, ?)", (url, priority))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def complete(
+        self, url: str, page: Dict[str, Any], links: List[str], priorities: Optional[Sequence[float]] = None
+    ) -> None:
+        self._step(url, True, page, links, priorities)
+
+    def pages(self) -> Iterator[Dict[str, Any]]:
+        for (data,) in self.conn.execute("SELECT data FROM pages ORDER BY seq"):
+            yield json.loads(data)
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+
+@dataclass
+class ActionResult:
+    index: int
+    type: str
+    selector: Optional[str]
+    started_at: float  # seconds since the scene started recording
+    duration_seconds: float
+    ok: bool
+    error: Optional[str] = None
+    skipped: bool = False
+
+
+@dataclass
+class SceneRecording:
+    scene_id: str
+    index: int
+    entry_url: Optional[str]
+    storage_state_in: Optional[str]
+    video_path: Optional[str] = None
+    trace_path: Optional[str] = None
+    storage_state_out: Optional[str] = None
+    wall_seconds: float = 0.0
+    ok: bool = True
+    error: Optional[str] = None
+    actions: List[ActionResult] = field(default_factory=list)
+
+
+def resolve_selector(selector: str, by: Optional[str]) -> str:
+    """Map a storyboard selector + ``by`` hint onto a Playwright selector string."""
+    sel = selector.strip()
+    if sel.startswith(("text=", "role=", "xpath=", "css=", "id=", "data-testid=")):
+        return sel
+    if by == "text":
+        return f"text={sel}"
+    if by == "xpath" or sel.startswith("//"):
+        return f"xpath={sel}"
+    if by == "role":
+        return f"role={sel}"
+    if by == "aria":
+        escaped = sel.replace('"', '\\"')
+        return f'[aria-label="{escaped}"]'
+    return sel
+
+
+def plan_scene_entries(storyboard: Dict[str, Any], base_url: Optional[str]) -> List[Optional[str]]:
+    """Work out the URL each scene starts from without replaying earlier scenes.
+
+    A scene starts at the last URL navigated to by any earlier scene (or
+    ``base_url``). Its own leading ``navigate`` action overrides this anyway.
+    """
+    entries: List[Optional[str]] = []
+    current = base_url
+    for scene in storyboard.get("scenes") or []:
+        entries.append(current)
+        for action in (scene.get("actions") or []) if isinstance(scene, dict) else []:
+            if isinstance(action, dict) and action.get("type") == "navigate" and action.get("url"):
+                current = urljoin(current or "", action["url"])
+    return entries
+
+
+class StoryboardExecutor:
+    """Replays storyboard scene actions with Playwright and records each scene.
+
+    Scenes run concurrently, one browser context each, bounded by ``workers``.
+    Every scene records its own video (and optional trace), then the videos are
+    stitched in storyboard order. A scene starts from its planned entry URL and,
+    when available, a saved storage state: ``scene_states[scene_id]``, else the
+    state the previous scene saved in ``output_dir/states`` on an earlier run,
+    else ``initial_state``. This lets a login scene be recorded once and later
+    scenes start authenticated without replaying it serially.
+    """
+
+    def __init__(
+        self,
+        storyboard: Dict[str, Any],
+        output_dir: str,
+        base_url: Optional[str] = None,
+        workers: int = 4,
+        headless: bool = True,
+        viewport: Tuple[int, int] = (1280, 720),
+        action_timeout_ms: int = 10000,
+        trace: bool = True,
+        pace: bool = True,
+        initial_state: Optional[str] = None,
+        scene_states: Optional[Dict[str, str]] = None,
+        continue_on_error: bool = False,
+    ) -> None:
+        self.storyboard = storyboard
+        self.output_dir = output_dir
+        self.base_url = base_url or self._first_navigate_url()
+        self.workers = max(1, workers)
+        self.headless = headless
+        self.viewport = viewport
+        self.action_timeout_ms = action_timeout_ms
+        self.trace = trace
+        self.pace = pace
+        self.initial_state = initial_state
+        self.scene_states = scene_states or {}
+        self.continue_on_error = continue_on_error
+        os.makedirs(os.path.join(output_dir, "states"), exist_ok=True)
+
+    def _first_navigate_url(self) -> Optional[str]:
+        for scene in self.storyboard.get("scenes") or []:
+            for action in scene.get("actions") or []:
+                if action.get("type") == "navigate" and action.get("url"):
+                    return action["url"]
+        return None
+
+    def _scene_id(self, scene: Dict[str, Any], index: int) -> str:
+        return str(scene.get("id") or f"scene-{index + 1}")
+
+    def _state_for(self, scenes: List[Dict[str, Any]], index: int) -> Optional[str]:
+        scene_id = self._scene_id(scenes[index], index)
+        if scene_id in self.scene_states:
+            return self.scene_states[scene_id]
+        if index > 0:
+            prev = os.path.join(self.output_dir, "states", f"{self._scene_id(scenes[index - 1], index - 1)}.json")
+            if os.path.exists(prev):
+                return prev
+        return self.initial_state
+
+    async def run(self) -> Dict[str, Any]:
+        from playwright.async_api import async_playwright
+
+        scenes = [s for s in (self.storyboard.get("scenes") or []) if isinstance(s, dict)]
+        entries = plan_scene_entries({"scenes": scenes}, self.base_url)
+        # Resolve states before any scene runs so a scene never reads a state being written
+        states = [self._state_for(scenes, i) for i in range(len(scenes))]
+        sem = asyncio.Semaphore(self.workers)
+        started = time.perf_counter()
+
+        async with async_playwright() as pw:
+            browser = await pw.chromium.launch(headless=self.headless)
+            try:
+                async def bounded(i: int) -> SceneRecording:
+                    async with sem:
+                        return await self._record_scene(browser, scenes[i], i, entries[i], states[i])
+
+                recordings = await asyncio.gather(*(bounded(i) for i in range(len(scenes))))
+            finally:
+                await browser.close()
+
+        stitched, stitch_error = self._stitch([r.video_path for r in recordings if r.video_path])
+        result = {
+            "base_url": self.base_url,
+            "workers": self.workers,
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "ok": all(r.ok for r in recordings),
+            "video_path": stitched,
+            "stitch_error": stitch_error,
+            "scenes": [asdict(r) for r in recordings],
+        }
+        with open(os.path.join(self.output_dir, "recording.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        return result
+
+    async def _record_scene(self, browser, scene: Dict[str, Any], index: int, entry_url: Optional[str], state: Optional[str]) -> SceneRecording:
+        scene_id = self._scene_id(scene, index)
+        scene_dir = os.path.join(self.output_dir, "scenes", f"{index + 1:02d}-{scene_id}")
+        os.makedirs(scene_dir, exist_ok=True)
+        rec = SceneRecording(scene_id=scene_id, index=index, entry_url=entry_url, storage_state_in=state)
+        width, height = self.viewport
+        context_kwargs: Dict[str, Any] = {
+            "viewport": {"width": width, "height": height},
+            "record_video_dir": scene_dir,
+            "record_video_size": {"width": width, "height": height},
+        }
+        if state and os.path.exists(state):
+            context_kwargs["storage_state"] = state
+
+        started = time.perf_counter()
+        context = await browser.new_context(**context_kwargs)
+        page = None
+        try:
+            context.set_default_timeout(self.action_timeout_ms)
+            if self.trace:
+                await context.tracing.start(screenshots=True, snapshots=True)
+            page = await context.new_page()
+            actions = [a for a in (scene.get("actions") or []) if isinstance(a, dict)]
+            if entry_url and not (actions and actions[0].get("type") == "navigate"):
+                await page.goto(entry_url, wait_until="domcontentloaded")
+            failed = False
+            for i, action in enumerate(actions):
+                offset = time.perf_counter() - started
+                if failed and not self.continue_on_error:
+                    rec.actions.append(ActionResult(i, str(action.get("type")), action.get("selector"), round(offset, 3), 0.0, False, skipped=True))
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    await self._perform(page, action)
+                    rec.actions.append(ActionResult(i, str(action.get("type")), action.get("selector"), round(offset, 3), round(time.perf_counter() - t0, 3), True))
+                except Exception as e:
+                    failed = True
+                    rec.ok = False
+                    rec.actions.append(ActionResult(i, str(action.get("type")), action.get("selector"), round(offset, 3), round(time.perf_counter() - t0, 3), False, error=str(e).splitlines()[0][:300]))
+
+            # Hold the last frame so the clip lasts as long as the narration
+            target = float(scene.get("duration_seconds") or 0)
+            remaining = target - (time.perf_counter() - started)
+            if self.pace and remaining > 0:
+                await page.wait_for_timeout(remaining * 1000)
+
+            rec.storage_state_out = os.path.join(self.output_dir, "states", f"{scene_id}.json")
+            await context.storage_state(path=rec.storage_state_out)
+            if self.trace:
+                rec.trace_path = os.path.join(scene_dir, "trace.zip")
+                await context.tracing.stop(path=rec.trace_path)
+        except Exception as e:
+            rec.ok = False
+            rec.error = str(e).splitlines()[0][:300] if str(e) else type(e).__name__
+        finally:
+            # Closing the context also ends a trace that was never stopped
+            video = page.video if page is not None else None
+            await context.close()
+            if video:
+                try:
+                    rec.video_path = os.path.join(scene_dir, "scene.webm")
+                    await video.save_as(rec.video_path)
+                    await video.delete()
+                except Exception:
+                    rec.video_path = None
+        rec.wall_seconds = round(time.perf_counter() - started, 3)
+        return rec
+
+    async def _perform(self, page, action: Dict[str, Any]) -> None:
+        kind = action.get("type")
+        selector = action.get("selector")
+        locator = page.locator(resolve_selector(selector, action.get("by"))).first if selector else None
+        value = action.get("value")
+
+        if kind == "navigate":
+            url = action.get("url") or value
+            if not url:
+                raise RuntimeError("navigate action has no url")
+            await page.goto(urljoin(page.url if page.url.startswith("http") else (self.base_url or ""), url), wait_until="domcontentloaded")
+        elif kind == "click":
+            if locator is None:
+                raise RuntimeError("click action has no selector")
+            await locator.click()
+        elif kind == "input":
+            if locator is None:
+                raise RuntimeError("input action has no selector")
+            await locator.fill(value or "")
+        elif kind == "scroll":
+            if locator is not None:
+                await locator.scroll_into_view_if_needed()
+            else:
+                try:
+                    delta = float(value) if value else 600.0
+                except ValueError:
+                    delta = 600.0
+                await page.mouse.wheel(0, delta)
+                await page.wait_for_timeout(300)
+        elif kind == "wait":
+            if locator is not None:
+                await locator.wait_for(state="visible")
+            else:
+                try:
+                    seconds = float(value) if value else 1.0
+                except ValueError:
+                    seconds = 1.0
+                await page.wait_for_timeout(seconds * 1000)
+        elif kind == "assert":
+            if locator is None:
+                raise RuntimeError("assert action has no selector")
+            await locator.wait_for(state="visible")
+        else:
+            raise RuntimeError(f"Unknown action type: {kind}")
+
+    def _stitch(self, videos: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Concatenate scene videos in order with ffmpeg (stream copy)."""
+        if not videos:
+            return None, "no scene videos recorded"
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            return None, "ffmpeg not found; scene videos left unstitched"
+        list_path = os.path.join(self.output_dir, "scenes.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for v in videos:
+                f.write(f"file '{os.path.abspath(v)}'\n")
+        out = os.path.join(self.output_dir, "storyboard.webm")
+        proc = subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", out],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return None, proc.stderr.strip()[:500] or f"ffmpeg exited with {proc.returncode}"
+        return out, None
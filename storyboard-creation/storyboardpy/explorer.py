@@ -1,12 +1,16 @@
 import asyncio
 import json
 import os
-import re
 import time
 from dataclasses import dataclass, asdict
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
+from .crawl_state import MemoryCrawlState, SqliteCrawlState
+from .frontier import FEATURE_HINTS, FRONTIERS, START_PRIORITY, LinkScorer, sitemap_urls
+from .parsers import HtmlParser, get_parser
+from .templates import STRUCTURE_JS, TemplateTracker, simhash
+
 
 @dataclass
 class Clickable:
@@ -52,20 +56,8 @@ def infer_features(headings: List[str], buttons: List[Clickable]) -> List[str]:
     text_blob = " ".join([h.lower() for h in headings] + [
         (c.text or "").lower() for c in buttons
     ])
-    hints = [
-        ("pricing", re.compile(r"\bpricing|plans?\b")),
-        ("docs", re.compile(r"\bdocs?|documentation\b")),
-        ("login", re.compile(r"\blog\s*in|sign\s*in\b")),
-        ("signup", re.compile(r"\bsign\s*up|register\b")),
-        ("dashboard", re.compile(r"\bdashboard\b")),
-        ("api", re.compile(r"\bapi\b")),
-        ("integrations", re.compile(r"\bintegrations?\b")),
-        ("contact", re.compile(r"\bcontact|support\b")),
-        ("trial", re.compile(r"\bfree\s*trial|try\s*free|get\s*started\b")),
-        ("search", re.compile(r"\bsearch\b")),
-    ]
     found = []
-    for name, rx in hints:
+    for name, rx in FEATURE_HINTS:
         if rx.search(text_blob):
             found.append(name)
     return found
@@ -82,6 +74,16 @@ class WebsiteExplorer:
         max_links_per_page: int = 30,
         screenshot: bool = True,
         timeout_ms: int = 20000,
+        browser: Optional[Any] = None,
+        state_path: Optional[str] = None,
+        engine: Optional[str] = None,
+        shards: int = 1,
+        template_policy: str = "defer",
+        parser: str = "auto",
+        record_har: Optional[str] = None,
+        replay_har: Optional[str] = None,
+        frontier: str = "priority",
+        sitemap: bool = True,
     ) -> None:
         self.start_url = start_url
         self.max_pages = max_pages
@@ -91,270 +93,464 @@ class WebsiteExplorer:
         self.max_links_per_page = max_links_per_page
         self.screenshot = screenshot
         self.timeout_ms = timeout_ms
+        self.browser = browser
+        # SQLite checkpoint of frontier/visited/pages; an existing file is resumed
+        self.state_path = state_path
+        # "playwright", "requests" or None to pick Playwright when installed
+        self.engine = engine
+        # >1 crawls with that many worker processes (see sharded.ShardedCrawl)
+        self.shards = shards
+        # Pages matching an already-seen URL pattern + DOM template: "defer", "skip" or "off"
+        self.template_policy = template_policy
+        # HTML parser backend for the requests engine: "auto", "lxml" or "html.parser"
+        self.parser = parser
+        self._html_parser: Optional[HtmlParser] = None
+        # Network archive: record every response to a HAR, or serve every request from one (no network)
+        if record_har and replay_har:
+            raise ValueError("record_har and replay_har cannot be combined")
+        self.record_har = record_har
+        self.replay_har = replay_har
+        # "priority": best-first by LinkScorer, seeded from robots.txt/sitemap.xml when
+        # ``sitemap`` is set; "bfs": breadth-first in link order
+        if frontier not in FRONTIERS:
+            raise ValueError(f"Unknown frontier: {frontier} (choose from {', '.join(FRONTIERS)})")
+        self.frontier = frontier
+        self.sitemap = sitemap
+        self._scorer: Optional[LinkScorer] = None
         if artifacts_dir:
             os.makedirs(artifacts_dir, exist_ok=True)
 
-    async def explore(self) -> Dict[str, Any]:
-        try:
-            from playwright.async_api import async_playwright
-            use_playwright = True
-        except Exception:
-            use_playwright = False
+    @classmethod
+    def resume(cls, state_path: str, **overrides: Any) -> "WebsiteExplorer":
+        """Rebuild the explorer a checkpointed crawl was started with."""
+        params = SqliteCrawlState.load_params(state_path)
+        kwargs = {k: params[k] for k in (
+            "start_url", "max_pages", "same_origin_only", "artifacts_dir",
+            "max_links_per_page", "screenshot", "timeout_ms", "engine", "template_policy", "parser",
+            "replay_har", "frontier", "sitemap",
+        ) if k in params}
+        kwargs.update(overrides)
+        return cls(state_path=state_path, **kwargs)
+
+    def _open_state(self, engine: str) -> MemoryCrawlState:
+        if self.state_path:
+            state: MemoryCrawlState = SqliteCrawlState(self.state_path, {
+                "start_url": self.start_url,
+                "max_pages": self.max_pages,
+                "same_origin_only": self.same_origin_only,
+                "artifacts_dir": self.artifacts_dir,
+                "max_links_per_page": self.max_links_per_page,
+                "screenshot": self.screenshot,
+                "timeout_ms": self.timeout_ms,
+                "engine": engine,
+                "template_policy": self.template_policy,
+                "parser": self.parser,
+                "replay_har": self.replay_har,
+                "frontier": self.frontier,
+                "sitemap": self.sitemap,
+                "started_at": int(time.time()),
+            })
+        else:
+            state = MemoryCrawlState()
+        self._scorer = LinkScorer() if self.frontier == "priority" else None
+        return state
+
+    def _wants_sitemap(self, state: MemoryCrawlState) -> bool:
+        return self.sitemap and self._scorer is not None and state.is_new()
+
+    def _seed(self, state: MemoryCrawlState, listed: List[str]) -> None:
+        """Queue the start URL and, for a best-first crawl, the sitemap URLs ``listed``."""
+        if not state.is_new():
+            return
+        if self._scorer is None:
+            state.seed([self.start_url])
+            return
+        self._scorer.visited(self.start_url)
+        origin = urlparse(self.start_url).netloc
+        listed = [u for u in listed if not self.same_origin_only or urlparse(u).netloc == origin]
+        ranked, scores = self._scorer.rank(listed, {}, len(listed))
+        state.seed([self.start_url] + ranked, [START_PRIORITY] + scores)
+
+    @staticmethod
+    def _fetcher(session: Any) -> Callable[[str], Optional[bytes]]:
+        def fetch(url: str) -> Optional[bytes]:
+            try:
+                resp = session.get(url, timeout=15)
+            except Exception:
+                return None
+            return resp.content if resp.status_code == 200 else None
+
+        return fetch
+
+    def _browser_fetcher(self, context: Any) -> Callable[[str], Optional[bytes]]:
+        """``_fetcher`` for a browser context, callable from a worker thread.
+
+        Requests go through the context's API client; when replaying, they are
+        served from the archive like the requests engine's.
+        """
+        if self.replay_har:
+            from .har import HarReplaySession
+
+            return self._fetcher(HarReplaySession(self.replay_har))
+        loop = asyncio.get_running_loop()
+
+        async def get(url: str) -> Optional[bytes]:
+            resp = await context.request.get(url, timeout=self.timeout_ms)
+            return await resp.body() if resp.status == 200 else None
+
+        def fetch(url: str) -> Optional[bytes]:
+            try:
+                return asyncio.run_coroutine_threadsafe(get(url), loop).result()
+            except Exception:
+                return None
+
+        return fetch
 
-        if use_playwright:
+    def _next_links(
+        self, state: MemoryCrawlState, url: str, origin: str, links: List[str], summary: PageSummary
+    ) -> Tuple[List[str], Optional[List[float]]]:
+        """Links to queue after visiting ``url``, with their priorities (None when breadth-first)."""
+        next_links = []
+        for link in links:
+            if link == url or state.is_visited(link):
+                continue
+            if self.same_origin_only and urlparse(link).netloc != origin:
+                continue
+            next_links.append(link)
+        if self._scorer is None:
+            return next_links[: self.max_links_per_page], None
+        # Anchor text of each link, from its clickable or nav entry
+        anchors: Dict[str, str] = {}
+        for c in summary.clickables:
+            if c.href and (c.text or c.aria_label):
+                anchors.setdefault(urljoin(url, c.href), c.text or c.aria_label)
+        for text, href in summary.nav_links:
+            if text:
+                anchors.setdefault(urljoin(url, href), text)
+        self._scorer.visited(url)
+        return self._scorer.rank(next_links, anchors, self.max_links_per_page)
+
+    async def explore(self) -> Dict[str, Any]:
+        if self.shards > 1:
+            if self.state_path or self.browser is not None or self.record_har:
+                raise ValueError("Sharded crawls do not support state_path, record_har or a shared browser")
+            from .sharded import ShardedCrawl
+
+            engine = self.engine or ("playwright" if self._playwright_installed() else "requests")
+            return await asyncio.to_thread(ShardedCrawl(self, engine, self.shards).run)
+        if self.engine == "requests":
+            return await self._explore_with_requests()
+        if self.browser is not None or self.engine == "playwright":
+            return await self._explore_with_playwright()
+        if self._playwright_installed():
             return await self._explore_with_playwright()
         else:
             return await self._explore_with_requests()
 
+    @staticmethod
+    def _playwright_installed() -> bool:
+        try:
+            from playwright.async_api import async_playwright
+            return True
+        except Exception:
+            return False
+
     async def _explore_with_playwright(self) -> Dict[str, Any]:
-        from playwright.async_api import async_playwright
+        if self.browser is not None:
+            # Warm browser owned by the caller (e.g. `serve`); only a context is created here
+            return await self._crawl_with_browser(self.browser)
 
-        origin = urlparse(self.start_url).netloc
-        queue: List[str] = [self.start_url]
-        visited: Set[str] = set()
-        pages: List[PageSummary] = []
+        from playwright.async_api import async_playwright
 
         async with async_playwright() as pw:
             browser = await pw.chromium.launch(headless=self.headless)
-            context = await browser.new_context()
             try:
-                for idx in range(self.max_pages):
-                    if not queue:
-                        break
-                    url = queue.pop(0)
-                    if url in visited:
-                        continue
-                    if self.same_origin_only and urlparse(url).netloc != origin:
-                        continue
-                    visited.add(url)
-
-                    page = await context.new_page()
-                    try:
-                        await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout_ms)
-                    except Exception:
-                        await page.close()
-                        continue
-
-                    # Title and meta
-                    title = await page.title()
-                    description = await page.evaluate(
-                        "() => document.querySelector('meta[name=\"description\"]')?.getAttribute('content') || ''"
-                    )
-
-                    # Headings
-                    headings = await page.evaluate(
-                        "() => Array.from(document.querySelectorAll('h1, h2, h3')).map(h => h.innerText.trim()).filter(Boolean)"
-                    )
-
-                    # Nav links
-                    nav_links = await page.evaluate(
-                        "() => Array.from(document.querySelectorAll('nav a[href]')).slice(0, 50).map(a => [a.innerText.trim(), a.href])"
-                    )
-
-                    # Clickables
-                    clickables_js = """
-                        () => Array.from(document.querySelectorAll('a, button, [role="button"], input[type="submit"], [onclick]')).slice(0, 100).map(el => {
-                          const tag = el.tagName.toLowerCase();
-                          const role = el.getAttribute('role');
-                          const href = el.getAttribute('href');
-                          const aria = el.getAttribute('aria-label');
-                          const id = el.id || null;
-                          const cls = el.className || null;
-                          const text = (el.innerText || el.value || '').trim();
-                          const bbox = el.getBoundingClientRect();
-                          let locator = null;
-                          if (aria) locator = `role=${role||'button'}[name="${aria.replace(/"/g, '\\"')}"]`;
-                          else if (id) locator = `#${id}`;
-                          else if (text && text.length <= 60) locator = `text=${text.replace(/\s+/g, ' ')}`;
-                          return { tag, role, href, aria_label: aria, id_attr: id, classes: cls, text, locator_suggestion: locator, bbox: {x: bbox.x, y: bbox.y, width: bbox.width, height: bbox.height} };
-                        })
-                    """
-                    clickables_raw = await page.evaluate(clickables_js)
-                    clickables = [Clickable(**c) for c in clickables_raw]
-
-                    # Forms
-                    forms_js = """
-                        () => Array.from(document.querySelectorAll('form')).slice(0, 20).map((f, i) => {
-                          const fields = Array.from(f.querySelectorAll('input, textarea, select')).slice(0, 20).map(el => ({
-                            name: el.getAttribute('name') || el.id || null,
-                            type: (el.getAttribute('type') || el.tagName || '').toLowerCase(),
-                            placeholder: el.getAttribute('placeholder') || null
-                          }));
-                          const submit = f.querySelector('[type="submit"], button[type="submit"], button');
-                          const submitText = submit ? (submit.innerText || submit.value || '').trim() : null;
-                          let hint = f.id ? `#${f.id}` : null;
-                          if (!hint) {
-                            const name = f.getAttribute('name');
-                            hint = name ? `form[name="${name}"]` : `form:nth-of-type(${i+1})`;
-                          }
-                          return { selector_hint: hint, fields, submit_button_text: submitText };
-                        })
-                    """
-                    forms_raw = await page.evaluate(forms_js)
-                    forms = [FormInfo(
-                        selector_hint=f.get("selector_hint"),
-                        fields=[FormField(**fld) for fld in f.get("fields", [])],
-                        submit_button_text=f.get("submit_button_text"),
-                    ) for f in forms_raw]
-
-                    # Screenshot
-                    screenshot_path = None
-                    if self.screenshot and self.artifacts_dir:
-                        screenshot_path = os.path.join(self.artifacts_dir, f"page_{len(pages)+1}.png")
-                        try:
-                            await page.screenshot(path=screenshot_path, full_page=True)
-                        except Exception:
-                            screenshot_path = None
-
-                    features_guess = infer_features(headings, clickables)
-
-                    pages.append(PageSummary(
-                        url=url,
-                        title=title,
-                        description=description or None,
-                        headings=headings,
-                        nav_links=nav_links,
-                        clickables=clickables,
-                        forms=forms,
-                        screenshot_path=screenshot_path,
-                        features_guess=features_guess,
-                    ))
-
-                    # Enqueue links
-                    links = await page.evaluate(
-                        "() => Array.from(document.querySelectorAll('a[href]')).slice(0, 200).map(a => a.href)"
-                    )
-                    await page.close()
-
-                    # Dedup and filter
-                    next_links = []
-                    for link in links:
-                        if link in visited:
-                            continue
-                        if self.same_origin_only and urlparse(link).netloc != origin:
-                            continue
-                        next_links.append(link)
-                    queue.extend(next_links[: self.max_links_per_page])
+                return await self._crawl_with_browser(browser)
             finally:
-                await context.close()
                 await browser.close()
 
-        return {
-            "engine": "playwright",
-            "started_at": int(time.time()),
+    async def _new_context(self, browser: Any) -> Any:
+        """Browser context, recording to or replaying from ``record_har``/``replay_har``.
+
+        Service workers are blocked in both modes, since their requests
+        bypass HAR recording and routing. Playwright writes the recorded
+        archive when the context closes.
+        """
+        if self.record_har:
+            dirpath = os.path.dirname(self.record_har)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            return await browser.new_context(record_har_path=self.record_har, service_workers="block")
+        if self.replay_har:
+            if not os.path.exists(self.replay_har):
+                raise FileNotFoundError(f"HAR archive not found: {self.replay_har}")
+            context = await browser.new_context(service_workers="block")
+            await context.route_from_har(self.replay_har, not_found="abort")
+            return context
+        return await browser.new_context()
+
+    def _http_session(self) -> Any:
+        """HTTP session for the requests engine, with the same HAR modes as ``_new_context``."""
+        if self.replay_har:
+            from .har import HarReplaySession
+
+            return HarReplaySession(self.replay_har)
+        if self.record_har:
+            from .har import HarRecordingSession
+
+            return HarRecordingSession(self.record_har)
+        import requests
+
+        return requests.Session()
+
+    async def _crawl_with_browser(self, browser: Any) -> Dict[str, Any]:
+        origin = urlparse(self.start_url).netloc
+        context = await self._new_context(browser)
+        state = self._open_state("playwright")
+        templates = TemplateTracker(self.template_policy)
+        try:
+            listed: List[str] = []
+            if self._wants_sitemap(state):
+                listed = await asyncio.to_thread(sitemap_urls, self._browser_fetcher(context), self.start_url)
+            self._seed(state, listed)
+            while state.steps < self.max_pages:
+                url = state.peek()
+                if url is None:
+                    break
+                if state.is_visited(url):
+                    state.skip(url)
+                    continue
+                if self.same_origin_only and urlparse(url).netloc != origin:
+                    state.skip(url)
+                    continue
+                if self._requeue_stale(state, url) or self._apply_template_policy(templates, state, url):
+                    continue
+
+                screenshot_path = None
+                if self.screenshot and self.artifacts_dir:
+                    screenshot_path = os.path.join(self.artifacts_dir, f"page_{state.page_count()+1}.png")
+                visit = await self._visit_with_browser(context, url, screenshot_path)
+                if visit is None:
+                    state.skip(url, visited=True)
+                    continue
+                summary, links, fingerprint = visit
+                templates.observe(url, fingerprint)
+
+                # Page, visited mark and new links are checkpointed together
+                state.complete(url, self._page_to_dict(summary), *self._next_links(state, url, origin, links, summary))
+            return self._summary("playwright", state.pages(), state.params.get("started_at"), templates)
+        finally:
+            await context.close()
+            state.close()
+
+    async def _visit_with_browser(self, context: Any, url: str, screenshot_path: Optional[str] = None) -> Optional[Tuple[PageSummary, List[str], Optional[int]]]:
+        """Load one page in ``context`` and extract it; None if it failed to load.
+
+        Returns the summary, outgoing links and a DOM structure fingerprint
+        (None when template detection is off).
+        """
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout_ms)
+        except Exception:
+            await page.close()
+            return None
+
+        # Title and meta
+        title = await page.title()
+        description = await page.evaluate(
+            "() => document.querySelector('meta[name=\"description\"]')?.getAttribute('content') || ''"
+        )
+
+        # Headings
+        headings = await page.evaluate(
+            "() => Array.from(document.querySelectorAll('h1, h2, h3')).map(h => h.innerText.trim()).filter(Boolean)"
+        )
+
+        # Nav links
+        nav_links = await page.evaluate(
+            "() => Array.from(document.querySelectorAll('nav a[href]')).slice(0, 50).map(a => [a.innerText.trim(), a.href])"
+        )
+
+        # Clickables
+        clickables_js = """
+            () => Array.from(document.querySelectorAll('a, button, [role="button"], input[type="submit"], [onclick]')).slice(0, 100).map(el => {
+              const tag = el.tagName.toLowerCase();
+              const role = el.getAttribute('role');
+              const href = el.getAttribute('href');
+              const aria = el.getAttribute('aria-label');
+              const id = el.id || null;
+              const cls = el.className || null;
+              const text = (el.innerText || el.value || '').trim();
+              const bbox = el.getBoundingClientRect();
+              let locator = null;
+              if (aria) locator = `role=${role||'button'}[name="${aria.replace(/"/g, '\\"')}"]`;
+              else if (id) locator = `#${id}`;
+              else if (text && text.length <= 60) locator = `text=${text.replace(/\s+/g, ' ')}`;
+              return { tag, role, href, aria_label: aria, id_attr: id, classes: cls, text, locator_suggestion: locator, bbox: {x: bbox.x, y: bbox.y, width: bbox.width, height: bbox.height} };
+            })
+        """
+        clickables_raw = await page.evaluate(clickables_js)
+        clickables = [Clickable(**c) for c in clickables_raw]
+
+        # Forms
+        forms_js = """
+            () => Array.from(document.querySelectorAll('form')).slice(0, 20).map((f, i) => {
+              const fields = Array.from(f.querySelectorAll('input, textarea, select')).slice(0, 20).map(el => ({
+                name: el.getAttribute('name') || el.id || null,
+                type: (el.getAttribute('type') || el.tagName || '').toLowerCase(),
+                placeholder: el.getAttribute('placeholder') || null
+              }));
+              const submit = f.querySelector('[type="submit"], button[type="submit"], button');
+              const submitText = submit ? (submit.innerText || submit.value || '').trim() : null;
+              let hint = f.id ? `#${f.id}` : null;
+              if (!hint) {
+                const name = f.getAttribute('name');
+                hint = name ? `form[name="${name}"]` : `form:nth-of-type(${i+1})`;
+              }
+              return { selector_hint: hint, fields, submit_button_text: submitText };
+            })
+        """
+        forms_raw = await page.evaluate(forms_js)
+        forms = [FormInfo(
+            selector_hint=f.get("selector_hint"),
+            fields=[FormField(**fld) for fld in f.get("fields", [])],
+            submit_button_text=f.get("submit_button_text"),
+        ) for f in forms_raw]
+
+        # Screenshot
+        if screenshot_path:
+            try:
+                await page.screenshot(path=screenshot_path, full_page=True)
+            except Exception:
+                screenshot_path = None
+
+        features_guess = infer_features(headings, clickables)
+
+        summary = PageSummary(
+            url=url,
+            title=title,
+            description=description or None,
+            headings=headings,
+            nav_links=nav_links,
+            clickables=clickables,
+            forms=forms,
+            screenshot_path=screenshot_path,
+            features_guess=features_guess,
+        )
+
+        # Enqueue links
+        links = await page.evaluate(
+            "() => Array.from(document.querySelectorAll('a[href]')).slice(0, 200).map(a => a.href)"
+        )
+        fingerprint = None
+        if self.template_policy != "off":
+            fingerprint = simhash(await page.evaluate(STRUCTURE_JS))
+        await page.close()
+        return summary, links, fingerprint
+
+    def _requeue_stale(self, state: MemoryCrawlState, url: str) -> bool:
+        """Move the frontier head back if crawled pages have since covered what made it novel."""
+        priority = self._scorer.rescore(url) if self._scorer is not None else None
+        if priority is not None:
+            state.requeue(url, priority)
+        return priority is not None
+
+    def _apply_template_policy(self, templates: TemplateTracker, state: MemoryCrawlState, url: str) -> bool:
+        """Defer or drop the frontier head if it is another page of a known template."""
+        decision = templates.decide(url)
+        if decision == "defer":
+            state.defer(url)
+        elif decision == "skip":
+            state.drop(url)
+        return decision != "fetch"
+
+    def _summary(
+        self,
+        engine: str,
+        pages: Iterable[Dict[str, Any]],
+        started_at: Optional[int] = None,
+        templates: Optional[TemplateTracker] = None,
+    ) -> Dict[str, Any]:
+        summary = {
+            "engine": engine,
+            "started_at": started_at or int(time.time()),
             "start_url": self.start_url,
             "max_pages": self.max_pages,
-            "pages": [self._page_to_dict(p) for p in pages],
+            "pages": list(pages),
         }
+        if templates is not None and templates.policy != "off":
+            summary["template_coverage"] = templates.report()
+        return summary
 
     async def _explore_with_requests(self) -> Dict[str, Any]:
-        import requests
-        from bs4 import BeautifulSoup
+        # Blocking GETs run in a thread so a shared event loop (serve) keeps handling other requests
+        return await asyncio.to_thread(self._crawl_with_requests, urlparse(self.start_url).netloc)
 
-        origin = urlparse(self.start_url).netloc
-        queue: List[str] = [self.start_url]
-        visited: Set[str] = set()
-        pages: List[PageSummary] = []
+    def _crawl_with_requests(self, origin: str) -> Dict[str, Any]:
+        # The state is opened on this thread: a SQLite connection cannot change threads
+        state = self._open_state("requests")
+        try:
+            session = self._http_session()
+            try:
+                return self._crawl_with_session(state, origin, session)
+            finally:
+                session.close()
+        finally:
+            state.close()
 
-        session = requests.Session()
+    def _crawl_with_session(self, state: MemoryCrawlState, origin: str, session: Any) -> Dict[str, Any]:
+        templates = TemplateTracker(self.template_policy)
+        self._seed(state, sitemap_urls(self._fetcher(session), self.start_url) if self._wants_sitemap(state) else [])
 
-        for _ in range(self.max_pages):
-            if not queue:
+        while state.steps < self.max_pages:
+            url = state.peek()
+            if url is None:
                 break
-            url = queue.pop(0)
-            if url in visited:
+            if state.is_visited(url):
+                state.skip(url)
                 continue
             if self.same_origin_only and urlparse(url).netloc != origin:
+                state.skip(url)
                 continue
-            visited.add(url)
-            try:
-                resp = session.get(url, timeout=15)
-            except Exception:
+            if self._requeue_stale(state, url) or self._apply_template_policy(templates, state, url):
                 continue
-            if not (200 <= resp.status_code < 400):
+            visit = self._visit_with_requests(session, url)
+            if visit is None:
+                state.skip(url, visited=True)
                 continue
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            title = soup.title.string.strip() if soup.title and soup.title.string else None
-            meta = soup.find('meta', attrs={'name': 'description'})
-            description = meta['content'].strip() if meta and meta.get('content') else None
-            headings = [h.get_text(strip=True) for h in soup.select('h1, h2, h3')][:50]
-            nav_links_tags = soup.select('nav a[href]')[:50]
-            nav_links = [(a.get_text(strip=True), urljoin(url, a['href'])) for a in nav_links_tags]
-
-            # Clickables approximation
-            clickables: List[Clickable] = []
-            for el in soup.select('a, button, [role="button"], input[type="submit"], [onclick]')[:100]:
-                tag = el.name.lower() if hasattr(el, 'name') else None
-                role = el.get('role')
-                href = el.get('href')
-                aria = el.get('aria-label')
-                id_attr = el.get('id')
-                classes = el.get('class')
-                text = el.get_text(strip=True) if hasattr(el, 'get_text') else None
-                if tag == 'input' and not text:
-                    text = el.get('value')
-                locator = None
-                if aria:
-                    locator = f"role={role or 'button'}[name=\"{aria}\"]"
-                elif id_attr:
-                    locator = f"#{id_attr}"
-                elif text and len(text) <= 60:
-                    cleaned_text = re.sub(r'\s+', ' ', text)
-                    locator = f"text={cleaned_text}"
-                clickables.append(Clickable(
-                    text=text, role=role, tag=tag, href=(urljoin(url, href) if href else None),
-                    aria_label=aria, id_attr=id_attr, classes=' '.join(classes) if classes else None,
-                    locator_suggestion=locator, bbox=None
-                ))
-
-            # Forms approximation
-            forms: List[FormInfo] = []
-            for i, f in enumerate(soup.select('form')[:20]):
-                fields: List[FormField] = []
-                for fld in f.select('input, textarea, select')[:20]:
-                    fields.append(FormField(
-                        name=fld.get('name') or fld.get('id'),
-                        type=(fld.get('type') or fld.name or '').lower(),
-                        placeholder=fld.get('placeholder')
-                    ))
-                submit = f.select_one('[type="submit"], button[type="submit"], button')
-                submit_text = None
-                if submit:
-                    submit_text = submit.get_text(strip=True) or submit.get('value')
-                hint = f.get('id')
-                if hint:
-                    hint = f"#{hint}"
-                else:
-                    name = f.get('name')
-                    hint = f"form[name=\"{name}\"]" if name else f"form:nth-of-type({i+1})"
-                forms.append(FormInfo(selector_hint=hint, fields=fields, submit_button_text=submit_text))
-
-            features_guess = infer_features(headings, clickables)
-
-            pages.append(PageSummary(
-                url=url, title=title, description=description, headings=headings,
-                nav_links=nav_links, clickables=clickables, forms=forms,
-                screenshot_path=None, features_guess=features_guess
-            ))
-
-            # Enqueue links
-            links = [urljoin(url, a['href']) for a in soup.select('a[href]')][:200]
-            next_links = []
-            for link in links:
-                if link in visited:
-                    continue
-                if self.same_origin_only and urlparse(link).netloc != origin:
-                    continue
-                next_links.append(link)
-            queue.extend(next_links[: self.max_links_per_page])
+            summary, links, fingerprint = visit
+            templates.observe(url, fingerprint)
+            state.complete(url, self._page_to_dict(summary), *self._next_links(state, url, origin, links, summary))
 
-        return {
-            "engine": "requests",
-            "started_at": int(time.time()),
-            "start_url": self.start_url,
-            "max_pages": self.max_pages,
-            "pages": [self._page_to_dict(p) for p in pages],
-        }
+        return self._summary("requests", state.pages(), state.params.get("started_at"), templates)
+
+    def _visit_with_requests(self, session: Any, url: str) -> Optional[Tuple[PageSummary, List[str], Optional[int]]]:
+        """Fetch and parse one page; None on network errors and non-2xx/3xx.
+
+        Returns the same triple as ``_visit_with_browser``.
+        """
+        try:
+            resp = session.get(url, timeout=15)
+        except Exception:
+            return None
+        if not (200 <= resp.status_code < 400):
+            return None
+        if self._html_parser is None:
+            self._html_parser = get_parser(self.parser)
+        parsed = self._html_parser.parse(resp.text, url)
+        clickables = [Clickable(**c) for c in parsed.clickables]
+        summary = PageSummary(
+            url=url, title=parsed.title, description=parsed.description, headings=parsed.headings,
+            nav_links=parsed.nav_links, clickables=clickables,
+            forms=[
+                FormInfo(selector_hint=f["selector_hint"], fields=[FormField(**fld) for fld in f["fields"]], submit_button_text=f["submit_button_text"])
+                for f in parsed.forms
+            ],
+            screenshot_path=None, features_guess=infer_features(parsed.headings, clickables),
+        )
+        fingerprint = simhash(parsed.structure) if self.template_policy != "off" else None
+        return summary, parsed.links, fingerprint
 
     def _page_to_dict(self, p: PageSummary) -> Dict[str, Any]:
         return {
@@ -0,0 +1,189 @@
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urlparse
+
+from .templates import url_pattern
+
+
+FRONTIERS = ("priority", "bfs")
+
+# Feature categories, matched in page text by infer_features and in link paths/anchors here
+FEATURE_HINTS = [
+    ("pricing", re.compile(r"\bpricing|plans?\b")),
+    ("docs", re.compile(r"\bdocs?|documentation\b")),
+    ("login", re.compile(r"\blog\s*in|sign\s*in\b")),
+    ("signup", re.compile(r"\bsign\s*up|register\b")),
+    ("dashboard", re.compile(r"\bdashboard\b")),
+    ("api", re.compile(r"\bapi\b")),
+    ("integrations", re.compile(r"\bintegrations?\b")),
+    ("contact", re.compile(r"\bcontact|support\b")),
+    ("trial", re.compile(r"\bfree\s*trial|try\s*free|get\s*started\b")),
+    ("search", re.compile(r"\bsearch\b")),
+]
+# The flows a product demo is built around; links to them go first
+KEY_FEATURES = ("pricing", "docs", "signup", "dashboard", "trial", "login")
+_LOW_VALUE = re.compile(
+    r"\b(privacy|terms|legal|cookies?|imprint|impressum|careers|jobs|press|gdpr|accessibility|sitemap|status)\b"
+)
+_ASSET = re.compile(r"\.(pdf|zip|gz|tar|png|jpe?g|gif|svg|webp|ico|css|js|json|xml|txt|mp4|webm|mp3|woff2?)$", re.I)
+_PATH_WORDS = re.compile(r"[/\-_.]+")
+# Sits above every scored link, so the start URL is always crawled first
+START_PRIORITY = 1e9
+
+
+class LinkScorer:
+    """Best-first priorities for crawl frontier URLs (higher is crawled first).
+
+    A link scores for the feature categories of ``FEATURE_HINTS`` named in
+    its path or anchor text, with ``KEY_FEATURES`` weighted highest, and for
+    novelty: categories no visited page's URL covered yet, and that few
+    queued links already lead to, earn a bonus that shrinks with each link
+    queued for them. Legal/footer pages, non-HTML assets, deep paths, query
+    strings and URL patterns already queued many times (see
+    ``templates.url_pattern``) score lower.
+
+    Priorities are fixed when a link is queued, except that ``rescore``
+    takes back a novelty bonus once a crawled page covers its category (the
+    lazy update of a priority queue). Each URL is queued once per crawl,
+    without its fragment.
+    """
+
+    def __init__(self) -> None:
+        self.covered: Set[str] = set()
+        self._queued: Set[str] = set()
+        self._features: Counter = Counter()
+        self._patterns: Counter = Counter()
+        self._scores: Dict[str, float] = {}
+        self._bonus: Dict[str, Dict[str, float]] = {}  # novelty part of each queued score, by category
+
+    @staticmethod
+    def features(text: str) -> List[str]:
+        return [name for name, rx in FEATURE_HINTS if rx.search(text)]
+
+    @staticmethod
+    def _path_text(url: str) -> str:
+        return " ".join(w for w in _PATH_WORDS.split(urlparse(url).path.lower()) if w)
+
+    def visited(self, url: str) -> None:
+        """Mark the categories in a crawled page's path as covered."""
+        self._queued.add(urldefrag(url)[0])
+        self.covered.update(self.features(self._path_text(url)))
+
+    def score(self, url: str, anchor: Optional[str] = None) -> float:
+        return self._score(url, anchor)[0]
+
+    def _score(self, url: str, anchor: Optional[str]) -> Tuple[float, Dict[str, float]]:
+        parsed = urlparse(url)
+        path_text = self._path_text(url)
+        anchor_text = (anchor or "").lower()
+        in_path = set(self.features(path_text))
+        in_anchor = set(self.features(anchor_text))
+        score = 0.0
+        bonus: Dict[str, float] = {}
+        for name in in_path | in_anchor:
+            weight = 3.0 if name in KEY_FEATURES else 1.0
+            score += weight * ((name in in_path) + 0.5 * (name in in_anchor))
+            if name not in self.covered:
+                bonus[name] = weight / (1 + self._features[name])
+                score += bonus[name]
+        if _LOW_VALUE.search(path_text) or _LOW_VALUE.search(anchor_text):
+            score -= 4.0
+        if _ASSET.search(parsed.path):
+            score -= 10.0
+        depth = len([s for s in parsed.path.split("/") if s])
+        score -= 0.5 * max(0, depth - 1)
+        if parsed.query:
+            score -= 1.0
+        score -= min(3.0, 0.5 * self._patterns[url_pattern(url)])
+        return round(score, 3), bonus
+
+    def rescore(self, url: str) -> Optional[float]:
+        """Lowered priority of a queued URL whose novelty was used up since; None if unchanged."""
+        bonus = self._bonus.get(url)
+        stale = [name for name in bonus if name in self.covered] if bonus else []
+        if not stale:
+            return None
+        self._scores[url] = round(self._scores[url] - sum(bonus.pop(name) for name in stale), 3)
+        return self._scores[url]
+
+    def rank(self, links: Iterable[str], anchors: Dict[str, str], limit: int) -> Tuple[List[str], List[float]]:
+        """The ``limit`` best links not queued before, best first, with their priorities.
+
+        They count as queued from here on (for novelty and deduplication).
+        """
+        scored: List[Tuple[float, int, str]] = []
+        bonuses: Dict[str, Dict[str, float]] = {}
+        for i, link in enumerate(links):
+            url = urldefrag(link)[0]
+            if url in bonuses or url in self._queued:
+                continue
+            score, bonuses[url] = self._score(url, anchors.get(link) or anchors.get(url))
+            scored.append((-score, i, url))
+        scored.sort()
+        chosen = scored[:limit]
+        for neg, _, url in chosen:
+            self._queued.add(url)
+            self._scores[url] = -neg
+            if bonuses[url]:
+                self._bonus[url] = bonuses[url]
+            self._patterns[url_pattern(url)] += 1
+            for name in self.features(self._path_text(url)):
+                self._features[name] += 1
+        return [url for _, _, url in chosen], [-neg for neg, _, _ in chosen]
+
+
+def _sitemap_locs(body: bytes) -> Tuple[List[str], bool]:
+    """``<loc>`` values of a sitemap and whether it is a sitemap index."""
+    if body[:2] == b"\x1f\x8b":
+        try:
+            body = gzip.decompress(body)
+        except OSError:
+            return [], False
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        return [], False
+    locs = [el.text.strip() for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "loc" and el.text]
+    return locs, root.tag.rsplit("}", 1)[-1] == "sitemapindex"
+
+
+def sitemap_urls(
+    fetch: Callable[[str], Optional[bytes]],
+    start_url: str,
+    limit: int = 5000,
+    max_sitemaps: int = 10,
+) -> List[str]:
+    """Page URLs listed in the site's sitemaps, in file order.
+
+    Sitemaps are those named in ``robots.txt``, or ``/sitemap.xml`` when it
+    names none. Sitemap indexes are followed up to ``max_sitemaps`` files in
+    total, and gzipped sitemaps are read too. ``fetch`` returns a body, or
+    None for anything but a successful response.
+    """
+    parsed = urlparse(start_url)
+    root = f"{parsed.scheme}://{parsed.netloc}"
+    robots = fetch(f"{root}/robots.txt") or b""
+    pending = [
+        line.split(":", 1)[1].strip()
+        for line in robots.decode("utf-8", errors="replace").splitlines()
+        if line.strip().lower().startswith("sitemap:")
+    ] or [f"{root}/sitemap.xml"]
+    urls: List[str] = []
+    fetched: Set[str] = set()
+    while pending and len(fetched) < max_sitemaps and len(urls) < limit:
+        sitemap = pending.pop(0)
+        if sitemap in fetched:
+            continue
+        fetched.add(sitemap)
+        body = fetch(sitemap)
+        if not body:
+            continue
+        locs, is_index = _sitemap_locs(body)
+        if is_index:
+            pending.extend(locs)
+        else:
+            urls.extend(locs[: limit - len(urls)])
+    return urls
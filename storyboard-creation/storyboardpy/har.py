@@ -0,0 +1,167 @@
+import base64
+import json
+import os
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+# Stored as text in the archive; everything else is base64
+_TEXT_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "+xml", "+json")
+
+
+class HarMissError(requests.ConnectionError):
+    """Raised in replay when the archive has no response for a URL (the request is aborted)."""
+
+
+def _headers(headers: Any) -> List[Dict[str, str]]:
+    return [{"name": k, "value": v} for k, v in headers.items()]
+
+
+def _entry(resp: requests.Response, elapsed_ms: float) -> Dict[str, Any]:
+    req = resp.request
+    mime = resp.headers.get("Content-Type", "")
+    body = resp.content or b""
+    content: Dict[str, Any] = {"size": len(body), "mimeType": mime}
+    text = None
+    if any(t in mime for t in _TEXT_TYPES):
+        # Text only when it round-trips to the same bytes (replay re-encodes it as UTF-8)
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+    if text is None:
+        content.update(text=base64.b64encode(body).decode("ascii"), encoding="base64")
+    else:
+        content["text"] = text
+    return {
+        "startedDateTime": datetime.now(timezone.utc).isoformat(),
+        "time": round(elapsed_ms, 3),
+        "request": {
+            "method": req.method, "url": req.url, "httpVersion": "HTTP/1.1",
+            "headers": _headers(req.headers), "queryString": [], "cookies": [],
+            "headersSize": -1, "bodySize": len(req.body or b""),
+        },
+        "response": {
+            "status": resp.status_code, "statusText": resp.reason or "", "httpVersion": "HTTP/1.1",
+            "headers": _headers(resp.headers), "cookies": [], "content": content,
+            "redirectURL": resp.headers.get("Location", ""), "headersSize": -1, "bodySize": len(body),
+        },
+        "cache": {},
+        "timings": {"send": 0, "wait": round(elapsed_ms, 3), "receive": 0},
+    }
+
+
+class HarRecordingSession(requests.Session):
+    """``requests.Session`` that logs every response, redirect hops included, to a HAR 1.2 file.
+
+    The archive is written on ``close``. Playwright's ``route_from_har`` can
+    replay it in a browser, and ``HarReplaySession`` without one.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self.hooks["response"].append(self._record)
+
+    def _record(self, resp: requests.Response, *args: Any, **kwargs: Any) -> None:
+        self.entries.append(_entry(resp, resp.elapsed.total_seconds() * 1000))
+
+    def save(self) -> None:
+        dirpath = os.path.dirname(self.path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"log": {
+                "version": "1.2",
+                "creator": {"name": "storyboardpy", "version": "1"},
+                "pages": [],
+                "entries": self.entries,
+            }}, f)
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        self.save()
+        super().close()
+
+
+class HarReplaySession:
+    """Serves ``get`` from a HAR archive only; nothing goes to the network.
+
+    Reads ``.har`` files with embedded content and the ``.zip`` archives
+    Playwright records (content in attached files). The first entry recorded
+    for a URL wins, as with Playwright's ``route_from_har``; redirects are
+    followed through the archive, and a URL it lacks raises ``HarMissError``.
+    Responses are real ``requests.Response`` objects, so ``.text`` decodes
+    the same way it did when the site was live.
+    """
+
+    def __init__(self, path: str) -> None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"HAR archive not found: {path}")
+        self.path = path
+        self._zip: Optional[zipfile.ZipFile] = None
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            name = next((n for n in self._zip.namelist() if n.endswith(".har")), None)
+            if name is None:
+                raise ValueError(f"No .har file inside {path}")
+            data = json.loads(self._zip.read(name))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self._by_url: Dict[str, Dict[str, Any]] = {}
+        for entry in data.get("log", {}).get("entries", []):
+            req = entry.get("request") or {}
+            if req.get("method", "GET") == "GET" and req.get("url"):
+                self._by_url.setdefault(req["url"], entry)
+
+    def __len__(self) -> int:
+        return len(self._by_url)
+
+    def _body(self, content: Dict[str, Any]) -> bytes:
+        if content.get("_file"):
+            # Playwright's "attach" mode keeps bodies next to the HAR (or in the zip)
+            if self._zip is not None:
+                return self._zip.read(content["_file"])
+            with open(os.path.join(os.path.dirname(self.path), content["_file"]), "rb") as f:
+                return f.read()
+        text = content.get("text") or ""
+        return base64.b64decode(text) if content.get("encoding") == "base64" else text.encode("utf-8")
+
+    def _response(self, url: str) -> requests.Response:
+        entry = self._by_url.get(url)
+        if entry is None:
+            # Archives hold URLs as sent, e.g. with the empty path as "/"
+            entry = self._by_url.get(requests.Request("GET", url).prepare().url)
+        if entry is None:
+            raise HarMissError(f"{url} is not in {self.path}")
+        raw = entry.get("response") or {}
+        resp = requests.Response()
+        resp.url = url
+        resp.status_code = int(raw.get("status") or 0)
+        resp.reason = raw.get("statusText") or ""
+        resp.headers = CaseInsensitiveDict({h["name"]: h["value"] for h in raw.get("headers") or []})
+        resp._content = self._body(raw.get("content") or {})
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        return resp
+
+    def get(self, url: str, timeout: Optional[float] = None, allow_redirects: bool = True, **kwargs: Any) -> requests.Response:
+        resp = self._response(url)
+        history = []
+        while allow_redirects and resp.is_redirect and len(history) < 30:
+            history.append(resp)
+            resp = self._response(urljoin(resp.url, resp.headers["Location"]))
+        resp.history = history
+        return resp
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
@@ -0,0 +1,234 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .llm import LLMBackend
+
+
+TRIGGERS = ("first_token", "output")
+
+
+class AttemptCancelled(Exception):
+    """Raised inside an attempt that lost the race; its stream is closed."""
+
+
+@dataclass
+class HedgePolicy:
+    """When to start a backup attempt of an LLM call, and on which model.
+
+    The backup starts when the first attempt has produced nothing after the
+    hedge delay: no streamed token (``trigger="first_token"``) or no
+    output at all (``"output"``). It also starts at once if the first attempt
+    fails or returns output that does not pass validation. The delay is
+    ``delay_seconds`` if set. Otherwise it is the ``percentile`` of recently
+    observed latencies for the trigger, or ``initial_delay_seconds`` until
+    ``min_samples`` calls have finished. ``fallback_model`` runs the backup
+    on another model; by default it uses the same one.
+    """
+
+    delay_seconds: Optional[float] = None
+    percentile: float = 95.0
+    initial_delay_seconds: float = 15.0
+    min_samples: int = 20
+    trigger: str = "first_token"
+    fallback_model: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.trigger not in TRIGGERS:
+            raise ValueError(f"Unknown hedge trigger: {self.trigger} (choose from {', '.join(TRIGGERS)})")
+        if not 0 < self.percentile < 100:
+            raise ValueError("Hedge percentile must be between 0 and 100")
+
+    @classmethod
+    def parse(cls, spec: str, **kwargs: Any) -> "HedgePolicy":
+        """``p95`` (percentile of observed latency) or a fixed delay in seconds such as ``4.5``."""
+        spec = spec.strip().lower()
+        if spec.startswith("p"):
+            return cls(percentile=float(spec[1:]), **kwargs)
+        return cls(delay_seconds=float(spec), **kwargs)
+
+
+class HedgeStats:
+    """Counters and a latency window shared by all hedged calls of one agent."""
+
+    def __init__(self, window: int = 500) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.reasons: Dict[str, int] = {"slow": 0, "error": 0, "invalid": 0}
+        self.wins: Dict[str, int] = {"primary": 0, "hedge": 0}
+        self.cancelled = 0
+        self.failed = 0
+        self._latency: Dict[str, Deque[float]] = {t: deque(maxlen=window) for t in TRIGGERS}
+
+    def observe(self, trigger: str, seconds: float) -> None:
+        with self._lock:
+            self._latency[trigger].append(seconds)
+
+    def delay(self, policy: HedgePolicy) -> float:
+        if policy.delay_seconds is not None:
+            return policy.delay_seconds
+        with self._lock:
+            samples = sorted(self._latency[policy.trigger])
+        if len(samples) < policy.min_samples:
+            return policy.initial_delay_seconds
+        return samples[min(len(samples) - 1, int(math.ceil(policy.percentile / 100.0 * len(samples))) - 1)]
+
+    def snapshot(self, policy: Optional[HedgePolicy] = None) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "reasons": dict(self.reasons),
+                "wins": dict(self.wins),
+                "hedge_win_rate": round(self.wins["hedge"] / self.hedged, 4) if self.hedged else 0.0,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+            }
+        if policy is not None:
+            out["delay_seconds"] = round(self.delay(policy), 4)
+        return out
+
+
+class _Attempt:
+    def __init__(self, kind: str, model: str) -> None:
+        self.kind = kind
+        self.model = model
+        self.cancel = threading.Event()
+        self.first_token = asyncio.Event()
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.usage: Dict[str, Any] = {}
+        self.task: Optional["asyncio.Future[str]"] = None
+
+    def run(
+        self, backend: LLMBackend, prompt: str, temperature: float, max_tokens: int,
+        schema: Optional[Dict[str, Any]], loop: Any,
+    ) -> str:
+        parts: List[str] = []
+        stream = backend.stream(prompt, self.model, temperature, max_tokens, usage=self.usage, schema=schema)
+        try:
+            for chunk in stream:
+                if self.cancel.is_set():
+                    raise AttemptCancelled()
+                if not parts:
+                    self.first_token_at = time.perf_counter()
+                    loop.call_soon_threadsafe(self.first_token.set)
+                parts.append(chunk)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return "".join(parts)
+
+
+def _usage(attempt: _Attempt) -> Dict[str, Any]:
+    first_token = None if attempt.first_token_at is None else round(attempt.first_token_at - attempt.started, 4)
+    return {"usage": dict(attempt.usage), "first_token_seconds": first_token}
+
+
+async def hedged_completion(
+    backend: LLMBackend,
+    prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    policy: HedgePolicy,
+    stats: HedgeStats,
+    accept: Callable[[str], bool],
+    schema: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Run ``prompt`` with at most one backup attempt; first output passing ``accept`` wins.
+
+    Each attempt streams in a worker thread. The loser is cancelled: its
+    stream is closed at the next chunk it receives. An attempt still waiting
+    for its first byte cannot be interrupted, so its thread finishes in the
+    background. If no attempt produces accepted output, the first output
+    received is returned; if there was none, the first error is raised.
+    ``schema`` is passed on to the backend for structured output. Returns the
+    text and a summary of the race, with the token ``usage`` and
+    ``first_token_seconds`` of the attempt whose output is returned.
+    """
+    loop = asyncio.get_running_loop()
+
+    def launch(kind: str, attempt_model: str) -> _Attempt:
+        attempt = _Attempt(kind, attempt_model)
+        attempt.task = asyncio.ensure_future(
+            loop.run_in_executor(None, attempt.run, backend, prompt, temperature, max_tokens, schema, loop)
+        )
+        # Losers may fail after the race is decided; nobody awaits them
+        attempt.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return attempt
+
+    with stats._lock:
+        stats.calls += 1
+    primary = launch("primary", model)
+    attempts = [primary]
+    info: Dict[str, Any] = {"attempts": 1, "hedge_reason": None, "winner": None}
+
+    def hedge(reason: str) -> None:
+        attempts.append(launch("hedge", policy.fallback_model or model))
+        info.update(attempts=2, hedge_reason=reason, hedge_after_seconds=round(time.perf_counter() - primary.started, 4))
+        with stats._lock:
+            stats.hedged += 1
+            stats.reasons[reason] += 1
+
+    try:
+        watch = asyncio.ensure_future(primary.first_token.wait()) if policy.trigger == "first_token" else None
+        try:
+            done, _ = await asyncio.wait(
+                [primary.task] + ([watch] if watch else []),
+                timeout=stats.delay(policy), return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            if watch is not None and not watch.done():
+                watch.cancel()
+        if not done:
+            hedge("slow")
+
+        fallback: Optional[str] = None
+        fallback_attempt = primary
+        errors: List[BaseException] = []
+        pending = {a.task: a for a in attempts}
+        while pending:
+            finished, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                attempt = pending.pop(task)
+                elapsed = time.perf_counter() - attempt.started
+                try:
+                    text = task.result()
+                except Exception as e:
+                    errors.append(e)
+                    outcome = "error"
+                else:
+                    stats.observe("output", elapsed)
+                    if attempt.first_token_at is not None:
+                        stats.observe("first_token", attempt.first_token_at - attempt.started)
+                    if accept(text):
+                        with stats._lock:
+                            stats.wins[attempt.kind] += 1
+                            stats.cancelled += len(pending)
+                        info.update(winner=attempt.kind, model=attempt.model, seconds=round(elapsed, 4), **_usage(attempt))
+                        return text, info
+                    if fallback is None:
+                        fallback, fallback_attempt = text, attempt
+                    outcome = "invalid"
+                if attempt is primary and len(attempts) == 1:
+                    hedge(outcome)
+                    pending[attempts[-1].task] = attempts[-1]
+
+        with stats._lock:
+            stats.failed += 1
+        if fallback is not None:
+            info.update(winner="none", model=fallback_attempt.model, **_usage(fallback_attempt))
+            return fallback, info
+        raise errors[0]
+    finally:
+        # Losers (or every attempt, if this call itself is cancelled) stop at their next chunk
+        for attempt in attempts:
+            attempt.cancel.set()
@@ -0,0 +1,317 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
+
+
+# Parameters that change what a job produces; everything else is per-request
+# plumbing and does not break deduplication.
+DEDUP_FIELDS = {
+    "scan": (
+        "url", "max_pages", "max_links_per_page", "cross_origin", "no_screenshot", "templates", "parser",
+        "frontier", "no_sitemap",
+    ),
+    "storyboard": ("site_in", "site_summary", "persona", "goal", "duration_hint"),
+    "generate": (
+        "url", "max_pages", "max_links_per_page", "cross_origin", "no_screenshot", "templates", "parser",
+        "frontier", "no_sitemap", "persona", "goal", "duration_hint",
+    ),
+}
+# Where a caller wants the result written. A caller deduplicated onto another
+# job gets these delivered from the shared result when it finishes.
+OUTPUT_FIELDS = ("out", "site_out", "transcript_out", "request_id", "artifacts_dir")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status);
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    outputs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deliveries_job ON deliveries (job_id);
+"""
+
+
+def _normalize_url(url: Any) -> Any:
+    if not isinstance(url, str):
+        return url
+    parsed = urlparse(url.strip())
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, "", parsed.query, ""))
+
+
+def dedup_key(kind: str, params: Dict[str, Any]) -> str:
+    """Stable hash of the fields that determine a job's result."""
+    fields = DEDUP_FIELDS.get(kind, tuple(sorted(params)))
+    material = {f: params.get(f) for f in fields if params.get(f) is not None}
+    if "url" in material:
+        material["url"] = _normalize_url(material["url"])
+    blob = json.dumps([kind, material], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _outputs(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {f: params[f] for f in OUTPUT_FIELDS if params.get(f) is not None}
+
+
+class JobStore:
+    """SQLite-backed job table (queue, status and persisted results)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def recover(self) -> int:
+        """Requeue jobs a previous process left running."""
+        cur = self.conn.execute("UPDATE jobs SET status='queued', started_at=NULL WHERE status='running'")
+        return cur.rowcount
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: int = 0, reuse_seconds: float = 0.0) -> Tuple[str, bool]:
+        """Insert a job unless an identical one is in flight (or recently done).
+
+        A deduplicated caller whose ``OUTPUT_FIELDS`` differ from the job's
+        gets a delivery row, taken by ``take_deliveries`` once the job is
+        done. Returns ``(job_id, deduplicated)``.
+        """
+        key = dedup_key(kind, params)
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, priority, params FROM jobs WHERE dedup_key=? AND status IN ('queued','running') ORDER BY created_at LIMIT 1",
+                (key,),
+            ).fetchone()
+            if row is None and reuse_seconds > 0:
+                row = self.conn.execute(
+                    "SELECT id, priority, params FROM jobs WHERE dedup_key=? AND status='done' AND finished_at>=? ORDER BY finished_at DESC LIMIT 1",
+                    (key, now - reuse_seconds),
+                ).fetchone()
+            if row is not None:
+                if priority > row["priority"]:
+                    # A more urgent duplicate bumps the shared job
+                    self.conn.execute("UPDATE jobs SET priority=? WHERE id=? AND status='queued'", (priority, row["id"]))
+                outputs = _outputs(params)
+                if outputs and outputs != _outputs(json.loads(row["params"])):
+                    self.conn.execute(
+                        "INSERT INTO deliveries (job_id, outputs) VALUES (?, ?)", (row["id"], json.dumps(outputs))
+                    )
+                self.conn.execute("COMMIT")
+                return row["id"], True
+            job_id = uuid.uuid4().hex
+            self.conn.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, params, priority, status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, key, json.dumps(params), priority, now),
+            )
+            self.conn.execute("COMMIT")
+            return job_id, False
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """Atomically move the most urgent queued job to running."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE status='queued' ORDER BY priority DESC, created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status='running', started_at=?, attempts=attempts+1 WHERE id=?",
+                (time.time(), row["id"]),
+            )
+            self.conn.execute("COMMIT")
+            return row
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self.conn.execute(
+            "UPDATE jobs SET status=?, result=?, error=?, finished_at=? WHERE id=?",
+            ("failed" if error else "done", json.dumps(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+    def take_deliveries(self, job_id: str) -> List[Dict[str, Any]]:
+        """Remove and return the outputs of callers deduplicated onto a job."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute("SELECT outputs FROM deliveries WHERE job_id=? ORDER BY id", (job_id,)).fetchall()
+            self.conn.execute("DELETE FROM deliveries WHERE job_id=?", (job_id,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [json.loads(r["outputs"]) for r in rows]
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        out = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "error": row["error"],
+        }
+        if row["status"] == "queued":
+            out["queue_position"] = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status='queued' AND (priority>? OR (priority=? AND created_at<?))",
+                (row["priority"], row["priority"], row["created_at"]),
+            ).fetchone()[0]
+        if include_result and row["result"] is not None:
+            out["result"] = json.loads(row["result"])
+        return out
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+
+class JobScheduler:
+    """Runs queued jobs from a ``JobStore`` on a pool of asyncio workers.
+
+    ``runner(kind, params)`` does the actual work; stage limits (concurrent
+    crawls, concurrent LLM calls) are enforced by the runner so a job waiting
+    on the LLM does not hold a browser. Identical in-flight submissions share
+    one job and one result; ``deliver(kind, outputs, result)`` writes that
+    result to the output paths of each caller deduplicated onto the job.
+    Bursts only grow the queue.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        runner: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        workers: int = 4,
+        reuse_seconds: float = 0.0,
+        poll_seconds: float = 0.5,
+        deliver: Optional[Callable[[str, Dict[str, Any], Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.store = store
+        self.runner = runner
+        self.deliver = deliver
+        self.workers = max(1, workers)
+        self.reuse_seconds = reuse_seconds
+        self.poll_seconds = poll_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self.store.recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        if kind not in DEDUP_FIELDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id, deduplicated = self.store.submit(kind, params, priority, self.reuse_seconds)
+        self._wakeup.set()
+        status = self.store.get(job_id, include_result=False)
+        status["deduplicated"] = deduplicated
+        if deduplicated and status["status"] == "done":
+            # Reused a finished job: nothing will finish later to deliver this caller's outputs
+            self._deliver(job_id, kind, self.store.get(job_id)["result"])
+        return status
+
+    def _deliver(self, job_id: str, kind: str, result: Optional[Dict[str, Any]]) -> None:
+        for outputs in self.store.take_deliveries(job_id):
+            if self.deliver is None or result is None:
+                continue
+            try:
+                self.deliver(kind, outputs, result)
+            except Exception as e:
+                # The deduplicated caller is not waiting on this job's error; keep the worker alive
+                print(f"Job {job_id}: delivering outputs {sorted(outputs)} failed ({e})", file=sys.stderr)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        if job["status"] in ("done", "failed"):
+            return job
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, []).append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(job_id, [])
+            if fut in waiters:
+                waiters.remove(fut)
+        return self.store.get(job_id)
+
+    async def submit_and_wait(self, kind: str, params: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        job = await self.wait(self.submit(kind, params, priority)["id"])
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        return job["result"]
+
+    async def _worker(self) -> None:
+        while True:
+            row = self.store.claim()
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id = row["id"]
+            try:
+                result = await self.runner(row["kind"], json.loads(row["params"]))
+                self.store.finish(job_id, result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = None
+                self.store.finish(job_id, error=str(e) or type(e).__name__)
+            self._deliver(job_id, row["kind"], result)
+            for fut in self._waiters.pop(job_id, []):
+                if not fut.done():
+                    fut.set_result(None)
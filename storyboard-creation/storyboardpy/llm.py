@@ -0,0 +1,356 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+
+class LLMBackend:
+    """Interface for the text-completion backends used by StoryboardAgent."""
+
+    name = "base"
+
+    def complete(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, Any]] = None,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Completion text. Backends that know token counts put them in ``usage``.
+
+        The keys are ``prompt_tokens``, ``completion_tokens``,
+        ``billed_input_tokens``, ``billed_output_tokens``, ``finish_reason``
+        and ``structured``; any of them may be missing. ``schema`` asks for
+        output constrained to that JSON Schema; backends that cannot
+        constrain decoding ignore it (and report ``structured`` False).
+        """
+        raise NotImplementedError
+
+    def stream(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, Any]] = None,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        """Text chunks as they are generated; closing the iterator abandons the call.
+
+        Backends without streaming produce the whole completion as one chunk.
+        ``usage`` is filled as in ``complete`` once the stream ends.
+        """
+        yield self.complete(prompt, model, temperature, max_tokens, usage=usage, schema=schema)
+
+
+def _cohere_usage(response: Any, usage: Optional[Dict[str, Any]]) -> None:
+    if usage is None or response is None:
+        return
+    usage["finish_reason"] = getattr(response, "finish_reason", None)
+    meta = getattr(response, "meta", None)
+    tokens = getattr(meta, "tokens", None)
+    billed = getattr(meta, "billed_units", None)
+    for key, source, field in (
+        ("prompt_tokens", tokens, "input_tokens"),
+        ("completion_tokens", tokens, "output_tokens"),
+        ("billed_input_tokens", billed, "input_tokens"),
+        ("billed_output_tokens", billed, "output_tokens"),
+    ):
+        value = getattr(source, field, None)
+        if value is not None:
+            usage[key] = int(value)
+
+
+class CohereBackend(LLMBackend):
+    """Calls the Cohere Chat API.
+
+    A ``schema`` is sent as a ``json_object`` response format. Models that
+    reject it (a 400/422 answer to the request) are remembered, and their
+    calls go out without a schema from then on, starting with the rejected
+    one.
+    """
+
+    name = "cohere"
+
+    def __init__(self, api_key: Optional[str] = None, timeout_seconds: Optional[int] = None):
+        self.api_key = api_key or os.getenv("COHERE_API_KEY")
+        if not self.api_key:
+            raise RuntimeError("COHERE_API_KEY not set. Provide via environment or .env file.")
+        self.timeout_seconds = timeout_seconds
+        import cohere
+        self.co = cohere.Client(self.api_key, timeout=timeout_seconds)
+        self.schema_unsupported: Set[str] = set()
+
+    def _request(self, prompt: str, model: str, temperature: float, max_tokens: int, schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = dict(model=model, message=prompt, temperature=temperature, max_tokens=max_tokens)
+        if schema is not None and model not in self.schema_unsupported:
+            from cohere import JsonObjectResponseFormat
+
+            kwargs["response_format"] = JsonObjectResponseFormat(schema_=schema)
+        return kwargs
+
+    def _rejected_schema(self, kwargs: Dict[str, Any], error: Exception) -> bool:
+        """True (and the model is remembered) when a schema request failed as unsupported."""
+        if "response_format" in kwargs and getattr(error, "status_code", None) in (400, 422):
+            self.schema_unsupported.add(kwargs["model"])
+            return True
+        return False
+
+    def complete(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, Any]] = None,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        kwargs = self._request(prompt, model, temperature, max_tokens, schema)
+        try:
+            try:
+                response = self.co.chat(**kwargs)
+            except Exception as e:
+                if not self._rejected_schema(kwargs, e):
+                    raise
+                kwargs.pop("response_format")
+                response = self.co.chat(**kwargs)
+        except Exception as e:
+            raise RuntimeError(f"Cohere API request failed: {e}")
+
+        # Extract text from chat response
+        _cohere_usage(response, usage)
+        if usage is not None:
+            usage["structured"] = "response_format" in kwargs
+        if hasattr(response, 'text'):
+            return response.text
+        raise RuntimeError(f"Chat response has no text attribute: {response}")
+
+    def stream(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, Any]] = None,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        kwargs = self._request(prompt, model, temperature, max_tokens, schema)
+        events = None
+        try:
+            events = self.co.chat_stream(**kwargs)
+            try:
+                # The request is only sent when the stream is first read
+                first = next(events, None)
+            except Exception as e:
+                if not self._rejected_schema(kwargs, e):
+                    raise
+                kwargs.pop("response_format")
+                events = self.co.chat_stream(**kwargs)
+                first = next(events, None)
+            for event in itertools.chain([first] if first is not None else [], events):
+                if event.event_type == "text-generation":
+                    yield event.text
+                elif event.event_type == "stream-end":
+                    _cohere_usage(event.response, usage)
+                    if usage is not None:
+                        usage.update(finish_reason=event.finish_reason, structured="response_format" in kwargs)
+        except Exception as e:
+            raise RuntimeError(f"Cohere API request failed: {e}")
+        finally:
+            # Closes the HTTP stream when the caller stops early (e.g. a lost hedge)
+            if events is not None:
+                events.close()
+
+
+class CassetteMissError(RuntimeError):
+    """Raised in replay mode when no recorded response matches a prompt."""
+
+
+class CassetteBackend(LLMBackend):
+    """Records prompt/response pairs to a JSON cassette, or replays them offline.
+
+    In ``record`` mode every call is forwarded to ``inner`` and the exchange is
+    appended to the cassette. In ``replay`` mode responses are served from the
+    cassette only; ``strict=False`` serves recorded responses round-robin when
+    the prompt was never recorded, which suits load tests over synthetic sites.
+    ``latency_seconds`` overrides the recorded latency (``None`` replays it),
+    ``latency_scale`` and ``latency_jitter`` reshape it, ``tail_rate`` makes
+    that share of calls take ``tail_seconds`` instead (a slow tail for
+    hedging tests), and ``error_rate`` injects ``RuntimeError`` failures with
+    the given probability. Token usage reported by ``inner`` is recorded and
+    handed back on replay; a ``schema`` is passed to ``inner`` when recording
+    and does not change which response is replayed.
+    """
+
+    name = "cassette"
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        inner: Optional[LLMBackend] = None,
+        strict: bool = True,
+        latency_seconds: Optional[float] = 0.0,
+        latency_scale: float = 1.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_seconds: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Cassette record mode needs an inner backend")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.strict = strict
+        self.latency_seconds = latency_seconds
+        self.latency_scale = latency_scale
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self.tail_seconds = tail_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self.interactions: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            self._load()
+        elif mode == "replay":
+            raise RuntimeError(f"Cassette not found: {path}")
+
+    @staticmethod
+    def interaction_key(prompt: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.interactions = list(data.get("interactions", []))
+        self._by_key = {i["key"]: i for i in self.interactions if "key" in i}
+
+    def _save(self) -> None:
+        dirpath = os.path.dirname(self.path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "interactions": self.interactions}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def complete(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, Any]] = None,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        if self.mode == "record":
+            return self._record(prompt, model, temperature, max_tokens, usage, schema)
+        return self._replay(prompt, model, usage)
+
+    def _record(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, Any]],
+        schema: Optional[Dict[str, Any]],
+    ) -> str:
+        started = time.perf_counter()
+        recorded: Dict[str, Any] = {}
+        text = self.inner.complete(prompt, model, temperature, max_tokens, usage=recorded, schema=schema)
+        elapsed = time.perf_counter() - started
+        key = self.interaction_key(prompt, model)
+        entry = {
+            "key": key,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "prompt": prompt,
+            "response": text,
+            "latency_seconds": round(elapsed, 4),
+            "usage": recorded,
+            "recorded_at": int(time.time()),
+        }
+        if usage is not None:
+            usage.update(recorded)
+        with self._lock:
+            if key in self._by_key:
+                self.interactions.remove(self._by_key[key])
+            self.interactions.append(entry)
+            self._by_key[key] = entry
+            self._save()
+        return text
+
+    def _replay(self, prompt: str, model: str, usage: Optional[Dict[str, Any]]) -> str:
+        with self._lock:
+            entry = self._by_key.get(self.interaction_key(prompt, model))
+            if entry is None:
+                if self.strict or not self.interactions:
+                    raise CassetteMissError(
+                        f"No recorded response for prompt ({len(prompt)} chars, model={model}) in {self.path}"
+                    )
+                entry = self.interactions[self._cursor % len(self.interactions)]
+                self._cursor += 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            delay = self._replay_delay(entry)
+
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("Cohere API request failed: injected cassette error")
+        if usage is not None:
+            usage.update(entry.get("usage") or {})
+        return entry["response"]
+
+    def _replay_delay(self, entry: Dict[str, Any]) -> float:
+        if self.latency_seconds is None:
+            base = float(entry.get("latency_seconds") or 0.0)
+        else:
+            base = float(self.latency_seconds)
+        base *= self.latency_scale
+        if self.latency_jitter:
+            base += self._rng.uniform(-self.latency_jitter, self.latency_jitter)
+        if self.tail_rate > 0 and self._rng.random() < self.tail_rate:
+            base = self.tail_seconds
+        return max(0.0, base)
+
+
+def backend_from_env(timeout_seconds: Optional[int] = None) -> LLMBackend:
+    """Build the backend selected by STORYBOARD_CASSETTE* variables (default: Cohere)."""
+    cassette = os.getenv("STORYBOARD_CASSETTE")
+    if not cassette:
+        return CohereBackend(timeout_seconds=timeout_seconds)
+
+    mode = os.getenv("STORYBOARD_CASSETTE_MODE", "replay")
+    latency_env = os.getenv("STORYBOARD_CASSETTE_LATENCY", "0")
+    try:
+        latency = None if latency_env == "recorded" else float(latency_env)
+    except ValueError:
+        latency = 0.0
+    try:
+        error_rate = float(os.getenv("STORYBOARD_CASSETTE_ERROR_RATE", "0"))
+    except ValueError:
+        error_rate = 0.0
+    inner = CohereBackend(timeout_seconds=timeout_seconds) if mode == "record" else None
+    return CassetteBackend(
+        cassette,
+        mode=mode,
+        inner=inner,
+        strict=os.getenv("STORYBOARD_CASSETTE_STRICT", "1") != "0",
+        latency_seconds=latency,
+        error_rate=error_rate,
+    )
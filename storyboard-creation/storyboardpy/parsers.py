@@ -0,0 +1,285 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+# Strings inside these are not page text for BeautifulSoup's get_text (Script, Stylesheet, ... string types)
+_NON_TEXT = ("script", "style", "template", "rt", "rp")
+_CLICKABLE_TAGS = ("a", "button")
+_FIELD_TAGS = ("input", "textarea", "select")
+_HEADINGS = ("h1", "h2", "h3")
+# Root-relative hrefs urljoin would return as origin + href unchanged (no query, params or dot segments)
+_PLAIN_PATH = re.compile(r"/(?!/)[A-Za-z0-9\-_~!$&'()*+,=:@%/.]*")
+# libxml2 errors meaning its tree no longer matches the markup as written
+_REPAIRS = {"ERR_TAG_NAME_MISMATCH", "ERR_TAG_NOT_FINISHED"}
+
+
+@dataclass
+class ParsedPage:
+    """What the requests engine extracts from one HTML document.
+
+    ``clickables`` and ``forms`` hold the fields of the explorer's
+    ``Clickable`` and ``FormInfo`` dataclasses; ``structure`` is the
+    ``parent>tag.firstclass`` token list used for template fingerprints.
+    """
+
+    title: Optional[str]
+    description: Optional[str]
+    headings: List[str]
+    nav_links: List[Tuple[str, str]]
+    clickables: List[Dict[str, Any]]
+    forms: List[Dict[str, Any]]
+    links: List[str]
+    structure: List[str]
+
+
+def _locator(role: Optional[str], aria: Optional[str], id_attr: Optional[str], text: Optional[str]) -> Optional[str]:
+    if aria:
+        return f"role={role or 'button'}[name=\"{aria}\"]"
+    if id_attr:
+        return f"#{id_attr}"
+    if text and len(text) <= 60:
+        cleaned_text = re.sub(r'\s+', ' ', text)
+        return f"text={cleaned_text}"
+    return None
+
+
+def _form_hint(index: int, id_attr: Optional[str], name: Optional[str]) -> str:
+    if id_attr:
+        return f"#{id_attr}"
+    return f"form[name=\"{name}\"]" if name else f"form:nth-of-type({index + 1})"
+
+
+class HtmlParser:
+    """Extracts a ``ParsedPage`` from HTML for the requests engine.
+
+    Backends must agree exactly on well-formed documents, so crawl output
+    does not depend on which one is installed. Line endings are normalized
+    first (as browsers do), since not every parser preserves ``\\r``.
+    """
+
+    name = "base"
+
+    def parse(self, html: str, url: str) -> ParsedPage:
+        return self._parse(html.replace("\r\n", "\n").replace("\r", "\n"), url)
+
+    def _parse(self, html: str, url: str) -> ParsedPage:
+        raise NotImplementedError
+
+
+class SoupParser(HtmlParser):
+    """BeautifulSoup with the pure-Python ``html.parser`` and CSS ``select`` passes.
+
+    The reference implementation: always available, and the behaviour every
+    other backend is checked against.
+    """
+
+    name = "html.parser"
+
+    def _parse(self, html: str, url: str) -> ParsedPage:
+        from bs4 import BeautifulSoup
+        from .templates import structure_tokens
+
+        soup = BeautifulSoup(html, 'html.parser')
+        title = soup.title.string.strip() if soup.title and soup.title.string else None
+        meta = soup.find('meta', attrs={'name': 'description'})
+        description = meta['content'].strip() if meta and meta.get('content') else None
+        headings = [h.get_text(strip=True) for h in soup.select('h1, h2, h3')][:50]
+        nav_links_tags = soup.select('nav a[href]')[:50]
+        nav_links = [(a.get_text(strip=True), urljoin(url, a['href'])) for a in nav_links_tags]
+
+        # Clickables approximation
+        clickables: List[Dict[str, Any]] = []
+        for el in soup.select('a, button, [role="button"], input[type="submit"], [onclick]')[:100]:
+            tag = el.name.lower() if hasattr(el, 'name') else None
+            role = el.get('role')
+            href = el.get('href')
+            aria = el.get('aria-label')
+            id_attr = el.get('id')
+            classes = el.get('class')
+            text = el.get_text(strip=True) if hasattr(el, 'get_text') else None
+            if tag == 'input' and not text:
+                text = el.get('value')
+            clickables.append(dict(
+                text=text, role=role, tag=tag, href=(urljoin(url, href) if href else None),
+                aria_label=aria, id_attr=id_attr, classes=' '.join(classes) if classes else None,
+                locator_suggestion=_locator(role, aria, id_attr, text), bbox=None,
+            ))
+
+        # Forms approximation
+        forms: List[Dict[str, Any]] = []
+        for i, f in enumerate(soup.select('form')[:20]):
+            fields = [
+                dict(
+                    name=fld.get('name') or fld.get('id'),
+                    type=(fld.get('type') or fld.name or '').lower(),
+                    placeholder=fld.get('placeholder'),
+                )
+                for fld in f.select('input, textarea, select')[:20]
+            ]
+            submit = f.select_one('[type="submit"], button[type="submit"], button')
+            submit_text = None
+            if submit:
+                submit_text = submit.get_text(strip=True) or submit.get('value')
+            forms.append(dict(selector_hint=_form_hint(i, f.get('id'), f.get('name')), fields=fields, submit_button_text=submit_text))
+
+        links = [urljoin(url, a['href']) for a in soup.select('a[href]')][:200]
+        return ParsedPage(
+            title=title, description=description, headings=headings, nav_links=nav_links,
+            clickables=clickables, forms=forms, links=links, structure=structure_tokens(soup),
+        )
+
+
+class LxmlParser(HtmlParser):
+    """libxml2 (via lxml) parse plus one pass over the tree.
+
+    Every element is visited once, in document order, and routed to whatever
+    it contributes to (title, headings, clickables, form fields, links,
+    structure tokens) instead of running a CSS selector per field. Text is
+    gathered with a compiled XPath that skips the same script/style/template
+    content BeautifulSoup's ``get_text`` does.
+
+    libxml2 repairs some markup that ``html.parser`` keeps as written (it
+    closes an ``<a>`` before a heading inside it, for one); it reports those
+    repairs as tag mismatches, and such documents are handed to
+    ``SoupParser`` so the output stays identical. Structure tokens can still
+    differ between backends, which is fine since fingerprints are only
+    compared within one crawl.
+    """
+
+    name = "lxml"
+
+    def __init__(self) -> None:
+        from lxml import etree
+
+        self._etree = etree
+        self._parser = etree.HTMLParser(encoding="utf-8")
+        excluded = " or ".join(f"ancestor::{t}" for t in _NON_TEXT)
+        self._texts = etree.XPath(f"descendant-or-self::text()[not({excluded})]", smart_strings=False)
+        self._reference = SoupParser()
+        self.fallbacks = 0
+
+    def _text(self, el: Any) -> str:
+        return "".join(t.strip() for t in self._texts(el))
+
+    def _parse(self, html: str, url: str) -> ParsedPage:
+        try:
+            root = self._etree.fromstring(html.encode("utf-8"), self._parser)
+        except self._etree.XMLSyntaxError:
+            root = None
+        page = ParsedPage(None, None, [], [], [], [], [], [])
+        if root is None:
+            return page
+        if any(e.type_name in _REPAIRS for e in self._parser.error_log):
+            self.fallbacks += 1
+            return self._reference._parse(html, url)
+
+        joined: Dict[str, str] = {}  # the same hrefs recur in nav, links and clickables
+        base = urlsplit(url)
+        origin = f"{base.scheme}://{base.netloc}" if base.scheme in ("http", "https") and base.netloc else None
+
+        def absolute(href: str) -> str:
+            full = joined.get(href)
+            if full is None:
+                if origin and _PLAIN_PATH.fullmatch(href) and "/." not in href:
+                    full = origin + href
+                else:
+                    full = urljoin(url, href)
+                joined[href] = full
+            return full
+
+        title_el = meta_el = None
+        forms: Dict[Any, Dict[str, Any]] = {}
+        submits: Dict[Any, Any] = {}
+        in_body = False
+        for el in root.iter():
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue  # comments, processing instructions
+            if in_body:
+                if len(page.structure) < 3000:
+                    classes = (el.get("class") or "").split()
+                    page.structure.append(f"{el.getparent().tag}>{tag}.{classes[0] if classes else ''}")
+            elif tag == "body":
+                in_body = True
+
+            if tag == "title":
+                if title_el is None:
+                    title_el = el
+            elif tag == "meta":
+                if meta_el is None and el.get("name") == "description":
+                    meta_el = el
+            elif tag in _HEADINGS:
+                if len(page.headings) < 50:
+                    page.headings.append(self._text(el))
+            elif tag == "form":
+                if len(forms) < 20:
+                    forms[el] = dict(
+                        selector_hint=_form_hint(len(forms), el.get("id"), el.get("name")),
+                        fields=[], submit_button_text=None,
+                    )
+
+            type_attr = el.get("type")
+            is_submit = type_attr is not None and type_attr.lower() == "submit"
+            if tag in _FIELD_TAGS or is_submit or tag == "button":
+                for form in el.iterancestors("form"):
+                    entry = forms.get(form)
+                    if entry is None:
+                        continue
+                    if tag in _FIELD_TAGS and len(entry["fields"]) < 20:
+                        entry["fields"].append(dict(
+                            name=el.get("name") or el.get("id"),
+                            type=(type_attr or tag or "").lower(),
+                            placeholder=el.get("placeholder"),
+                        ))
+                    if (is_submit or tag == "button") and form not in submits:
+                        submits[form] = el
+
+            href = el.get("href")
+            if tag == "a" and href is not None:
+                if len(page.links) < 200:
+                    page.links.append(absolute(href))
+                if len(page.nav_links) < 50 and next(el.iterancestors("nav"), None) is not None:
+                    page.nav_links.append((self._text(el), absolute(href)))
+
+            if len(page.clickables) < 100 and (
+                tag in _CLICKABLE_TAGS or el.get("role") == "button"
+                or (tag == "input" and is_submit) or el.get("onclick") is not None
+            ):
+                role = el.get("role")
+                aria = el.get("aria-label")
+                id_attr = el.get("id")
+                classes = (el.get("class") or "").split()
+                text: Optional[str] = self._text(el)
+                if tag == "input" and not text:
+                    text = el.get("value")
+                page.clickables.append(dict(
+                    text=text, role=role, tag=tag, href=(absolute(href) if href else None),
+                    aria_label=aria, id_attr=id_attr, classes=" ".join(classes) if classes else None,
+                    locator_suggestion=_locator(role, aria, id_attr, text), bbox=None,
+                ))
+
+        if title_el is not None and len(title_el) == 0 and title_el.text:
+            page.title = title_el.text.strip()
+        content = meta_el.get("content") if meta_el is not None else None
+        page.description = content.strip() if content else None
+        for form, el in submits.items():
+            forms[form]["submit_button_text"] = self._text(el) or el.get("value")
+        page.forms = list(forms.values())
+        return page
+
+
+PARSERS = {"html.parser": SoupParser, "lxml": LxmlParser}
+
+
+def get_parser(name: str = "auto") -> HtmlParser:
+    """Parser backend by name; ``auto`` prefers lxml when it is installed."""
+    if name == "auto":
+        try:
+            return LxmlParser()
+        except ImportError:
+            return SoupParser()
+    if name not in PARSERS:
+        raise ValueError(f"Unknown HTML parser: {name} (choose from auto, {', '.join(PARSERS)})")
+    return PARSERS[name]()
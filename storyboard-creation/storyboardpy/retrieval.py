@@ -0,0 +1,156 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Words that carry no signal in a goal like "Show the core value and test key flows"
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in", "is", "it", "its",
+    "me", "my", "of", "on", "or", "our", "show", "that", "the", "their", "them", "then", "this", "to",
+    "us", "we", "what", "with", "you", "your",
+}
+
+# (page index, kind, item index); kind is page | heading | clickable | form | nav
+Ref = Tuple[int, str, int]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens, stopwords removed and plurals folded (``invoices`` -> ``invoice``)."""
+    tokens = []
+    for tok in _TOKEN.findall((text or "").lower()):
+        if tok in _STOPWORDS:
+            continue
+        if len(tok) > 4 and tok.endswith("ies"):
+            tok = tok[:-3] + "y"
+        elif len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def _path_words(href: Optional[str]) -> str:
+    if not href:
+        return ""
+    parsed = urlparse(str(href))
+    return f"{parsed.path} {parsed.fragment}".replace("-", " ").replace("_", " ")
+
+
+def _pair(link: Any) -> Tuple[str, str]:
+    if isinstance(link, (list, tuple)) and len(link) >= 2:
+        return str(link[0] or ""), str(link[1] or "")
+    if isinstance(link, dict):
+        return str(link.get("text") or ""), str(link.get("href") or "")
+    return str(link or ""), ""
+
+
+class SiteIndex:
+    """BM25 index over the headings, clickables, forms and nav links of a site summary.
+
+    Every element is one short document, plus one document per page for its
+    title, description, URL and feature guesses. Postings are plain dicts of
+    term -> [(doc, tf)], so building the index for a few hundred pages and
+    scoring a query both take a few milliseconds.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.refs: List[Ref] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        # Nav links and buttons repeat on every page; tokenize each text once
+        self._counts: Dict[str, Counter] = {}
+
+    @classmethod
+    def from_site_summary(cls, site_summary: Dict[str, Any]) -> "SiteIndex":
+        index = cls()
+        pages = site_summary.get("pages") if isinstance(site_summary, dict) else None
+        for pi, page in enumerate(pages if isinstance(pages, list) else []):
+            if not isinstance(page, dict):
+                continue
+            features = page.get("features_guess") if isinstance(page.get("features_guess"), list) else []
+            index.add((pi, "page", 0), " ".join([
+                str(page.get("title") or ""), str(page.get("description") or ""),
+                _path_words(page.get("url")), " ".join(str(f) for f in features),
+            ]))
+            for i, heading in enumerate(page.get("headings") or []):
+                index.add((pi, "heading", i), str(heading or ""))
+            for i, c in enumerate(page.get("clickables") or []):
+                if isinstance(c, dict):
+                    index.add((pi, "clickable", i), " ".join([
+                        str(c.get("text") or ""), str(c.get("aria_label") or ""),
+                        str(c.get("id_attr") or ""), _path_words(c.get("href")),
+                    ]))
+            for i, form in enumerate(page.get("forms") or []):
+                if not isinstance(form, dict):
+                    continue
+                fields = [f for f in form.get("fields") or [] if isinstance(f, dict)]
+                index.add((pi, "form", i), " ".join(
+                    [str(form.get("selector_hint") or ""), str(form.get("submit_button_text") or "")]
+                    + [f"{f.get('name') or ''} {f.get('placeholder') or ''}" for f in fields]
+                ))
+            for i, link in enumerate(page.get("nav_links") or []):
+                text, href = _pair(link)
+                index.add((pi, "nav", i), f"{text} {_path_words(href)}")
+        return index
+
+    def add(self, ref: Ref, text: str) -> None:
+        counts = self._counts.get(text)
+        if counts is None:
+            counts = self._counts[text] = Counter(tokenize(text))
+        doc = len(self.refs)
+        self.refs.append(ref)
+        self._lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, []).append((doc, tf))
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def scores(self, query: str) -> Dict[Ref, float]:
+        """BM25 score of every element matching at least one query term."""
+        n = len(self.refs)
+        if not n:
+            return {}
+        avg_len = (sum(self._lengths) / n) or 1.0
+        acc: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                norm = self.k1 * (1.0 - self.b + self.b * self._lengths[doc] / avg_len)
+                acc[doc] = acc.get(doc, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return {self.refs[doc]: score for doc, score in acc.items()}
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, Ref]]:
+        ranked = sorted(((s, ref) for ref, s in self.scores(query).items()), key=lambda x: (-x[0], x[1]))
+        return ranked[:limit]
+
+
+def rank_pages(scores: Dict[Ref, float], page_count: int) -> List[int]:
+    """Page indices by summed element score; unmatched pages keep crawl order."""
+    totals = [0.0] * page_count
+    for (pi, _, _), score in scores.items():
+        if pi < page_count:
+            totals[pi] += score
+    return sorted(range(page_count), key=lambda pi: (-totals[pi], pi))
+
+
+def pick(scores: Dict[Ref, float], page: int, kind: str, count: int, limit: int) -> List[int]:
+    """Indices of ``limit`` items of one kind on a page: best matches first, then
+    the earliest items to fill the budget; returned in page order."""
+    matched = sorted(
+        (i for i in range(count) if (page, kind, i) in scores),
+        key=lambda i: (-scores[(page, kind, i)], i),
+    )[:limit]
+    chosen = set(matched)
+    for i in range(count):
+        if len(chosen) >= limit:
+            break
+        chosen.add(i)
+    return sorted(chosen)
@@ -1,3 +1,6 @@
+from typing import Any, Dict, List, Tuple
+
+
 STORYBOARD_JSON_SCHEMA = {
     "$schema": "https://json-schema.org/draft/2020-12/schema",
     "title": "Storyboard",
@@ -125,6 +128,7 @@ STORYBOARD_JSON_SCHEMA = {
             },
             "additionalProperties": False
         },
+        "generation": {"type": "object"},
         "visual_style": {
             "type": "object",
             "properties": {
@@ -138,3 +142,142 @@ STORYBOARD_JSON_SCHEMA = {
     },
     "additionalProperties": False
 }
+
+
+# What the storyboard prompt asks the model for (looser than the full schema
+# above: shots may be timed by duration only, extra keys are fine). Output
+# that passes this needs no repair beyond the agent's defaults.
+STORYBOARD_RESPONSE_SCHEMA = {
+    "type": "object",
+    "required": ["product_name", "suggested_duration_seconds", "scenes", "coverage", "assumptions", "risks", "transcript"],
+    "properties": {
+        "product_name": {"type": "string"},
+        "suggested_duration_seconds": {"type": "number"},
+        "scenes": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "required": ["id", "title", "duration_seconds", "narration"],
+                "properties": {
+                    "id": {"type": "string"},
+                    "title": {"type": "string"},
+                    "duration_seconds": {"type": "number"},
+                    "narration": {"type": "string"},
+                    "actions": {"type": "array", "items": {
+                        "type": "object",
+                        "required": ["type"],
+                        "properties": {"type": {"type": "string", "enum": ["navigate", "click", "input", "scroll", "wait", "assert"]}},
+                    }},
+                    "shots": {"type": "array", "items": {
+                        "type": "object",
+                        "properties": {"camera_move": {"type": "string", "enum": [
+                            "static", "zoom_in", "zoom_out", "pan_left", "pan_right", "pan_up", "pan_down", "focus_element"
+                        ]}},
+                    }},
+                },
+            },
+        },
+        "coverage": {},  # text per the prompt, often the full schema's object
+        "assumptions": {"type": "array", "items": {"type": "string"}},
+        "risks": {"type": "array", "items": {"type": "string"}},
+        "transcript": {
+            "type": "object",
+            "required": ["segments"],
+            "properties": {
+                "segments": {"type": "array", "items": {
+                    "type": "object",
+                    "required": ["scene_id", "start_seconds", "end_seconds", "text"],
+                    "properties": {
+                        "scene_id": {"type": "string"},
+                        "start_seconds": {"type": "number"},
+                        "end_seconds": {"type": "number"},
+                        "text": {"type": "string"},
+                    },
+                }},
+            },
+        },
+    },
+}
+
+# Keywords kept for constrained decoding; ranges, minItems and the like are
+# not accepted by Cohere's response_format schemas and are checked afterwards
+_CONSTRAINED_KEYWORDS = ("type", "properties", "required", "items", "enum")
+
+
+def constrained_schema(schema: Dict[str, Any], drop: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Copy of ``schema`` limited to what structured-output decoding supports.
+
+    Only ``_CONSTRAINED_KEYWORDS`` are kept, recursively; top-level
+    properties named in ``drop`` are removed (fields the agent fills in, not
+    the model).
+    """
+
+    def strip(sub: Dict[str, Any]) -> Dict[str, Any]:
+        out = {k: v for k, v in sub.items() if k in _CONSTRAINED_KEYWORDS}
+        if "properties" in out:
+            out["properties"] = {name: strip(prop) for name, prop in out["properties"].items()}
+        if isinstance(out.get("items"), dict):
+            out["items"] = strip(out["items"])
+        return out
+
+    out = strip(schema)
+    for name in drop:
+        out.get("properties", {}).pop(name, None)
+        if name in out.get("required", []):
+            out["required"] = [r for r in out["required"] if r != name]
+    return out
+
+
+# The full schema as the model is asked to produce it under structured output
+STORYBOARD_OUTPUT_SCHEMA = constrained_schema(STORYBOARD_JSON_SCHEMA, drop=("generation",))
+
+_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "number": (int, float), "integer": int, "null": type(None),
+}
+
+
+def schema_errors(data: Any, schema: Dict[str, Any], path: str = "$", limit: int = 20) -> List[str]:
+    """Violations of ``schema`` in ``data``, as ``path: message`` strings.
+
+    Checks the keywords the schemas here use (type, required, properties,
+    items, enum, minItems, minimum, maximum); ``additionalProperties`` is
+    not enforced. Stops after ``limit`` errors.
+    """
+    errors: List[str] = []
+
+    def check(value: Any, sub: Dict[str, Any], where: str) -> None:
+        if len(errors) >= limit:
+            return
+        expected = sub.get("type")
+        if expected:
+            ok = isinstance(value, _TYPES[expected]) and not (isinstance(value, bool) and expected in ("number", "integer"))
+            if expected == "integer" and isinstance(value, float) and value.is_integer():
+                ok = True
+            if not ok:
+                errors.append(f"{where}: expected {expected}, got {type(value).__name__}")
+                return
+        if "enum" in sub and value not in sub["enum"]:
+            errors.append(f"{where}: {value!r} is not one of {sub['enum']}")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if "minimum" in sub and value < sub["minimum"]:
+                errors.append(f"{where}: {value} is below {sub['minimum']}")
+            if "maximum" in sub and value > sub["maximum"]:
+                errors.append(f"{where}: {value} is above {sub['maximum']}")
+        if isinstance(value, dict):
+            for key in sub.get("required", []):
+                if key not in value:
+                    errors.append(f"{where}: missing {key}")
+            for key, prop in sub.get("properties", {}).items():
+                if key in value:
+                    check(value[key], prop, f"{where}.{key}")
+        if isinstance(value, list):
+            if len(value) < sub.get("minItems", 0):
+                errors.append(f"{where}: needs at least {sub['minItems']} items")
+            if "items" in sub:
+                for i, item in enumerate(value):
+                    check(item, sub["items"], f"{where}[{i}]")
+
+    check(data, schema, path)
+    return errors[:limit]
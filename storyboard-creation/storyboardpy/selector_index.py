@@ -0,0 +1,369 @@
+import re
+from dataclasses import dataclass, asdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+
+_IMPLICIT_ROLES = {"a": "link", "button": "button", "input": "button", "select": "combobox", "textarea": "textbox"}
+_HTML_TAGS = {
+    "a", "article", "aside", "body", "button", "div", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "html", "img", "input", "label", "li", "main", "nav", "ol", "option", "p", "section",
+    "select", "span", "svg", "table", "tbody", "td", "textarea", "th", "tr", "ul", "video",
+}
+_WS = re.compile(r"\s+")
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return _WS.sub(" ", _PUNCT.sub(" ", str(text).lower())).strip()
+
+
+def normalize_href(href: Optional[str]) -> str:
+    if not href:
+        return ""
+    parsed = urlparse(str(href).strip())
+    path = parsed.path.rstrip("/") or "/"
+    return f"{path}?{parsed.query}" if parsed.query else path
+
+
+def _looks_structural(selector: str) -> bool:
+    """True for CSS selectors built only from tags/combinators (e.g. ``nav a``, ``h1``)."""
+    for token in re.split(r"\s*[\s>+~,]\s*", selector.strip()):
+        if not token:
+            continue
+        head = re.match(r"^[\w-]*", token).group(0)
+        if head and head.lower() not in _HTML_TAGS:
+            return False
+        if not head and token[0] not in "*:[":
+            return False
+    return True
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class IndexedElement:
+    page_url: str
+    locator: str
+    by: str
+    text: Optional[str]
+    role: Optional[str]
+    id_attr: Optional[str]
+    href: Optional[str]
+    bbox: Optional[Dict[str, Any]]
+
+
+@dataclass
+class SelectorCheck:
+    selector: str
+    by: Optional[str]
+    status: str  # exact | fuzzy | unresolved | unverifiable
+    location: str  # e.g. "scene-2.actions[1].selector"
+    match: Optional[str] = None
+    match_by: Optional[str] = None
+    score: float = 0.0
+    page_url: Optional[str] = None
+    bbox: Optional[Dict[str, Any]] = None
+    reason: Optional[str] = None
+
+
+class SelectorIndex:
+    """Lookup tables over the clickables of a site summary.
+
+    Exact keys (normalized text, role+name, id, href, class, locator) are plain
+    dict lookups. Fuzzy text matching goes through a trigram inverted index so
+    only elements sharing trigrams with the query are scored.
+    """
+
+    def __init__(self) -> None:
+        self.elements: List[IndexedElement] = []
+        self.by_locator: Dict[str, List[int]] = {}
+        self.by_text: Dict[str, List[int]] = {}
+        self.by_role: Dict[str, List[int]] = {}
+        self.by_role_name: Dict[Tuple[str, str], List[int]] = {}
+        self.by_name: Dict[str, List[int]] = {}
+        self.by_id: Dict[str, List[int]] = {}
+        self.by_href: Dict[str, List[int]] = {}
+        self.by_class: Dict[str, List[int]] = {}
+        self.by_field: Dict[Tuple[str, str], List[int]] = {}
+        self._trigram_postings: Dict[str, List[int]] = {}
+        self._texts: Dict[int, str] = {}
+
+    @classmethod
+    def from_site_summary(cls, site_summary: Dict[str, Any]) -> "SelectorIndex":
+        index = cls()
+        for page in site_summary.get("pages") or []:
+            if not isinstance(page, dict):
+                continue
+            for c in page.get("clickables") or []:
+                if isinstance(c, dict):
+                    index.add(page.get("url") or "", c)
+            for form in page.get("forms") or []:
+                for fld in (form.get("fields") or []) if isinstance(form, dict) else []:
+                    if isinstance(fld, dict):
+                        index.add_field(page.get("url") or "", fld)
+        return index
+
+    def add_field(self, page_url: str, field: Dict[str, Any]) -> None:
+        """Index a form field by its name and placeholder (targets of ``input`` actions)."""
+        name, placeholder = field.get("name"), field.get("placeholder")
+        if name:
+            locator = f'[name="{name}"]'
+        elif placeholder:
+            locator = f'[placeholder="{placeholder}"]'
+        else:
+            return
+        i = len(self.elements)
+        self.elements.append(IndexedElement(
+            page_url=page_url, locator=locator, by="css", text=placeholder, role="textbox",
+            id_attr=None, href=None, bbox=None,
+        ))
+        self.by_locator.setdefault(locator, []).append(i)
+        if name:
+            self.by_field.setdefault(("name", name), []).append(i)
+        if placeholder:
+            self.by_field.setdefault(("placeholder", normalize_text(placeholder)), []).append(i)
+            self._texts[i] = normalize_text(placeholder)
+            for g in _trigrams(self._texts[i]):
+                self._trigram_postings.setdefault(g, []).append(i)
+
+    def add(self, page_url: str, clickable: Dict[str, Any]) -> None:
+        text = clickable.get("text")
+        aria = clickable.get("aria_label")
+        id_attr = clickable.get("id_attr")
+        tag = (clickable.get("tag") or "").lower()
+        role = clickable.get("role") or _IMPLICIT_ROLES.get(tag)
+        locator = clickable.get("locator_suggestion")
+        if not locator:
+            if id_attr:
+                locator = f"#{id_attr}"
+            elif aria:
+                locator = f"role={role or 'button'}[name=\"{aria}\"]"
+            elif text and len(text) <= 60:
+                locator = f"text={_WS.sub(' ', text).strip()}"
+            else:
+                return
+        by = "text" if locator.startswith("text=") else "role" if locator.startswith("role=") else "css"
+
+        i = len(self.elements)
+        self.elements.append(IndexedElement(
+            page_url=page_url, locator=locator, by=by, text=text, role=role,
+            id_attr=id_attr, href=clickable.get("href"), bbox=clickable.get("bbox"),
+        ))
+        self.by_locator.setdefault(locator, []).append(i)
+        norm_text = normalize_text(text)
+        norm_name = normalize_text(aria) or norm_text
+        if norm_text:
+            self.by_text.setdefault(norm_text, []).append(i)
+            self._texts[i] = norm_text
+            for g in _trigrams(norm_text):
+                self._trigram_postings.setdefault(g, []).append(i)
+        if role:
+            self.by_role.setdefault(role.lower(), []).append(i)
+        if norm_name:
+            self.by_name.setdefault(norm_name, []).append(i)
+            if role:
+                self.by_role_name.setdefault((role.lower(), norm_name), []).append(i)
+        if aria and norm_name != norm_text:
+            self._texts.setdefault(i, norm_name)
+            for g in _trigrams(norm_name):
+                self._trigram_postings.setdefault(g, []).append(i)
+        if id_attr:
+            self.by_id.setdefault(id_attr, []).append(i)
+        href = normalize_href(clickable.get("href"))
+        if href:
+            self.by_href.setdefault(href, []).append(i)
+        for cls_name in (clickable.get("classes") or "").split():
+            self.by_class.setdefault(cls_name, []).append(i)
+
+    def fuzzy_text(self, query: str, limit: int = 5) -> List[Tuple[float, int]]:
+        q = normalize_text(query)
+        if not q:
+            return []
+        counts: Dict[int, int] = {}
+        grams = _trigrams(q)
+        for g in grams:
+            for i in self._trigram_postings.get(g, ()):
+                counts[i] = counts.get(i, 0) + 1
+        # Score only the best trigram overlaps with the slower sequence ratio
+        shortlist = sorted(counts.items(), key=lambda kv: -kv[1])[: limit * 4]
+        scored = [
+            (SequenceMatcher(None, q, self._texts.get(i, "")).ratio(), i)
+            for i, _ in shortlist
+        ]
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return scored[:limit]
+
+    def _pick(self, candidates: Iterable[int], page_url: Optional[str]) -> Optional[IndexedElement]:
+        candidates = list(candidates)
+        if not candidates:
+            return None
+        if page_url:
+            for i in candidates:
+                if self.elements[i].page_url == page_url:
+                    return self.elements[i]
+        return self.elements[candidates[0]]
+
+    def resolve(self, selector: str, by: Optional[str] = None, page_url: Optional[str] = None, min_score: float = 0.75, location: str = "") -> SelectorCheck:
+        """Check one storyboard selector against the index."""
+        sel = (selector or "").strip()
+        check = SelectorCheck(selector=selector, by=by, status="unresolved", location=location)
+        if not sel:
+            check.reason = "empty selector"
+            return check
+
+        exact, fuzzy_query = self._exact_candidates(sel, by)
+        if exact is None and fuzzy_query is None:
+            check.status = "unverifiable"
+            check.reason = "structural selector; clickables carry no tag/DOM path to check against"
+            return check
+        element = self._pick(exact or [], page_url)
+        if element is not None:
+            return self._fill(check, "exact", element, 1.0)
+
+        if fuzzy_query:
+            for score, i in self.fuzzy_text(fuzzy_query):
+                if score < min_score:
+                    break
+                element = self.elements[i]
+                if page_url and element.page_url != page_url:
+                    # Prefer a same-page match of equal quality if there is one
+                    same_page = [j for s, j in self.fuzzy_text(fuzzy_query, limit=10) if s >= score and self.elements[j].page_url == page_url]
+                    if same_page:
+                        element = self.elements[same_page[0]]
+                return self._fill(check, "fuzzy", element, score)
+        check.reason = "no clickable on the crawled pages matches this selector"
+        return check
+
+    def _fill(self, check: SelectorCheck, status: str, element: IndexedElement, score: float) -> SelectorCheck:
+        check.status = status
+        check.match = element.locator
+        check.match_by = element.by
+        check.score = round(score, 3)
+        check.page_url = element.page_url
+        check.bbox = element.bbox
+        return check
+
+    def _exact_candidates(self, sel: str, by: Optional[str]) -> Tuple[Optional[List[int]], Optional[str]]:
+        """Return (exact candidates, text to fuzzy-match); (None, None) if not checkable."""
+        if sel in self.by_locator:
+            return self.by_locator[sel], None
+
+        if re.match(r"^(https?://|/)", sel):
+            return self.by_href.get(normalize_href(sel), []), None
+
+        m = re.match(r"^text\s*=\s*[\"']?(.*?)[\"']?$", sel)
+        if m or by == "text":
+            text = m.group(1) if m else sel
+            return self.by_text.get(normalize_text(text), []), text
+
+        m = re.match(r"^role\s*=\s*([\w-]+)(?:\[name\s*=\s*[\"'](.*?)[\"']\])?", sel)
+        if m or by == "role":
+            role, name = (m.group(1), m.group(2)) if m else (sel, None)
+            if not name:
+                return self.by_role.get(role.lower(), []), None
+            return self.by_role_name.get((role.lower(), normalize_text(name)), []), name
+
+        if by == "aria":
+            return self.by_name.get(normalize_text(sel), []), sel
+
+        m = re.search(r":has-text\(\s*[\"'](.*?)[\"']\s*\)", sel)
+        if m:
+            return self.by_text.get(normalize_text(m.group(1)), []), m.group(1)
+
+        m = re.search(r"\[aria-label\s*[*^$]?=\s*[\"'](.*?)[\"']\]", sel)
+        if m:
+            return self.by_name.get(normalize_text(m.group(1)), []), m.group(1)
+
+        m = re.search(r"\[href\s*([*^$]?)=\s*[\"'](.*?)[\"']\]", sel)
+        if m:
+            op, value = m.group(1), m.group(2)
+            if not op:
+                return self.by_href.get(normalize_href(value), []), None
+            # Substring/prefix/suffix matches need a scan over hrefs (still small)
+            hits = [i for href, ids in self.by_href.items()
+                    if (op == "*" and value in href) or (op == "^" and href.startswith(value)) or (op == "$" and href.endswith(value))
+                    for i in ids]
+            return hits, None
+
+        m = re.search(r"\[(name|placeholder)\s*=\s*[\"'](.*?)[\"']\]", sel)
+        if m:
+            attr, value = m.group(1), m.group(2)
+            key = value if attr == "name" else normalize_text(value)
+            return self.by_field.get((attr, key), []), (value if attr == "placeholder" else None)
+
+        m = re.match(r"^([\w-]*)([#.])([\w-]+)$", sel)
+        if m:
+            tag, kind, value = m.groups()
+            hits = (self.by_id if kind == "#" else self.by_class).get(value, [])
+            # Only clickables are indexed, so a miss on e.g. `ol.results` proves nothing
+            if not hits and tag and tag.lower() not in _IMPLICIT_ROLES:
+                return None, None
+            return hits, None
+
+        if by in (None, "css") and _looks_structural(sel):
+            return None, None
+        # Anything else is most likely visible text
+        return self.by_text.get(normalize_text(sel), []), sel
+
+
+def _scene_pages(scene: Dict[str, Any], current: Optional[str]) -> List[Optional[str]]:
+    """Page URL in effect before each action of a scene."""
+    pages = []
+    for action in scene.get("actions") or []:
+        pages.append(current)
+        if isinstance(action, dict) and action.get("type") == "navigate" and action.get("url"):
+            current = action["url"]
+    pages.append(current)
+    return pages
+
+
+def validate_storyboard(
+    storyboard: Dict[str, Any],
+    index: SelectorIndex,
+    rewrite: bool = True,
+    min_score: float = 0.75,
+) -> List[SelectorCheck]:
+    """Check every action ``selector`` and shot ``target_selector``/``selector``.
+
+    With ``rewrite`` fuzzy matches replace the original selector (and ``by``)
+    in place; unresolved selectors are left as-is and only reported.
+    """
+    report: List[SelectorCheck] = []
+    current: Optional[str] = None
+    for s_i, scene in enumerate(storyboard.get("scenes") or []):
+        if not isinstance(scene, dict):
+            continue
+        scene_id = scene.get("id") or f"scene-{s_i + 1}"
+        pages = _scene_pages(scene, current)
+        for a_i, action in enumerate(scene.get("actions") or []):
+            if isinstance(action, dict) and action.get("selector"):
+                check = index.resolve(action["selector"], action.get("by"), pages[a_i], min_score, f"{scene_id}.actions[{a_i}].selector")
+                report.append(check)
+                if rewrite and check.status == "fuzzy":
+                    action["selector"], action["by"] = check.match, check.match_by
+        for sh_i, shot in enumerate(scene.get("shots") or []):
+            if not isinstance(shot, dict):
+                continue
+            # Older LLM output puts the shot target under "selector"
+            key = "target_selector" if shot.get("target_selector") else "selector" if shot.get("selector") else None
+            if key:
+                check = index.resolve(shot[key], shot.get("by"), pages[-1], min_score, f"{scene_id}.shots[{sh_i}].{key}")
+                report.append(check)
+                if rewrite and check.status == "fuzzy":
+                    shot[key], shot["by"] = check.match, check.match_by
+        current = pages[-1]
+    return report
+
+
+def summarize_report(report: List[SelectorCheck]) -> Dict[str, Any]:
+    counts: Dict[str, int] = {}
+    for check in report:
+        counts[check.status] = counts.get(check.status, 0) + 1
+    return {"counts": counts, "checks": [asdict(c) for c in report]}
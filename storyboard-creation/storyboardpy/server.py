@@ -0,0 +1,533 @@
+import asyncio
+import contextlib
+import copy
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .cli import _derive_transcript, _ensure_dir, _render_transcript_text
+
+
+class BrowserPool:
+    """A fixed set of warm Chromium browsers shared by scan jobs.
+
+    Each job borrows one browser exclusively and opens its own context in it,
+    so the pool size bounds how many Chromium processes run at once. Browsers
+    that crashed are relaunched on the next checkout.
+    """
+
+    def __init__(self, size: int = 2, headless: bool = True) -> None:
+        self.size = max(1, size)
+        self.headless = headless
+        self._pw = None
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def start(self) -> None:
+        from playwright.async_api import async_playwright
+
+        self._pw = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._launch())
+
+    async def _launch(self):
+        return await self._pw.chromium.launch(headless=self.headless)
+
+    @contextlib.asynccontextmanager
+    async def browser(self):
+        browser = await self._idle.get()
+        try:
+            if not browser.is_connected():
+                browser = await self._launch()
+            yield browser
+        finally:
+            self._idle.put_nowait(browser)
+
+    async def close(self) -> None:
+        if self._idle is not None:
+            while not self._idle.empty():
+                browser = self._idle.get_nowait()
+                with contextlib.suppress(Exception):
+                    await browser.close()
+        if self._pw is not None:
+            await self._pw.stop()
+
+
+class StoryboardService:
+    """Serves scan / storyboard / generate jobs from one long-lived process.
+
+    Keeps a warm ``BrowserPool`` and one ``StoryboardAgent`` (and so one LLM
+    client) for its whole lifetime, and passes site summaries to the agent in
+    memory. Files are only written when a job asks for them via ``site_out``,
+    ``out`` or ``transcript_out``.
+
+    With ``jobs_db`` every job goes through a persistent ``JobScheduler``:
+    identical in-flight requests share one run, ``workers`` jobs run at once,
+    and at most ``crawl_limit`` crawls and ``llm_limit`` LLM calls overlap.
+    Callers deduplicated onto a run still get their own output files
+    (``deliver``).
+
+    With ``store`` jobs that carry a ``request_id`` keep their screenshots,
+    summary and storyboard in a content-addressed ``ArtifactStore``.
+    """
+
+    def __init__(
+        self,
+        browsers: int = 2,
+        headless: bool = True,
+        max_concurrency: int = 4,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        backend: Optional[Any] = None,
+        jobs_db: Optional[str] = None,
+        workers: int = 4,
+        crawl_limit: Optional[int] = None,
+        llm_limit: Optional[int] = None,
+        reuse_seconds: float = 0.0,
+        store: Optional[str] = None,
+        hedge: Optional[Any] = None,
+        structured_output: bool = False,
+    ) -> None:
+        self.pool: Optional[BrowserPool] = BrowserPool(browsers, headless)
+        self.max_concurrency = max(1, max_concurrency)
+        self.jobs_db = jobs_db
+        self.workers = workers
+        self.crawl_limit = max(1, crawl_limit or browsers)
+        self.llm_limit = max(1, llm_limit or max_concurrency)
+        self.reuse_seconds = reuse_seconds
+        self.scheduler = None
+        self.store = None
+        if store:
+            from .store import ArtifactStore
+
+            self.store = ArtifactStore(store)
+        self._crawl_slots: Optional[asyncio.Semaphore] = None
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self._agent_kwargs = {
+            "model": model, "temperature": temperature, "backend": backend, "hedge": hedge,
+            "structured_output": structured_output,
+        }
+        self._agent = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.started_at = time.time()
+        self.jobs_served = 0
+        self.methods: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+            "scan": self.scan,
+            "storyboard": self.storyboard,
+            "generate": self.generate,
+            "health": self.health,
+            "metrics": self.metrics,
+            "submit": self.submit,
+            "status": self.status,
+        }
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._crawl_slots = asyncio.Semaphore(self.crawl_limit)
+        self._llm_slots = asyncio.Semaphore(self.llm_limit)
+        if self.jobs_db:
+            from .jobs import JobScheduler, JobStore
+
+            self.scheduler = JobScheduler(
+                JobStore(self.jobs_db), self.run, self.workers, self.reuse_seconds, deliver=self.deliver
+            )
+            await self.scheduler.start()
+        try:
+            self._get_agent()
+        except RuntimeError as e:
+            # e.g. no COHERE_API_KEY: scans still work, storyboard jobs report the error
+            print(f"LLM client not ready ({e})", file=sys.stderr)
+        try:
+            await self.pool.start()
+        except Exception as e:
+            # No warm browsers: each scan launches its own (or uses the requests engine)
+            print(f"Browser pool unavailable ({e}); scans will start their own browser", file=sys.stderr)
+            self.pool = None
+
+    async def close(self) -> None:
+        if self.scheduler is not None:
+            await self.scheduler.close()
+            self.scheduler.store.close()
+        if self.pool is not None:
+            await self.pool.close()
+
+    def _get_agent(self):
+        if self._agent is None:
+            from .agent import StoryboardAgent
+
+            self._agent = StoryboardAgent(**self._agent_kwargs)
+        return self._agent
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        handler = self.methods.get(method)
+        if handler is None:
+            raise KeyError(f"Unknown method: {method}")
+        if method in ("health", "metrics", "submit", "status"):
+            return await handler(params)
+        if self.scheduler is not None:
+            result = await self.scheduler.submit_and_wait(method, params, int(params.get("priority", 0)))
+            if method == "generate" and not params.get("include_site_summary"):
+                result.pop("site_summary", None)
+            return result
+        async with self._slots:
+            return await self.run(method, params)
+
+    async def run(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one scan/storyboard/generate job right now."""
+        if kind not in ("scan", "storyboard", "generate"):
+            raise ValueError(f"Unknown job kind: {kind}")
+        result = await self.methods[kind](params)
+        self.jobs_served += 1
+        return result
+
+    async def health(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        out = {
+            "status": "OK",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "jobs_served": self.jobs_served,
+            "browsers": self.pool.size if self.pool else 0,
+        }
+        if self.scheduler is not None:
+            out["jobs"] = self.scheduler.store.counts()
+        if self._agent is not None:
+            out["llm"] = self._agent.usage_report()
+            if self._agent.hedge is not None:
+                out["hedging"] = self._agent.hedge_report()
+        return out
+
+    async def metrics(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM usage counters (tokens, latency, retries, parse failures, cost) by model."""
+        return self._agent.usage_report() if self._agent is not None else {}
+
+    def prometheus(self) -> str:
+        """``GET /metrics`` body: job and LLM counters in Prometheus text format."""
+        lines = [
+            "# HELP storyboard_jobs_served_total Jobs run to completion",
+            "# TYPE storyboard_jobs_served_total counter",
+            f"storyboard_jobs_served_total {self.jobs_served}",
+            "# HELP storyboard_uptime_seconds Seconds since the service started",
+            "# TYPE storyboard_uptime_seconds gauge",
+            f"storyboard_uptime_seconds {time.time() - self.started_at:.1f}",
+        ]
+        text = "\n".join(lines) + "\n"
+        if self._agent is not None:
+            text += self._agent.usage.prometheus()
+        return text
+
+    def _require_scheduler(self):
+        if self.scheduler is None:
+            raise ValueError("Job queue disabled; start serve with --jobs-db")
+        return self.scheduler
+
+    async def submit(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job without waiting: ``{"kind", "params", "priority"}``."""
+        scheduler = self._require_scheduler()
+        return scheduler.submit(params.get("kind", "generate"), params.get("params") or {}, int(params.get("priority", 0)))
+
+    async def status(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Job status/result; ``wait`` long-polls up to that many seconds."""
+        scheduler = self._require_scheduler()
+        if params.get("wait"):
+            return await scheduler.wait(params.get("id", ""), timeout=float(params["wait"]))
+        job = scheduler.status(params.get("id", ""))
+        if job is None:
+            raise KeyError(f"Unknown job: {params.get('id')}")
+        return job
+
+    async def _scan(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        from .explorer import WebsiteExplorer
+
+        if not params.get("url"):
+            raise ValueError("url is required")
+        kwargs = dict(
+            start_url=params["url"],
+            max_pages=int(params.get("max_pages", 5)),
+            same_origin_only=not params.get("cross_origin", False),
+            artifacts_dir=params.get("artifacts_dir") or self._staging_dir(params),
+            max_links_per_page=int(params.get("max_links_per_page", 30)),
+            screenshot=not params.get("no_screenshot", False),
+            template_policy=params.get("templates", "defer"),
+            parser=params.get("parser", "auto"),
+            frontier=params.get("frontier", "priority"),
+            sitemap=not params.get("no_sitemap", False),
+        )
+        async with self._crawl_slots:
+            if self.pool is None:
+                site_summary = await WebsiteExplorer(**kwargs).explore()
+            else:
+                async with self.pool.browser() as browser:
+                    site_summary = await WebsiteExplorer(browser=browser, **kwargs).explore()
+        if self.store is not None and params.get("request_id"):
+            self.store.ingest_site_summary(params["request_id"], site_summary)
+        return site_summary
+
+    def _staging_dir(self, params: Dict[str, Any]) -> Optional[str]:
+        if self.store is None or not params.get("request_id"):
+            return None
+        return self.store.staging_dir(params["request_id"])
+
+    def _write_json(self, path: Optional[str], data: Any) -> None:
+        if path:
+            _ensure_dir(path)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+
+    def _write_text(self, path: Optional[str], text: str) -> None:
+        if path:
+            _ensure_dir(path)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+    def deliver(self, kind: str, outputs: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Write a shared job's result to the outputs of a caller deduplicated onto it.
+
+        Screenshots are copied into the caller's ``artifacts_dir`` and the
+        summary and storyboard are stored under its ``request_id``, as if the
+        caller's own job had produced them.
+        """
+        site_summary = result.get("site_summary")
+        if site_summary is not None:
+            site_summary = copy.deepcopy(site_summary)
+            if outputs.get("artifacts_dir"):
+                _copy_screenshots(site_summary, outputs["artifacts_dir"])
+            if self.store is not None and outputs.get("request_id"):
+                self.store.ingest_site_summary(outputs["request_id"], site_summary)
+            self._write_json(outputs.get("site_out"), site_summary)
+        storyboard = result.get("storyboard")
+        if storyboard is not None:
+            self._write_json(outputs.get("out"), storyboard)
+            self._write_text(outputs.get("transcript_out"), result.get("transcript") or "")
+            if self.store is not None and outputs.get("request_id"):
+                self.store.ingest_storyboard(outputs["request_id"], storyboard, result.get("transcript"))
+
+    async def scan(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        site_summary = await self._scan(params)
+        self._write_json(params.get("site_out"), site_summary)
+        return {"site_summary": site_summary}
+
+    async def _storyboard(self, site_summary: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._llm_slots:
+            storyboard = await self._get_agent().create_storyboard_async(
+                site_summary=site_summary,
+                duration_hint=params.get("duration_hint"),
+                persona=params.get("persona") or "Prospective user",
+                goal=params.get("goal") or "Show the core value and test key flows",
+            )
+        transcript = _render_transcript_text(_derive_transcript(storyboard))
+        self._write_json(params.get("out"), storyboard)
+        self._write_text(params.get("transcript_out"), transcript)
+        if self.store is not None and params.get("request_id"):
+            self.store.ingest_storyboard(params["request_id"], storyboard, transcript)
+        return {"storyboard": storyboard, "transcript": transcript}
+
+    async def storyboard(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        site_summary = params.get("site_summary")
+        if site_summary is None and params.get("site_in"):
+            with open(params["site_in"], "r", encoding="utf-8") as f:
+                site_summary = json.load(f)
+        if site_summary is None:
+            raise ValueError("site_summary or site_in is required")
+        return await self._storyboard(site_summary, params)
+
+    async def generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Scan then storyboard, handing the summary over in memory."""
+        started = time.perf_counter()
+        site_summary = await self._scan(params)
+        scanned = time.perf_counter()
+        self._write_json(params.get("site_out"), site_summary)
+        result = await self._storyboard(site_summary, params)
+        if params.get("include_site_summary") or self.scheduler is not None:
+            # A queued result also serves the site_out of callers deduplicated onto it (see call)
+            result["site_summary"] = site_summary
+        result["timings"] = {
+            "scan_seconds": round(scanned - started, 3),
+            "storyboard_seconds": round(time.perf_counter() - scanned, 3),
+        }
+        return result
+
+
+def _copy_screenshots(site_summary: Dict[str, Any], dest_dir: str) -> None:
+    """Copy the summary's screenshots into ``dest_dir`` and point it at the copies."""
+    for i, page in enumerate(site_summary.get("pages") or [], 1):
+        shot = page.get("screenshot_path") if isinstance(page, dict) else None
+        if not shot or not os.path.exists(shot):
+            continue
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, f"page_{i}{os.path.splitext(shot)[1] or '.png'}")
+        shutil.copyfile(shot, dest)
+        page["screenshot_path"] = dest
+
+
+async def _read_http_request(reader: asyncio.StreamReader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode("latin-1").split(" ", 2)
+    if len(parts) != 3:
+        raise ValueError(f"bad request line {request_line.strip()[:100]!r}")
+    method, path, _ = parts
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", "0") or 0)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, body
+
+
+async def _write_http_response(
+    writer: asyncio.StreamWriter, status: int, payload: Any, content_type: str = "application/json"
+) -> None:
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+    body = (payload if isinstance(payload, str) else json.dumps(payload)).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1")
+    writer.write(head + body)
+    await writer.drain()
+
+
+async def serve_http(service: StoryboardService, host: str, port: int) -> None:
+    """JSON over HTTP.
+
+    ``GET /health``; ``GET /metrics`` (Prometheus text); ``POST /scan``,
+    ``/storyboard``, ``/generate`` (block until done); with a job queue also
+    ``POST /jobs`` (submit) and ``GET /jobs/<id>`` (poll; ``?wait=SECONDS``
+    long-polls).
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                request = await _read_http_request(reader)
+            except ValueError as e:
+                # e.g. a request line without method/path/version, or a bad Content-Length
+                await _write_http_response(writer, 400, {"error": f"Malformed request: {e}"})
+                return
+            if request is None:
+                return
+            method, path, body = request
+            path, _, query = path.partition("?")
+            name = path.strip("/")
+            extra: Dict[str, Any] = {}
+            if name == "jobs":
+                name = "submit"
+            elif name.startswith("jobs/"):
+                name, extra["id"] = "status", name.split("/", 1)[1]
+                for pair in query.split("&"):
+                    key, _, value = pair.partition("=")
+                    if key == "wait" and value:
+                        extra["wait"] = value
+            if name == "metrics" and method == "GET":
+                await _write_http_response(writer, 200, service.prometheus(), "text/plain; version=0.0.4")
+                return
+            if name not in service.methods:
+                await _write_http_response(writer, 404, {"error": f"Unknown endpoint: {path}"})
+                return
+            if method not in ("GET", "POST"):
+                await _write_http_response(writer, 405, {"error": "Use GET or POST"})
+                return
+            try:
+                params = json.loads(body) if body else {}
+            except json.JSONDecodeError as e:
+                await _write_http_response(writer, 400, {"error": f"Invalid JSON: {e}"})
+                return
+            if not isinstance(params, dict):
+                await _write_http_response(writer, 400, {"error": "Request body must be a JSON object"})
+                return
+            params.update(extra)
+            try:
+                result = await service.call(name, params)
+            except KeyError as e:
+                await _write_http_response(writer, 404, {"error": e.args[0]})
+                return
+            except ValueError as e:
+                await _write_http_response(writer, 400, {"error": str(e)})
+                return
+            except Exception as e:
+                await _write_http_response(writer, 500, {"error": str(e)})
+                return
+            await _write_http_response(writer, 200, result)
+        finally:
+            with contextlib.suppress(Exception):
+                writer.close()
+                await writer.wait_closed()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"storyboardpy serving on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+async def serve_stdio(service: StoryboardService) -> None:
+    """JSON-RPC 2.0, one request per line on stdin, responses on stdout.
+
+    Requests are handled concurrently; responses may arrive out of order and
+    are matched by ``id``.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=64 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    write_lock = asyncio.Lock()
+    pending: List[asyncio.Task] = []
+
+    async def respond(payload: Dict[str, Any]) -> None:
+        async with write_lock:
+            sys.stdout.write(json.dumps(payload) + "\n")
+            sys.stdout.flush()
+
+    async def handle(message: Dict[str, Any]) -> None:
+        req_id = message.get("id")
+        try:
+            result = await service.call(message.get("method", ""), message.get("params") or {})
+            await respond({"jsonrpc": "2.0", "id": req_id, "result": result})
+        except KeyError as e:
+            await respond({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": e.args[0]}})
+        except ValueError as e:
+            await respond({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32602, "message": str(e)}})
+        except Exception as e:
+            await respond({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32000, "message": str(e)}})
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            await respond({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}})
+            continue
+        if not isinstance(message, dict):
+            await respond({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}})
+            continue
+        pending = [t for t in pending if not t.done()]
+        pending.append(asyncio.create_task(handle(message)))
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def run_service(
+    service: StoryboardService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    stdio: bool = False,
+) -> None:
+    await service.start()
+    try:
+        if stdio:
+            await serve_stdio(service)
+        else:
+            await serve_http(service, host, port)
+    finally:
+        await service.close()
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from .templates import TemplateTracker, url_pattern
+
+if TYPE_CHECKING:
+    from .explorer import WebsiteExplorer
+
+
+def shard_of(url: str, shards: int) -> int:
+    """Owning shard of a URL (stable across processes and runs)."""
+    return int(hashlib.sha1(url.encode("utf-8")).hexdigest()[:8], 16) % shards
+
+
+def _worker(shard: int, config: Dict[str, Any], inbox: Any, outbox: Any) -> None:
+    try:
+        asyncio.run(_worker_async(shard, config, inbox, outbox))
+    except Exception as e:
+        outbox.put(("error", shard, f"{type(e).__name__}: {e}"))
+
+
+async def _worker_async(shard: int, config: Dict[str, Any], inbox: Any, outbox: Any) -> None:
+    from .explorer import WebsiteExplorer
+
+    explorer = WebsiteExplorer(**config["explorer"])
+    loop = asyncio.get_running_loop()
+    cleanup = []
+    if config["engine"] == "playwright":
+        from playwright.async_api import async_playwright
+
+        pw = await async_playwright().start()
+        browser = await pw.chromium.launch(headless=explorer.headless)
+        context = await explorer._new_context(browser)
+        cleanup = [context.close, browser.close, pw.stop]
+
+        async def visit(url: str, shot: Optional[str]):
+            return await explorer._visit_with_browser(context, url, shot)
+    else:
+        session = explorer._http_session()
+
+        async def visit(url: str, shot: Optional[str]):
+            return explorer._visit_with_requests(session, url)
+
+    outbox.put(("ready", shard, None))
+    try:
+        while True:
+            url = await loop.run_in_executor(None, inbox.get)
+            if url is None:
+                break
+            shot = None
+            if config["shots_dir"]:
+                shot = os.path.join(config["shots_dir"], hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".png")
+            try:
+                result = await visit(url, shot)
+            except Exception:
+                result = None
+            if result is None:
+                outbox.put(("page", shard, (url, None, [], None)))
+            else:
+                summary, links, fingerprint = result
+                outbox.put(("page", shard, (url, explorer._page_to_dict(summary), links, fingerprint)))
+    finally:
+        for close in cleanup:
+            await close()
+
+
+class ShardedCrawl:
+    """Crawls one site with ``shards`` worker processes.
+
+    URLs are hash-partitioned: each URL is fetched and parsed by the process
+    that owns it, with its own HTTP session or browser, so extraction runs on
+    as many cores as there are shards. The coordinator only routes discovered
+    links to their owning shard and tracks what has been dispatched.
+
+    The crawl proceeds breadth-first one depth level at a time, and each level
+    is dispatched in sorted URL order, so which pages are crawled (within
+    ``max_pages``) and the order of the merged summary do not depend on timing
+    or on the number of shards. Template detection works per level: a few
+    URLs of each unconfirmed URL pattern are fetched first, and once a
+    template is confirmed the rest of it goes to the back of the level (or is
+    dropped).
+    """
+
+    def __init__(self, explorer: "WebsiteExplorer", engine: str, shards: int) -> None:
+        self.explorer = explorer
+        self.engine = engine
+        self.shards = max(1, shards)
+
+    def _config(self) -> Dict[str, Any]:
+        e = self.explorer
+        shots_dir = None
+        if e.screenshot and e.artifacts_dir and self.engine == "playwright":
+            shots_dir = os.path.join(e.artifacts_dir, ".shards")
+            os.makedirs(shots_dir, exist_ok=True)
+        return {
+            "engine": self.engine,
+            "shots_dir": shots_dir,
+            "explorer": {
+                "start_url": e.start_url,
+                "max_pages": e.max_pages,
+                "same_origin_only": e.same_origin_only,
+                "headless": e.headless,
+                "max_links_per_page": e.max_links_per_page,
+                "screenshot": e.screenshot,
+                "timeout_ms": e.timeout_ms,
+                "template_policy": e.template_policy,
+                "parser": e.parser,
+                "replay_har": e.replay_har,
+            },
+        }
+
+    def run(self) -> Dict[str, Any]:
+        ctx = multiprocessing.get_context("spawn")
+        config = self._config()
+        inboxes = [ctx.Queue() for _ in range(self.shards)]
+        outbox = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(i, config, inboxes[i], outbox), daemon=True) for i in range(self.shards)]
+        for proc in procs:
+            proc.start()
+        try:
+            ready = 0
+            while ready < self.shards:
+                kind, shard, payload = self._receive(outbox, procs)
+                if kind == "ready":
+                    ready += 1
+            templates = TemplateTracker(self.explorer.template_policy)
+            pages = self._crawl(inboxes, outbox, procs, templates)
+        finally:
+            for inbox in inboxes:
+                inbox.put(None)
+            for proc in procs:
+                proc.join(timeout=10)
+                if proc.is_alive():
+                    proc.terminate()
+        self._finalize_screenshots(pages, config["shots_dir"])
+        summary = self.explorer._summary(self.engine, pages, templates=templates)
+        summary["shards"] = self.shards
+        return summary
+
+    def _receive(self, outbox: Any, procs: List[Any]):
+        while True:
+            try:
+                kind, shard, payload = outbox.get(timeout=1.0)
+            except queue.Empty:
+                dead = [i for i, p in enumerate(procs) if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Crawl shard {dead[0]} exited unexpectedly")
+                continue
+            if kind == "error":
+                raise RuntimeError(f"Crawl shard {shard} failed: {payload}")
+            return kind, shard, payload
+
+    def _crawl(self, inboxes: List[Any], outbox: Any, procs: List[Any], templates: TemplateTracker) -> List[Dict[str, Any]]:
+        e = self.explorer
+        origin = urlparse(e.start_url).netloc
+        seen: Set[str] = {e.start_url}
+        pages: List[Dict[str, Any]] = []
+        level = [e.start_url]
+        while level and len(pages) < e.max_pages:
+            next_level: List[str] = []
+            pending = level
+            while pending and len(pages) < e.max_pages:
+                now, later = self._order(templates, pending)
+                if not now:
+                    now, later = later, []
+                # Pages that fail to load free their budget for the rest of the level
+                budget = e.max_pages - len(pages)
+                batch, pending = now[:budget], now[budget:] + later
+                for url in batch:
+                    inboxes[shard_of(url, self.shards)].put(url)
+                results: Dict[str, Any] = {}
+                while len(results) < len(batch):
+                    _, _, (url, page, links, fingerprint) = self._receive(outbox, procs)
+                    results[url] = (page, links, fingerprint)
+                for url in batch:
+                    page, links, fingerprint = results[url]
+                    if page is None:
+                        continue
+                    templates.observe(url, fingerprint)
+                    pages.append(page)
+                    taken = 0
+                    for link in links:
+                        if taken >= e.max_links_per_page:
+                            break
+                        if link in seen or (e.same_origin_only and urlparse(link).netloc != origin):
+                            continue
+                        seen.add(link)
+                        next_level.append(link)
+                        taken += 1
+            level = sorted(next_level)
+        return pages
+
+    @staticmethod
+    def _order(templates: TemplateTracker, urls: List[str]) -> Tuple[List[str], List[str]]:
+        """Split a level into URLs to dispatch now and URLs held back.
+
+        Known-template URLs are dropped or held back. Of URLs whose pattern
+        is not yet known, only ``min_examples`` per pattern go out now, so the
+        pattern can be confirmed before the rest of it is dispatched.
+        """
+        now: List[str] = []
+        later: List[str] = []
+        probes: Counter = Counter()
+        for url in urls:
+            decision = templates.decide(url)
+            if decision == "skip":
+                continue
+            if decision == "defer":
+                later.append(url)
+            elif templates.is_candidate(url):
+                pattern = url_pattern(url)
+                probes[pattern] += 1
+                (now if probes[pattern] <= templates.min_examples else later).append(url)
+            else:
+                now.append(url)
+        return now, later
+
+    def _finalize_screenshots(self, pages: List[Dict[str, Any]], shots_dir: Optional[str]) -> None:
+        """Rename shard screenshots to page_N.png in merged order."""
+        if not shots_dir:
+            return
+        for i, page in enumerate(pages, start=1):
+            shot = page.get("screenshot_path")
+            if shot and os.path.exists(shot):
+                final = os.path.join(self.explorer.artifacts_dir, f"page_{i}.png")
+                os.replace(shot, final)
+                page["screenshot_path"] = final
+        for name in os.listdir(shots_dir):
+            os.unlink(os.path.join(shots_dir, name))
+        os.rmdir(shots_dir)
+
@@ -0,0 +1,326 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_CHUNK = 1024 * 1024
+# Used as a file and directory name: no separators, and no leading dot (so never "." or "..")
+_REQUEST_ID = re.compile(r"^[\w-][\w.-]*\Z")
+
+
+def _valid_request_id(request_id: str) -> bool:
+    return bool(_REQUEST_ID.match(request_id)) and request_id not in (".", "..")
+
+
+class ArtifactStore:
+    """Content-addressed blob store with small per-request manifests.
+
+    Layout under ``root``::
+
+        blobs/<sha256[:2]>/<sha256>       deduplicated content
+        manifests/<request_id>.json       name -> {hash, size} plus timestamps
+
+    Identical screenshots and summaries from repeated scans are stored once.
+    ``gc`` expires manifests by age, idle time or total size and then deletes
+    blobs no remaining manifest references.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.manifests_dir = os.path.join(root, "manifests")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    # Blobs
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def _commit_tmp(self, tmp_path: str, digest: str) -> str:
+        dest = self.blob_path(digest)
+        if os.path.exists(dest):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp_path, dest)
+        return dest
+
+    def put_bytes(self, data: bytes) -> Tuple[str, int]:
+        digest = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self.blob_path(digest)):
+            fd, tmp = tempfile.mkstemp(dir=self.blobs_dir, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            self._commit_tmp(tmp, digest)
+        return digest, len(data)
+
+    def put_file(self, path: str) -> Tuple[str, int]:
+        """Hash a file while copying it into the store (one read pass)."""
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.blobs_dir, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+            while True:
+                chunk = src.read(_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        digest = h.hexdigest()
+        self._commit_tmp(tmp, digest)
+        return digest, size
+
+    def put_json(self, data: Any) -> Tuple[str, int]:
+        return self.put_bytes(json.dumps(data, indent=2).encode("utf-8"))
+
+    # Manifests
+
+    def _manifest_path(self, request_id: str) -> str:
+        if not _valid_request_id(request_id):
+            raise ValueError(f"Invalid request id: {request_id!r}")
+        return os.path.join(self.manifests_dir, f"{request_id}.json")
+
+    def load_manifest(self, request_id: str, touch: bool = False) -> Optional[Dict[str, Any]]:
+        path = self._manifest_path(request_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if touch:
+            manifest["last_access"] = time.time()
+            self._save_manifest(manifest)
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        path = self._manifest_path(manifest["request_id"])
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+
+    def add(self, request_id: str, name: str, digest: str, size: int) -> str:
+        """Record ``name`` -> blob in the request's manifest; returns the blob path."""
+        now = time.time()
+        manifest = self.load_manifest(request_id) or {
+            "request_id": request_id, "created_at": now, "entries": {},
+        }
+        manifest["entries"][name] = {"hash": digest, "size": size}
+        manifest["last_access"] = now
+        self._save_manifest(manifest)
+        return self.blob_path(digest)
+
+    def add_file(self, request_id: str, name: str, path: str) -> str:
+        return self.add(request_id, name, *self.put_file(path))
+
+    def add_bytes(self, request_id: str, name: str, data: bytes) -> str:
+        return self.add(request_id, name, *self.put_bytes(data))
+
+    def add_json(self, request_id: str, name: str, data: Any) -> str:
+        return self.add(request_id, name, *self.put_json(data))
+
+    def staging_dir(self, request_id: str) -> str:
+        """Scratch directory a crawl can write screenshots to before ingest."""
+        self._manifest_path(request_id)  # validates the id
+        return os.path.join(self.root, "staging", request_id)
+
+    def ingest_site_summary(self, request_id: str, site_summary: Dict[str, Any], remove_files: bool = True) -> str:
+        """Store a scan's screenshots and summary under ``request_id``.
+
+        The stored summary points at blob paths, so it stays usable on its
+        own; screenshots already in the store are only referenced. Screenshots
+        the crawl wrote to ``staging_dir(request_id)`` are deleted once stored
+        (unless ``remove_files`` is False) and their paths in ``site_summary``
+        rewritten in place. Any others, e.g. in a user-chosen artifacts
+        directory, stay where they are and keep their paths. Returns the
+        summary's blob path.
+        """
+        staging = os.path.abspath(self.staging_dir(request_id)) + os.sep
+        stored = copy.deepcopy(site_summary)
+        for i, (page, stored_page) in enumerate(zip(site_summary.get("pages") or [], stored.get("pages") or []), 1):
+            shot = page.get("screenshot_path") if isinstance(page, dict) else None
+            if not shot or not os.path.exists(shot):
+                continue
+            if shot.startswith(self.blobs_dir):
+                # Stored under another request (a shared job's summary): reference the blob
+                self.add(request_id, f"screenshots/page_{i}.png", os.path.basename(shot), os.path.getsize(shot))
+                continue
+            blob = self.add_file(request_id, f"screenshots/{os.path.basename(shot)}", shot)
+            stored_page["screenshot_path"] = blob
+            if remove_files and os.path.abspath(shot).startswith(staging):
+                page["screenshot_path"] = blob
+                os.unlink(shot)
+                parent = os.path.dirname(shot)
+                if parent and not os.listdir(parent):
+                    os.rmdir(parent)
+        return self.add_json(request_id, "site.json", stored)
+
+    def ingest_storyboard(self, request_id: str, storyboard: Dict[str, Any], transcript: Optional[str] = None) -> str:
+        if transcript is not None:
+            self.add_bytes(request_id, "transcript.txt", transcript.encode("utf-8"))
+        return self.add_json(request_id, "storyboard.json", storyboard)
+
+    def get_path(self, request_id: str, name: str) -> Optional[str]:
+        manifest = self.load_manifest(request_id, touch=True)
+        entry = (manifest or {}).get("entries", {}).get(name)
+        return self.blob_path(entry["hash"]) if entry else None
+
+    def materialize(self, request_id: str, dest_dir: str) -> List[str]:
+        """Recreate a request's files under ``dest_dir`` (hard links when possible)."""
+        manifest = self.load_manifest(request_id, touch=True)
+        if manifest is None:
+            raise KeyError(f"Unknown request: {request_id}")
+        written = []
+        for name, entry in manifest["entries"].items():
+            dest = os.path.join(dest_dir, name)
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            if os.path.exists(dest):
+                os.unlink(dest)
+            try:
+                os.link(self.blob_path(entry["hash"]), dest)
+            except OSError:
+                shutil.copyfile(self.blob_path(entry["hash"]), dest)
+            written.append(dest)
+        return written
+
+    def manifests(self) -> List[Dict[str, Any]]:
+        out = []
+        for fname in sorted(os.listdir(self.manifests_dir)):
+            if fname.endswith(".json"):
+                with open(os.path.join(self.manifests_dir, fname), "r", encoding="utf-8") as f:
+                    out.append(json.load(f))
+        return out
+
+    def _blobs(self) -> Dict[str, int]:
+        sizes = {}
+        for sub in os.listdir(self.blobs_dir):
+            subdir = os.path.join(self.blobs_dir, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for digest in os.listdir(subdir):
+                sizes[digest] = os.path.getsize(os.path.join(subdir, digest))
+        return sizes
+
+    def stats(self) -> Dict[str, Any]:
+        blobs = self._blobs()
+        manifests = self.manifests()
+        logical = sum(e["size"] for m in manifests for e in m["entries"].values())
+        return {
+            "requests": len(manifests),
+            "blobs": len(blobs),
+            "stored_bytes": sum(blobs.values()),
+            "logical_bytes": logical,
+        }
+
+    def gc(
+        self,
+        max_age_seconds: Optional[float] = None,
+        max_idle_seconds: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """Apply the retention policy, then sweep unreferenced blobs.
+
+        Manifests older than ``max_age_seconds`` or not accessed for
+        ``max_idle_seconds`` are dropped. Then, while the referenced blobs
+        exceed ``max_total_bytes``, the least recently accessed manifests are
+        dropped too.
+        """
+        now = time.time()
+        manifests = sorted(self.manifests(), key=lambda m: m.get("last_access", m.get("created_at", 0)))
+        blobs = self._blobs()
+        expired: List[str] = []
+        kept: List[Dict[str, Any]] = []
+        for m in manifests:
+            age = now - m.get("created_at", now)
+            idle = now - m.get("last_access", m.get("created_at", now))
+            if (max_age_seconds is not None and age > max_age_seconds) or (max_idle_seconds is not None and idle > max_idle_seconds):
+                expired.append(m["request_id"])
+            else:
+                kept.append(m)
+
+        def referenced(ms: List[Dict[str, Any]]) -> Dict[str, int]:
+            refs: Dict[str, int] = {}
+            for m in ms:
+                for e in m["entries"].values():
+                    refs[e["hash"]] = blobs.get(e["hash"], e["size"])
+            return refs
+
+        refs = referenced(kept)
+        if max_total_bytes is not None:
+            # Drop least recently used requests until the unique content fits
+            counts: Dict[str, int] = {}
+            for m in kept:
+                for e in m["entries"].values():
+                    counts[e["hash"]] = counts.get(e["hash"], 0) + 1
+            total = sum(refs.values())
+            while kept and total > max_total_bytes:
+                m = kept.pop(0)
+                expired.append(m["request_id"])
+                for e in m["entries"].values():
+                    counts[e["hash"]] -= 1
+                    if counts[e["hash"]] == 0:
+                        total -= refs.pop(e["hash"], 0)
+
+        garbage = [d for d in blobs if d not in refs]
+        freed = sum(blobs[d] for d in garbage)
+        if not dry_run:
+            for request_id in expired:
+                os.unlink(self._manifest_path(request_id))
+            for digest in garbage:
+                os.unlink(self.blob_path(digest))
+            for name in os.listdir(self.blobs_dir):
+                path = os.path.join(self.blobs_dir, name)
+                if name.startswith(".tmp-") and now - os.path.getmtime(path) > 3600:
+                    os.unlink(path)  # left behind by a crashed writer
+                elif os.path.isdir(path) and not os.listdir(path):
+                    os.rmdir(path)
+        return {
+            "dry_run": dry_run,
+            "expired_requests": expired,
+            "deleted_blobs": len(garbage),
+            "freed_bytes": freed,
+            "kept_requests": len(kept),
+            "kept_bytes": sum(refs.values()),
+        }
+
+    def import_legacy(self, backend_dir: str, remove: bool = False) -> Dict[str, int]:
+        """Move ``artifacts/<id>/``, ``site_dumps/<id>.site.json`` and
+        ``storyboards/<id>.*`` from a backend directory into the store."""
+        imported = {"requests": 0, "files": 0}
+        seen = set()
+
+        def ingest(request_id: str, name: str, path: str) -> None:
+            self.add_file(request_id, name, path)
+            seen.add(request_id)
+            imported["files"] += 1
+            if remove:
+                os.unlink(path)
+
+        artifacts = os.path.join(backend_dir, "artifacts")
+        if os.path.isdir(artifacts):
+            for request_id in sorted(os.listdir(artifacts)):
+                req_dir = os.path.join(artifacts, request_id)
+                if not os.path.isdir(req_dir) or not _valid_request_id(request_id):
+                    continue
+                for fname in sorted(os.listdir(req_dir)):
+                    ingest(request_id, f"screenshots/{fname}", os.path.join(req_dir, fname))
+                if remove and not os.listdir(req_dir):
+                    os.rmdir(req_dir)
+        for sub in ("site_dumps", "storyboards"):
+            folder = os.path.join(backend_dir, sub)
+            if not os.path.isdir(folder):
+                continue
+            for fname in sorted(os.listdir(folder)):
+                request_id, _, rest = fname.partition(".")
+                if rest and _valid_request_id(request_id):
+                    ingest(request_id, rest, os.path.join(folder, fname))
+        imported["requests"] = len(seen)
+        return imported
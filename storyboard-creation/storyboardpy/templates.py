@@ -0,0 +1,147 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urlparse
+
+
+_NUMERIC = re.compile(r"^\d+$")
+_HEXID = re.compile(r"^(?=.*\d)[0-9a-f]{8,}$|^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+_SLUG = re.compile(r"^[a-z0-9]+(?:[-_][a-z0-9]+){3,}$", re.I)
+_MIXED = re.compile(r"^(?=.*[a-z])(?=.*\d)[a-z0-9_-]{6,}$", re.I)
+
+# JS twin of structure_tokens for Playwright pages
+STRUCTURE_JS = """
+    () => Array.from(document.querySelectorAll('body *')).slice(0, 3000).map(el =>
+      (el.parentElement ? el.parentElement.tagName.toLowerCase() : '') + '>' + el.tagName.toLowerCase() + '.' + (el.classList[0] || ''))
+"""
+
+
+def url_pattern(url: str) -> str:
+    """Collapse the variable parts of a URL: ``/product/42?id=7`` -> ``/product/{n}?id``."""
+    parsed = urlparse(url)
+    segments = []
+    for seg in parsed.path.strip("/").split("/"):
+        if not seg:
+            continue
+        if _NUMERIC.match(seg):
+            segments.append("{n}")
+        elif _HEXID.match(seg):
+            segments.append("{id}")
+        elif _SLUG.match(seg) or _MIXED.match(seg):
+            segments.append("{slug}")
+        else:
+            segments.append(seg.lower())
+    pattern = parsed.netloc.lower() + "/" + "/".join(segments)
+    keys = sorted({k for k, _ in parse_qsl(parsed.query, keep_blank_values=True) if not k.startswith("utm_")})
+    if keys:
+        pattern += "?" + "&".join(keys)
+    return pattern
+
+
+def structure_tokens(soup: Any, limit: int = 3000) -> List[str]:
+    """``parent>tag.firstclass`` for each element in the body (BeautifulSoup)."""
+    root = soup.body or soup
+    tokens = []
+    for el in root.find_all(True, limit=limit):
+        classes = el.get("class") or [""]
+        parent = el.parent.name if el.parent is not None else ""
+        tokens.append(f"{parent}>{el.name}.{classes[0]}")
+    return tokens
+
+
+def simhash(tokens: Iterable[str], bits: int = 64) -> int:
+    """Charikar simhash over a bag of tokens; similar structures share most bits."""
+    weights = [0] * bits
+    for token, count in Counter(tokens).items():
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(bits):
+            weights[i] += count if (h >> i) & 1 else -count
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class TemplateTracker:
+    """Spots URL-pattern clusters whose pages share one DOM template.
+
+    A cluster (URLs with the same ``url_pattern``) becomes a known template
+    once ``min_examples`` of its fetched pages have simhash fingerprints within
+    ``max_distance`` bits of each other. Further URLs in a known template are
+    then deferred behind everything else (``policy="defer"``) or not fetched at
+    all (``policy="skip"``), so the page budget goes to distinct pages.
+    """
+
+    def __init__(self, policy: str = "defer", min_examples: int = 2, max_distance: int = 6) -> None:
+        if policy not in ("defer", "skip", "off"):
+            raise ValueError(f"Unknown template policy: {policy}")
+        self.policy = policy
+        self.min_examples = max(1, min_examples)
+        self.max_distance = max_distance
+        self._clusters: Dict[str, Dict[str, Any]] = {}
+        self._deferred: Set[str] = set()
+
+    def _cluster(self, pattern: str) -> Dict[str, Any]:
+        return self._clusters.setdefault(pattern, {
+            "fingerprints": [], "examples": [], "template": False, "deferred": 0, "skipped": [],
+        })
+
+    def is_template(self, url: str) -> bool:
+        cluster = self._clusters.get(url_pattern(url))
+        return bool(cluster and cluster["template"])
+
+    def is_candidate(self, url: str) -> bool:
+        """True if the URL's pattern could still turn out to be a template."""
+        return self.policy != "off" and "{" in url_pattern(url) and not self.is_template(url)
+
+    def decide(self, url: str) -> str:
+        """``fetch``, ``defer`` or ``skip`` for a URL about to be crawled."""
+        if self.policy == "off" or not self.is_template(url):
+            return "fetch"
+        cluster = self._clusters[url_pattern(url)]
+        if self.policy == "skip":
+            if url not in cluster["skipped"]:
+                cluster["skipped"].append(url)
+            return "skip"
+        if url in self._deferred:
+            # Came back round after everything else: nothing better left
+            return "fetch"
+        self._deferred.add(url)
+        cluster["deferred"] += 1
+        return "defer"
+
+    def observe(self, url: str, fingerprint: Optional[int]) -> None:
+        """Record a fetched page's structure fingerprint."""
+        if fingerprint is None:
+            return
+        pattern = url_pattern(url)
+        if "{" not in pattern:
+            return  # fixed paths (/pricing) are their own page, never a template
+        cluster = self._cluster(pattern)
+        cluster["examples"].append(url)
+        similar = sum(1 for fp in cluster["fingerprints"] if hamming(fp, fingerprint) <= self.max_distance)
+        cluster["fingerprints"].append(fingerprint)
+        if similar + 1 >= self.min_examples:
+            cluster["template"] = True
+
+    def report(self) -> Dict[str, Any]:
+        templates = [
+            {
+                "pattern": pattern,
+                "fetched": len(c["examples"]),
+                "deferred": c["deferred"],
+                "skipped": len(c["skipped"]),
+                "examples": c["examples"][:3],
+                "skipped_urls": c["skipped"][:20],
+            }
+            for pattern, c in sorted(self._clusters.items())
+            if c["template"]
+        ]
+        return {
+            "policy": self.policy,
+            "templates": templates,
+            "pages_skipped": sum(t["skipped"] for t in templates),
+            "pages_deferred": sum(t["deferred"] for t in templates),
+        }
@@ -0,0 +1,352 @@
+import json
+import math
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+EASINGS = ["linear", "ease-in", "ease-out", "ease-in-out"]
+TRANSITIONS = ["cut", "dissolve", "slide", "none"]
+
+DEFAULT_ZOOM_IN = 1.5
+DEFAULT_FOCUS_ZOOM = 2.0
+DEFAULT_PAN = 0.25  # fraction of the frame per pan shot
+MAX_ZOOM = 8.0
+TRANSITION_SECONDS = 0.5
+EPS = 1e-6
+
+_PAN_DIRECTIONS = {
+    "pan_left": (-1.0, 0.0),
+    "pan_right": (1.0, 0.0),
+    "pan_up": (0.0, -1.0),
+    "pan_down": (0.0, 1.0),
+}
+
+
+@dataclass
+class TimelineShot:
+    id: str
+    scene_id: Optional[str]
+    scene_index: int
+    start_seconds: float
+    end_seconds: float
+    camera_move: str
+    easing: str
+    transition_after: str
+    target_selector: Optional[str]
+    zoom_from: float
+    zoom_to: float
+    pan_from: Tuple[float, float]
+    pan_to: Tuple[float, float]
+    implicit: bool = False
+
+
+@dataclass
+class TimelineIssue:
+    kind: str  # overlap | gap | out_of_range | invalid
+    message: str
+    scene_id: Optional[str] = None
+    shot_id: Optional[str] = None
+    start_seconds: Optional[float] = None
+    end_seconds: Optional[float] = None
+
+
+@dataclass
+class CompiledTimeline:
+    """Per-frame camera transforms for a storyboard.
+
+    ``frames`` holds equally long numpy arrays indexed by frame number:
+    ``time`` (seconds), ``scene_index``/``shot_index`` (-1 before the first
+    shot), ``zoom``, ``pan_x``/``pan_y`` (fractions of the frame) and
+    ``opacity`` (dips to 0 across dissolves).
+    """
+
+    fps: float
+    duration_seconds: float
+    shots: List[TimelineShot]
+    issues: List[TimelineIssue]
+    transitions: List[Dict[str, Any]]
+    frames: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def frame_count(self) -> int:
+        return int(len(self.frames.get("time", [])))
+
+    def to_dict(self, include_frames: bool = True) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "fps": self.fps,
+            "duration_seconds": self.duration_seconds,
+            "frame_count": self.frame_count,
+            "shots": [asdict(s) for s in self.shots],
+            "issues": [asdict(i) for i in self.issues],
+            "transitions": self.transitions,
+        }
+        if include_frames:
+            out["frames"] = {k: v.tolist() for k, v in self.frames.items()}
+        return out
+
+    def save(self, path: str) -> None:
+        """Write ``.npz`` (compact arrays + JSON metadata) or ``.json``."""
+        if path.endswith(".npz"):
+            meta = json.dumps(self.to_dict(include_frames=False))
+            np.savez_compressed(path, meta=np.array(meta), **self.frames)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+
+
+def _num(value: Any) -> Optional[float]:
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return None
+    return out if math.isfinite(out) else None
+
+
+def _camera_move(shot: Dict[str, Any]) -> str:
+    move = shot.get("camera_move") or shot.get("action") or "static"
+    move = str(move).strip().lower().replace("-", "_").replace(" ", "_")
+    if move in ("zoom_in", "zoom_out", "focus_element", "static") or move in _PAN_DIRECTIONS:
+        return move
+    if move in ("focus", "highlight"):
+        return "focus_element"
+    return "static"
+
+
+def normalize_timeline(storyboard: Dict[str, Any]) -> Tuple[List[TimelineShot], List[TimelineIssue], float]:
+    """Resolve scene and shot timing to absolute seconds.
+
+    Shot times may be scene-relative or absolute (the LLM produces both); a
+    scene whose timed shots all fit inside its absolute window, and either
+    overrun its own duration or start exactly at the scene's absolute start,
+    is read as absolute. Shots with only ``duration_seconds`` or
+    no timing at all are laid out sequentially in the time left in the scene,
+    and a scene without shots gets one implicit static shot. Out-of-range
+    shots are clipped to their scene, overlaps are cut at the later shot's
+    start, and gaps hold the previous camera; each is reported as an issue.
+    """
+    style = storyboard.get("visual_style") or {}
+    default_easing = style.get("default_easing") if style.get("default_easing") in EASINGS else "linear"
+    default_transition = style.get("default_transition") if style.get("default_transition") in TRANSITIONS else "cut"
+
+    issues: List[TimelineIssue] = []
+    shots: List[TimelineShot] = []
+    scene_start = 0.0
+
+    for scene_index, scene in enumerate(storyboard.get("scenes") or []):
+        if not isinstance(scene, dict):
+            continue
+        scene_id = scene.get("id")
+        raw_shots = [s for s in (scene.get("shots") or []) if isinstance(s, dict)]
+        duration = _num(scene.get("duration_seconds"))
+        if not duration or duration <= 0:
+            duration = sum(_num(s.get("duration_seconds")) or 0.0 for s in raw_shots)
+        scene_end = scene_start + duration
+
+        timed = [(_num(s.get("start_seconds")), _num(s.get("end_seconds"))) for s in raw_shots]
+        timed = [(s, e) for s, e in timed if s is not None and e is not None]
+        absolute = bool(
+            timed
+            and scene_start > 0
+            and all(scene_start - EPS <= s and e <= scene_end + EPS for s, e in timed)
+            and (
+                any(e > duration + EPS for _, e in timed)
+                or abs(min(s for s, _ in timed) - scene_start) <= EPS
+            )
+        )
+
+        untimed_left = sum(
+            1 for s in raw_shots
+            if (_num(s.get("start_seconds")) is None or _num(s.get("end_seconds")) is None)
+            and not _num(s.get("duration_seconds"))
+        )
+        cursor = scene_start
+        zoom, pan = 1.0, (0.0, 0.0)  # every scene starts on a fresh, unzoomed page
+        scene_shots: List[TimelineShot] = []
+
+        for i, raw in enumerate(raw_shots):
+            shot_id = str(raw.get("id") or f"{scene_id or f'scene-{scene_index + 1}'}-shot{i + 1}")
+            s, e = _num(raw.get("start_seconds")), _num(raw.get("end_seconds"))
+            if s is not None and e is not None:
+                if not absolute:
+                    s, e = scene_start + s, scene_start + e
+            else:
+                d = _num(raw.get("duration_seconds"))
+                if not d:
+                    d = max(0.0, scene_end - cursor) / max(1, untimed_left)
+                    untimed_left -= 1
+                s, e = cursor, cursor + d
+
+            if e - s <= EPS:
+                issues.append(TimelineIssue("invalid", "Shot has no positive duration; dropped", scene_id, shot_id, s, e))
+                continue
+            if s < scene_start - EPS or e > scene_end + EPS:
+                issues.append(TimelineIssue(
+                    "out_of_range",
+                    f"Shot {s:.2f}-{e:.2f}s falls outside scene {scene_start:.2f}-{scene_end:.2f}s; clipped",
+                    scene_id, shot_id, s, e,
+                ))
+                s, e = max(s, scene_start), min(e, scene_end)
+                if e - s <= EPS:
+                    continue
+            cursor = e
+
+            move = _camera_move(raw)
+            zoom_target = _num(raw.get("zoom_to"))
+            pan_vec = raw.get("pan_vector") if isinstance(raw.get("pan_vector"), dict) else None
+            z0, p0 = zoom, pan
+            z1, p1 = zoom, pan
+            if move == "zoom_in":
+                z1 = zoom_target if zoom_target and zoom_target > zoom else zoom * DEFAULT_ZOOM_IN
+            elif move == "zoom_out":
+                z1 = zoom_target if zoom_target and zoom_target < zoom else 1.0
+                if z1 <= 1.0:
+                    p1 = (0.0, 0.0)
+            elif move == "focus_element":
+                z1 = zoom_target or max(zoom, DEFAULT_FOCUS_ZOOM)
+            if move in _PAN_DIRECTIONS or (move == "focus_element" and pan_vec):
+                dx, dy = _PAN_DIRECTIONS.get(move, (0.0, 0.0))
+                if pan_vec:
+                    dx, dy = _num(pan_vec.get("x")) or 0.0, _num(pan_vec.get("y")) or 0.0
+                else:
+                    dx, dy = dx * DEFAULT_PAN, dy * DEFAULT_PAN
+                p1 = (p0[0] + dx, p0[1] + dy)
+            z1 = min(max(z1, 1.0), MAX_ZOOM)
+            zoom, pan = z1, p1
+
+            easing = raw.get("easing") if raw.get("easing") in EASINGS else default_easing
+            transition = raw.get("transition_after") if raw.get("transition_after") in TRANSITIONS else default_transition
+            scene_shots.append(TimelineShot(
+                id=shot_id, scene_id=scene_id, scene_index=scene_index,
+                start_seconds=s, end_seconds=e, camera_move=move, easing=easing,
+                transition_after=transition,
+                target_selector=raw.get("target_selector") or raw.get("selector"),
+                zoom_from=z0, zoom_to=z1, pan_from=p0, pan_to=p1,
+            ))
+
+        if not scene_shots and duration > 0:
+            scene_shots.append(TimelineShot(
+                id=f"{scene_id or f'scene-{scene_index + 1}'}-implicit", scene_id=scene_id,
+                scene_index=scene_index, start_seconds=scene_start, end_seconds=scene_end,
+                camera_move="static", easing=default_easing, transition_after=default_transition,
+                target_selector=None, zoom_from=1.0, zoom_to=1.0, pan_from=(0.0, 0.0),
+                pan_to=(0.0, 0.0), implicit=True,
+            ))
+        shots.extend(scene_shots)
+        scene_start = scene_end
+
+    # Global ordering, overlap and gap detection
+    order = sorted(range(len(shots)), key=lambda k: (shots[k].start_seconds, k))
+    shots = [shots[k] for k in order]
+    resolved: List[TimelineShot] = []
+    prev_end = 0.0
+    for shot in shots:
+        if resolved and shot.start_seconds < prev_end - EPS:
+            prev = resolved[-1]
+            issues.append(TimelineIssue(
+                "overlap",
+                f"Shot overlaps {prev.id} by {prev_end - shot.start_seconds:.2f}s; {prev.id} is cut at {shot.start_seconds:.2f}s",
+                shot.scene_id, shot.id, shot.start_seconds, prev_end,
+            ))
+            prev.end_seconds = shot.start_seconds
+            if prev.end_seconds - prev.start_seconds <= EPS:
+                resolved.pop()
+        elif shot.start_seconds > prev_end + EPS:
+            issues.append(TimelineIssue(
+                "gap", f"No shot between {prev_end:.2f}s and {shot.start_seconds:.2f}s; camera holds",
+                shot.scene_id, shot.id, prev_end, shot.start_seconds,
+            ))
+        resolved.append(shot)
+        prev_end = max(prev_end, shot.end_seconds)
+
+    total = max(scene_start, prev_end)
+    return resolved, issues, total
+
+
+def _ease(progress: "np.ndarray", codes: "np.ndarray") -> "np.ndarray":
+    p = progress
+    curves = np.stack([
+        p,                              # linear
+        p * p,                          # ease-in
+        1.0 - (1.0 - p) * (1.0 - p),    # ease-out
+        p * p * (3.0 - 2.0 * p),        # ease-in-out (smoothstep)
+    ])
+    return np.take_along_axis(curves, codes[None, :], axis=0)[0]
+
+
+def compile_timeline(storyboard: Dict[str, Any], fps: float = 30.0) -> CompiledTimeline:
+    """Normalize a storyboard and evaluate all shots into per-frame arrays."""
+    if fps <= 0:
+        raise ValueError("fps must be positive")
+    shots, issues, duration = normalize_timeline(storyboard)
+    n_frames = int(math.ceil(duration * fps - EPS)) if duration > 0 else 0
+    t = np.arange(n_frames, dtype=np.float64) / fps
+
+    transitions: List[Dict[str, Any]] = []
+    frames: Dict[str, Any] = {"time": t.astype(np.float32)}
+    if not shots:
+        frames.update({
+            "scene_index": np.full(n_frames, -1, dtype=np.int16),
+            "shot_index": np.full(n_frames, -1, dtype=np.int32),
+            "zoom": np.ones(n_frames, dtype=np.float32),
+            "pan_x": np.zeros(n_frames, dtype=np.float32),
+            "pan_y": np.zeros(n_frames, dtype=np.float32),
+            "opacity": np.ones(n_frames, dtype=np.float32),
+        })
+        return CompiledTimeline(fps, duration, shots, issues, transitions, frames)
+
+    starts = np.array([s.start_seconds for s in shots])
+    ends = np.array([s.end_seconds for s in shots])
+    z0 = np.array([s.zoom_from for s in shots])
+    z1 = np.array([s.zoom_to for s in shots])
+    px0 = np.array([s.pan_from[0] for s in shots])
+    px1 = np.array([s.pan_to[0] for s in shots])
+    py0 = np.array([s.pan_from[1] for s in shots])
+    py1 = np.array([s.pan_to[1] for s in shots])
+    easing = np.array([EASINGS.index(s.easing) for s in shots], dtype=np.intp)
+    scene_idx = np.array([s.scene_index for s in shots], dtype=np.int16)
+
+    # Active shot per frame; gaps keep the previous shot (progress clamps to 1)
+    idx = np.searchsorted(starts, t, side="right") - 1
+    before = idx < 0
+    safe = np.where(before, 0, idx)
+    progress = np.clip((t - starts[safe]) / (ends[safe] - starts[safe]), 0.0, 1.0)
+    eased = _ease(progress, easing[safe])
+    zoom = z0[safe] + (z1[safe] - z0[safe]) * eased
+    pan_x = px0[safe] + (px1[safe] - px0[safe]) * eased
+    pan_y = py0[safe] + (py1[safe] - py0[safe]) * eased
+    zoom[before], pan_x[before], pan_y[before] = 1.0, 0.0, 0.0
+
+    # Transitions happen at each shot boundary; dissolves dip opacity around it
+    opacity = np.ones(n_frames, dtype=np.float64)
+    boundaries, half_widths = [], []
+    for prev, nxt in zip(shots, shots[1:]):
+        if prev.transition_after in ("cut", "none") and prev.scene_index == nxt.scene_index:
+            continue
+        at = nxt.start_seconds
+        kind = prev.transition_after
+        transitions.append({"at_seconds": at, "frame": int(round(at * fps)), "kind": kind, "from_shot": prev.id, "to_shot": nxt.id})
+        if kind == "dissolve":
+            half = min(TRANSITION_SECONDS / 2, (prev.end_seconds - prev.start_seconds) / 2, (nxt.end_seconds - nxt.start_seconds) / 2)
+            boundaries.append(at)
+            half_widths.append(max(half, EPS))
+    if boundaries:
+        b = np.array(boundaries)
+        h = np.array(half_widths)
+        j = np.clip(np.searchsorted(b, t), 1, len(b)) - 1
+        # Compare against the boundaries on either side of each frame
+        k = np.minimum(j + 1, len(b) - 1)
+        dip_j = np.clip(np.abs(t - b[j]) / h[j], 0.0, 1.0)
+        dip_k = np.clip(np.abs(t - b[k]) / h[k], 0.0, 1.0)
+        opacity = np.minimum(dip_j, dip_k)
+
+    frames.update({
+        "scene_index": np.where(before, -1, scene_idx[safe]).astype(np.int16),
+        "shot_index": np.where(before, -1, idx).astype(np.int32),
+        "zoom": zoom.astype(np.float32),
+        "pan_x": pan_x.astype(np.float32),
+        "pan_y": pan_y.astype(np.float32),
+        "opacity": opacity.astype(np.float32),
+    })
+    return CompiledTimeline(fps, duration, shots, issues, transitions, frames)
@@ -0,0 +1,159 @@
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# Cohere finish reasons meaning the output was cut off rather than finished
+TRUNCATED_REASONS = ("MAX_TOKENS", "ERROR_LIMIT")
+_COUNTERS = (
+    "calls", "errors", "parse_failures", "truncated", "retries", "structured", "prompt_tokens", "completion_tokens",
+)
+
+
+def parse_prices(spec: Optional[str]) -> Dict[str, Tuple[float, float]]:
+    """``command-r=0.15/0.6,command-r-plus=2.5/10`` -> USD per million input/output tokens by model."""
+    prices: Dict[str, Tuple[float, float]] = {}
+    for item in (spec or "").split(","):
+        model, _, rates = item.strip().partition("=")
+        if not model or not rates:
+            continue
+        try:
+            input_rate, output_rate = (float(r) for r in rates.split("/", 1))
+        except ValueError:
+            continue
+        prices[model.strip()] = (input_rate, output_rate)
+    return prices
+
+
+@dataclass
+class CallUsage:
+    """Accounting for one storyboard generation: the LLM call and what came of it.
+
+    Token counts come from the backend's response metadata and stay ``None``
+    when it reports none (e.g. cassettes recorded before usage was kept).
+    ``seconds`` is wall time for the whole call, hedge included;
+    ``first_token_seconds`` is measured on the attempt whose output was used.
+    ``retries`` counts extra attempts (hedges), not SDK-level retries, and
+    ``structured`` whether decoding was constrained to the storyboard schema.
+    """
+
+    model: str
+    backend: str
+    prompt_chars: int
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    billed_input_tokens: Optional[int] = None
+    billed_output_tokens: Optional[int] = None
+    seconds: Optional[float] = None
+    first_token_seconds: Optional[float] = None
+    finish_reason: Optional[str] = None
+    truncated: bool = False
+    structured: Optional[bool] = None
+    retries: int = 0
+    hedge_reason: Optional[str] = None
+    parsed: Optional[bool] = None
+    schema_valid: Optional[bool] = None
+    cost_usd: Optional[float] = None
+    error: Optional[str] = None
+
+    def update(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Take the token counts and finish reason a backend reported."""
+        for key, value in (usage or {}).items():
+            if hasattr(self, key) and value is not None:
+                setattr(self, key, value)
+        self.truncated = self.finish_reason in TRUNCATED_REASONS
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class UsageStats:
+    """Running totals over every LLM call of one agent, for health and /metrics.
+
+    Counters are kept per model; ``prices`` (see ``parse_prices``) turns
+    billed tokens into ``cost_usd``.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        self.prices = prices or {}
+        self._lock = threading.Lock()
+        self._by_model: Dict[str, Dict[str, float]] = {}
+        self._seconds = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._first_token = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._seconds_sum = 0.0
+        self._first_token_sum = 0.0
+
+    def cost(self, call: CallUsage) -> Optional[float]:
+        rates = self.prices.get(call.model)
+        input_tokens = call.billed_input_tokens if call.billed_input_tokens is not None else call.prompt_tokens
+        output_tokens = call.billed_output_tokens if call.billed_output_tokens is not None else call.completion_tokens
+        if rates is None or input_tokens is None or output_tokens is None:
+            return None
+        return round((input_tokens * rates[0] + output_tokens * rates[1]) / 1e6, 6)
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                return i
+        return len(LATENCY_BUCKETS)
+
+    def record(self, call: CallUsage) -> None:
+        """Add one call to the totals (and fill in its ``cost_usd``)."""
+        call.cost_usd = self.cost(call)
+        with self._lock:
+            model = self._by_model.setdefault(call.model, dict.fromkeys(_COUNTERS + ("cost_usd",), 0))
+            model["calls"] += 1
+            model["errors"] += call.error is not None
+            model["parse_failures"] += call.parsed is False
+            model["truncated"] += call.truncated
+            model["retries"] += call.retries
+            model["structured"] += call.structured is True
+            model["prompt_tokens"] += call.prompt_tokens or 0
+            model["completion_tokens"] += call.completion_tokens or 0
+            model["cost_usd"] += call.cost_usd or 0.0
+            if call.seconds is not None:
+                self._seconds[self._bucket(call.seconds)] += 1
+                self._seconds_sum += call.seconds
+            if call.first_token_seconds is not None:
+                self._first_token[self._bucket(call.first_token_seconds)] += 1
+                self._first_token_sum += call.first_token_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_model = {m: dict(c, cost_usd=round(c["cost_usd"], 6)) for m, c in self._by_model.items()}
+            timed, first = sum(self._seconds), sum(self._first_token)
+            out: Dict[str, Any] = {k: sum(c[k] for c in by_model.values()) for k in _COUNTERS}
+            out.update(
+                cost_usd=round(sum(c["cost_usd"] for c in by_model.values()), 6),
+                seconds_mean=round(self._seconds_sum / timed, 4) if timed else 0.0,
+                first_token_seconds_mean=round(self._first_token_sum / first, 4) if first else 0.0,
+                by_model=by_model,
+            )
+        return out
+
+    def prometheus(self, prefix: str = "storyboard_llm") -> str:
+        """Prometheus text exposition of the same counters plus latency histograms."""
+        lines: List[str] = []
+        with self._lock:
+            models = {m: dict(c) for m, c in self._by_model.items()}
+            histograms = (
+                ("seconds", "Wall time of LLM calls", list(self._seconds), self._seconds_sum),
+                ("first_token_seconds", "Time to first token of LLM calls", list(self._first_token), self._first_token_sum),
+            )
+        for key in _COUNTERS + ("cost_usd",):
+            name = f"{prefix}_{key}_total"
+            lines += [f"# HELP {name} LLM {key.replace('_', ' ')} by model", f"# TYPE {name} counter"]
+            lines += [f'{name}{{model="{m}"}} {c[key]:g}' for m, c in sorted(models.items())]
+        for key, help_text, counts, total in histograms:
+            name = f"{prefix}_{key}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{name}_bucket{{le="{le}"}} {cumulative}')
+            lines += [f"{name}_sum {total:.6f}", f"{name}_count {cumulative}"]
+        return "\n".join(lines) + "\n"